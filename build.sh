@@ -12,4 +12,8 @@ python manage.py collectstatic --no-input
 
 # 3. Apply Database Migrations
 # This ensures your database schema is up-to-date with your models.
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# 4. Verify the product search index
+# Migrations that rebuild the product table on SQLite drop the FTS5 triggers; restore them.
+python manage.py check_search_index --fix
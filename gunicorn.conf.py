@@ -0,0 +1,25 @@
+# gunicorn.conf.py
+# يقرأه gunicorn تلقائياً من مجلد التشغيل.
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def post_worker_init(worker):
+    """
+    تشغيل مرسل إشعارات تليجرام حتى تُرسل رسائل صندوق الصادر المتبقية من قبل إعادة التشغيل،
+    وتحميل كتالوج المنتجات في ذاكرة العامل عند بدء تشغيله بدلاً من أول عملية بحث.
+    """
+    from django.conf import settings
+    from store.telegram_bot import dispatcher
+    dispatcher.wake()
+
+    if getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'auto') != 'store.search.CatalogSearchBackend':
+        return
+    try:
+        from store.catalog import catalog_index
+        catalog_index.load()
+    except Exception:
+        # لا نمنع العامل من العمل؛ سيُحمَّل الكتالوج عند أول عملية بحث.
+        logger.exception("تعذر تحميل كتالوج المنتجات عند بدء العامل.")
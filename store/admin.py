@@ -1,10 +1,118 @@
 # store/admin.py
 
-from django.contrib import admin
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import BooleanField, ExpressionWrapper
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.formats import date_format
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+from .forms import ProductImportForm, StockMovementForm
+from .importer import ImportFileError, import_products
+from .inventory import adjust_stock, record_movements
 from .models import (
     Category, Product, Client, Note, 
-    Invoice, InvoiceItem, Payment
+    Invoice, InvoiceItem, Payment, StockMovement, OutboxMessage, LOW_STOCK
 )
+from .periods import business_date, range_filter
+from .telegram_bot import dispatcher
+
+# ===================================================================
+#   أدوات أداء قوائم الأدمن
+# ===================================================================
+
+class EstimatedCountPaginator(Paginator):
+    """
+    على PostgreSQL تستخدم القائمة غير المفلترة عدد الصفوف التقديري من إحصاءات الجدول
+    (pg_class.reltuples) بدلاً من COUNT(*) الذي يقرأ الجدول كاملاً. القوائم المفلترة
+    والجداول الصغيرة وقواعد البيانات الأخرى تُعد بالطريقة العادية.
+    """
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [connection.ops.quote_name(queryset.model._meta.db_table)],
+                )
+                row = cursor.fetchone()
+            # reltuples = -1 للجداول التي لم تُحلَّل بعد.
+            if row and row[0] >= self.exact_below:
+                return row[0]
+        return super().count
+
+
+class LargeListMixin:
+    """إعدادات القوائم الكبيرة: عدد تقديري، ودون COUNT(*) إضافي للجدول كاملاً عند الفلترة."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 25
+
+
+class MonthListFilter(admin.SimpleListFilter):
+    """
+    بديل date_hierarchy: خيارات الأشهر تُحسب من التقويم دون استعلام (date_hierarchy ينفذ
+    DISTINCT على أعمدة التاريخ في الجدول كاملاً)، وكل شهر يتحول إلى مدى نصف مفتوح
+    على عمود التاريخ فيستخدم فهرسه.
+    """
+    title = _('الشهر')
+    parameter_name = 'month'
+    field_name = None
+    months = 12
+
+    def lookups(self, request, model_admin):
+        first = business_date().replace(day=1)
+        options = []
+        for _index in range(self.months):
+            options.append((first.strftime('%Y-%m'), date_format(first, 'F Y')))
+            first -= relativedelta(months=1)
+        return options
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            first = date.fromisoformat(f"{self.value()}-01")
+        except ValueError:
+            raise IncorrectLookupParameters(self.value())
+        last = first + relativedelta(months=1) - timedelta(days=1)
+        return queryset.filter(**range_filter(self.field_name, first, last))
+
+
+class InvoiceMonthFilter(MonthListFilter):
+    field_name = 'created_at'
+
+
+class PaymentMonthFilter(MonthListFilter):
+    field_name = 'payment_date'
+
+
+class LowStockFilter(admin.SimpleListFilter):
+    title = _('حالة المخزون')
+    parameter_name = 'low_stock'
+
+    def lookups(self, request, model_admin):
+        return (('yes', _('تحت حد إعادة الطلب')), ('no', _('متوفر')))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'yes':
+            return queryset.filter(LOW_STOCK)
+        if self.value() == 'no':
+            return queryset.exclude(LOW_STOCK)
+        return queryset
 
 # ===================================================================
 #   إعدادات واجهة الأدمن
@@ -15,17 +123,74 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'category', 'sale_price', 'stock_quantity', 'is_low_on_stock')
-    list_filter = ('category', 'stock_quantity')
+class ProductAdmin(LargeListMixin, admin.ModelAdmin):
+    list_display = ('name', 'category', 'sale_price', 'stock_quantity', 'low_stock')
+    list_filter = (LowStockFilter, 'category')
+    list_select_related = ('category',)
     search_fields = ('name', 'sku')
-    list_per_page = 25
+    change_list_template = 'admin/store/product/change_list.html'
+
+    def get_queryset(self, request):
+        # حالة المخزون تُحسب في نفس الاستعلام حتى يمكن الترتيب حسبها.
+        return super().get_queryset(request).annotate(
+            is_low=ExpressionWrapper(LOW_STOCK, output_field=BooleanField())
+        )
+
+    @admin.display(boolean=True, ordering='is_low', description=_('تحت حد الطلب'))
+    def low_stock(self, obj):
+        return obj.is_low
+
+    def save_model(self, request, obj, form, change):
+        """تعديل الكمية من صفحة المنتج يُسجَّل في سجل المخزون بالفرق عن الكمية الحالية."""
+        with transaction.atomic():
+            previous = 0
+            if change:
+                previous = Product.objects.select_for_update().values_list('stock_quantity', flat=True).get(pk=obj.pk)
+            super().save_model(request, obj, form, change)
+            kind = StockMovement.Kind.ADJUSTMENT if change else StockMovement.Kind.RESTOCK
+            record_movements([(obj.pk, kind, obj.stock_quantity - previous)], note="تعديل من لوحة الإدارة")
+
+    def get_urls(self):
+        custom_urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='store_product_import'),
+        ]
+        return custom_urls + super().get_urls()
+
+    def import_view(self, request):
+        """رفع قائمة أسعار واستيرادها بالجملة (store/importer.py)."""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        report = None
+        if request.method == 'POST':
+            form = ProductImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                uploaded = form.cleaned_data['file']
+                try:
+                    report = import_products(
+                        uploaded.file, uploaded.name,
+                        batch_size=form.cleaned_data['batch_size'],
+                        dry_run=form.cleaned_data['dry_run'],
+                    )
+                except ImportFileError as error:
+                    form.add_error('file', str(error))
+                else:
+                    level = messages.INFO if report.dry_run else messages.SUCCESS
+                    self.message_user(request, report.summary(), level)
+        else:
+            form = ProductImportForm()
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'استيراد المنتجات',
+            'form': form,
+            'report': report,
+        }
+        return TemplateResponse(request, 'admin/store/product/import.html', context)
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(LargeListMixin, admin.ModelAdmin):
     list_display = ('name', 'phone', 'total_debt')
     search_fields = ('name', 'phone')
-    list_per_page = 25
 
 # --- إعدادات عرض الفواتير وبنودها ---
 
@@ -35,28 +200,65 @@ class InvoiceItemInline(admin.TabularInline):
     """
     model = InvoiceItem
     extra = 0  # لمنع عرض حقول فارغة إضافية
-    readonly_fields = ('product', 'quantity', 'price_at_sale') # منع تعديل سجلات البيع التاريخية
+    readonly_fields = ('product', 'quantity', 'price_at_sale', 'cost_at_sale') # منع تعديل سجلات البيع التاريخية
     can_delete = False # منع حذف بنود من فاتورة مسجلة
 
     def has_add_permission(self, request, obj=None):
         return False # منع إضافة بنود جديدة من واجهة الأدمن
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product')
+
 @admin.register(Invoice)
-class InvoiceAdmin(admin.ModelAdmin):
-    list_display = ('id', 'client', 'payment_method', 'total_amount', 'created_at')
-    list_filter = ('payment_method', 'created_at')
+class InvoiceAdmin(LargeListMixin, admin.ModelAdmin):
+    list_display = ('id', 'client', 'payment_method', 'total_amount', 'outstanding_amount', 'created_at')
+    # فلتر الأشهر بدلاً من date_hierarchy (انظر MonthListFilter)
+    list_filter = ('payment_method', 'created_at', InvoiceMonthFilter)
+    list_select_related = ('client',)
     search_fields = ('id', 'client__name')
-    date_hierarchy = 'created_at' # لإضافة فلتر زمني هرمي
     inlines = [InvoiceItemInline]
-    list_per_page = 25
 
 @admin.register(Payment)
-class PaymentAdmin(admin.ModelAdmin):
+class PaymentAdmin(LargeListMixin, admin.ModelAdmin):
     list_display = ('client', 'amount', 'payment_date')
-    list_filter = ('payment_date',)
+    list_filter = ('payment_date', PaymentMonthFilter)
+    list_select_related = ('client',)
     search_fields = ('client__name',)
-    date_hierarchy = 'payment_date'
-    list_per_page = 25
+
+@admin.register(StockMovement)
+class StockMovementAdmin(LargeListMixin, admin.ModelAdmin):
+    """سجل المخزون للإضافة فقط: الحركات اليدوية تُضاف من هنا ولا تُعدَّل ولا تُحذف."""
+    form = StockMovementForm
+    list_display = ('created_at', 'product', 'kind', 'quantity', 'invoice', 'note')
+    list_filter = ('kind', 'created_at')
+    list_select_related = ('product',)
+    search_fields = ('product__name', 'product__sku')
+    autocomplete_fields = ('product',)
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def save_model(self, request, obj, form, change):
+        # adjust_stock تقفل المنتج وتعدّل كميته وتسجل الحركة في معاملة واحدة.
+        movement = adjust_stock(obj.product, obj.quantity, obj.kind, note=obj.note)
+        obj.pk = movement.pk
+        obj.created_at = movement.created_at
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('created_at', '__str__', 'attempts', 'failed', 'available_at', 'last_error')
+    list_filter = ('failed',)
+    readonly_fields = ('text', 'created_at', 'attempts', 'last_error')
+    actions = ['retry_messages']
+
+    @admin.action(description="إعادة محاولة إرسال الإشعارات المحددة")
+    def retry_messages(self, request, queryset):
+        updated = queryset.update(failed=False, attempts=0, available_at=timezone.now(), claim_token='')
+        dispatcher.wake()
+        self.message_user(request, f"ستُعاد محاولة إرسال {updated} إشعار.")
 
 @admin.register(Note)
 class NoteAdmin(admin.ModelAdmin):
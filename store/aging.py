@@ -0,0 +1,219 @@
+# store/aging.py
+
+"""
+## أعمار الديون ##
+كل فاتورة دين تحفظ الجزء غير المسدد منها (Invoice.outstanding_amount)، والدفعات توزَّع
+على فواتير العميل المفتوحة من الأقدم إلى الأحدث (FIFO):
+
+- الفاتورة الجديدة تبدأ بكامل مبلغها، ويُخصم منها أولاً رصيد العميل الدائن (Client.unapplied_credit)
+  إن كانت دفعاته السابقة أكبر من فواتيره.
+- الدفعة تسدد الفواتير المفتوحة بالترتيب، وما يزيد عنها يضاف إلى الرصيد الدائن.
+  كلاهما يتم داخل معاملة الفاتورة أو الدفعة بعد post_entry، وصف العميل مقفل حتى نهايتها.
+- تقرير الأعمار استعلام تجميعي واحد على الفواتير المفتوحة فقط (الفهرس الجزئي store_invoice_open_idx)،
+  والفئات (0–30، 31–60، 61–90، أكثر من 90 يوماً) تُحسب بتاريخ اليوم عند القراءة، لأن الفاتورة
+  تنتقل من فئة إلى أخرى بمرور الأيام دون أي حركة.
+- rebuild_aging تعيد التوزيع لكل العملاء بمرور واحد على الفواتير والدفعات مرتبة حسب العميل
+  ثم التاريخ، والذاكرة بحجم الفواتير المفتوحة لعميل واحد فقط.
+"""
+
+import heapq
+from collections import deque
+from datetime import timedelta
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.translation import gettext_lazy as _
+
+from .models import Client, Invoice, Payment
+from .periods import business_date, business_day_start
+
+# (اسم الفئة، العنوان، أقل عمر بالأيام)
+BUCKETS = [
+    ('current', _('0–30 يوماً'), 0),
+    ('days_31_60', _('31–60 يوماً'), 31),
+    ('days_61_90', _('61–90 يوماً'), 61),
+    ('over_90', _('أكثر من 90 يوماً'), 91),
+]
+ZERO = Decimal('0.00')
+
+
+# ===================================================================
+#   1. التحديث مع كل فاتورة ودفعة
+# ===================================================================
+
+def apply_credit_to_invoice(client, invoice):
+    """
+    تخصم رصيد العميل الدائن من فاتورة دين جديدة (أُنشئت بـ outstanding_amount = المبلغ كاملاً).
+    تعتمد على client.unapplied_credit كما قرأته post_entry داخل نفس المعاملة.
+    """
+    used = min(client.unapplied_credit, invoice.outstanding_amount)
+    if used <= 0:
+        return
+    Invoice.objects.filter(pk=invoice.pk).update(outstanding_amount=F('outstanding_amount') - used)
+    Client.objects.filter(pk=client.pk).update(unapplied_credit=F('unapplied_credit') - used)
+    invoice.outstanding_amount -= used
+    client.unapplied_credit -= used
+
+
+def apply_payment(client, amount, chunk_size=50):
+    """
+    توزع دفعة على فواتير الدين المفتوحة للعميل من الأقدم، وتضيف الباقي إلى رصيده الدائن.
+    تُقرأ الفواتير المفتوحة على دفعات وتتوقف القراءة عند نفاد المبلغ.
+    """
+    remaining = amount
+    paid = []
+    open_invoices = (
+        Invoice.objects.filter(client=client, outstanding_amount__gt=0)
+        .order_by('created_at', 'id').only('id', 'outstanding_amount')
+    )
+    for invoice in open_invoices.iterator(chunk_size=chunk_size):
+        applied = min(remaining, invoice.outstanding_amount)
+        invoice.outstanding_amount -= applied
+        remaining -= applied
+        paid.append(invoice)
+        if not remaining:
+            break
+    if paid:
+        Invoice.objects.bulk_update(paid, ['outstanding_amount'])
+    if remaining:
+        Client.objects.filter(pk=client.pk).update(unapplied_credit=F('unapplied_credit') + remaining)
+        client.unapplied_credit += remaining
+
+
+# ===================================================================
+#   2. إعادة البناء الكاملة
+# ===================================================================
+
+def _events():
+    """فواتير الدين والدفعات لكل العملاء مرتبة حسب (العميل، التاريخ)، دون تحميلها في الذاكرة."""
+    invoices = (
+        (client_id, created_at, 0, pk, total_amount, outstanding_amount)
+        for client_id, created_at, pk, total_amount, outstanding_amount in Invoice.objects.filter(
+            payment_method=Invoice.PaymentMethod.CREDIT, client__isnull=False,
+        ).order_by('client_id', 'created_at', 'id').values_list(
+            'client_id', 'created_at', 'id', 'total_amount', 'outstanding_amount',
+        ).iterator(chunk_size=5000)
+    )
+    payments = (
+        (client_id, payment_date, 1, pk, amount, None)
+        for client_id, payment_date, pk, amount in Payment.objects.order_by(
+            'client_id', 'payment_date', 'id',
+        ).values_list('client_id', 'payment_date', 'id', 'amount').iterator(chunk_size=5000)
+    )
+    # في نفس اللحظة تسبق الفاتورة الدفعة، كما في rebuild_client_ledger.
+    return heapq.merge(invoices, payments, key=lambda event: event[:4])
+
+
+def allocate(events, settle):
+    """
+    توزيع FIFO لحركات عميل واحد مرتبة بالتاريخ. تستدعي settle(المعرّف، المتبقي، القيمة المخزنة)
+    لكل فاتورة حين تُعرف قيمتها النهائية (عند سدادها كاملة أو في النهاية)، وتعيد الرصيد الدائن.
+    """
+    open_invoices = deque()
+    credit = ZERO
+    for _client_id, _date, order, pk, amount, stored in events:
+        if order == 0:
+            used = min(credit, amount)
+            credit -= used
+            if amount - used:
+                open_invoices.append([pk, amount - used, stored])
+            else:
+                settle(pk, ZERO, stored)
+            continue
+        while amount and open_invoices:
+            invoice = open_invoices[0]
+            applied = min(amount, invoice[1])
+            invoice[1] -= applied
+            amount -= applied
+            if not invoice[1]:
+                settle(*open_invoices.popleft())
+        credit += amount
+    for invoice in open_invoices:
+        settle(*invoice)
+    return credit
+
+
+def rebuild_aging(batch_size=1000):
+    """
+    تعيد توزيع كل الدفعات على فواتير الدين وتكتب ما تغيّر فقط. تعيد
+    {'clients': عدد العملاء، 'invoices': عدد الفواتير المصححة، 'credits': عدد الأرصدة الدائنة}.
+    يُفضل تشغيلها في وقت هادئ: فاتورة أو دفعة تُسجَّل أثناءها قد تُكتب فوقها قيمة أقدم.
+    """
+    stats = {'clients': 0, 'invoices': 0, 'credits': 0}
+    invoices, clients = [], []
+
+    def settle(pk, outstanding, stored):
+        if outstanding != stored:
+            invoices.append(Invoice(pk=pk, outstanding_amount=outstanding))
+            stats['invoices'] += 1
+
+    def flush(force=False):
+        if invoices and (force or len(invoices) >= batch_size):
+            Invoice.objects.bulk_update(invoices, ['outstanding_amount'])
+            invoices.clear()
+        if clients and (force or len(clients) >= batch_size):
+            Client.objects.bulk_update(clients, ['unapplied_credit'])
+            clients.clear()
+
+    with transaction.atomic():
+        # فواتير مفتوحة لم تعد ديناً (بيع نقدي أو عميل محذوف) وأرصدة دائنة تُحسب من جديد.
+        stats['invoices'] += Invoice.objects.filter(outstanding_amount__gt=0).exclude(
+            payment_method=Invoice.PaymentMethod.CREDIT, client__isnull=False,
+        ).update(outstanding_amount=0)
+        Client.objects.filter(unapplied_credit__gt=0).update(unapplied_credit=0)
+
+        for client_id, events in groupby(_events(), key=lambda event: event[0]):
+            credit = allocate(events, settle)
+            stats['clients'] += 1
+            if credit:
+                clients.append(Client(pk=client_id, unapplied_credit=credit))
+                stats['credits'] += 1
+            flush()
+        flush(force=True)
+    return stats
+
+
+# ===================================================================
+#   3. التقرير
+# ===================================================================
+
+def _money(aggregate):
+    return Coalesce(aggregate, Value(ZERO), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def bucket_aggregates(as_of=None):
+    """مجاميع المتبقي لكل فئة عمر بتاريخ as_of (الافتراضي: يوم العمل الحالي)، مع الإجمالي وأقدم فاتورة."""
+    today = as_of or business_date()
+    # حدود الفئات: الفاتورة عمرها n يوماً إذا أُنشئت في يوم العمل today - n.
+    bounds = [business_day_start(today - timedelta(days=days - 1)) for _name, _label, days in BUCKETS[1:]]
+    aggregates = {}
+    for (name, _label, _days), newer, older in zip(BUCKETS, bounds + [None], [None] + bounds):
+        condition = Q()
+        if newer is not None:
+            condition &= Q(created_at__gte=newer)
+        if older is not None:
+            condition &= Q(created_at__lt=older)
+        aggregates[name] = _money(Sum('outstanding_amount', filter=condition))
+    aggregates['total'] = _money(Sum('outstanding_amount'))
+    aggregates['oldest'] = Min('created_at')
+    return aggregates
+
+
+def open_invoices():
+    return Invoice.objects.filter(outstanding_amount__gt=0, client__isnull=False)
+
+
+def client_aging(as_of=None, order='-total'):
+    """صف لكل عميل عليه فواتير مفتوحة: {client_id, client__name, current, ...، total, oldest}."""
+    return (
+        open_invoices().values('client_id', 'client__name')
+        .annotate(**bucket_aggregates(as_of))
+        .order_by(order, 'client_id')
+    )
+
+
+def aging_totals(as_of=None):
+    return open_invoices().aggregate(**bucket_aggregates(as_of))
@@ -0,0 +1,235 @@
+# store/analytics.py
+
+"""
+## تحليل الأرباح حسب المنتج والتصنيف والعميل ##
+لكل فترة (أيام عمل) وتجميع، استعلام تجميعي واحد يعيد لكل مجموعة أرقام الفترة
+وأرقام الفترة السابقة بنفس الطول معاً (Sum مع filter)، فلا حلقات لكل منتج ولا استعلام ثانٍ للمقارنة:
+
+- المنتجات والعملاء من بنود الفواتير (InvoiceItem) مع تكلفة البند المحفوظة لحظة البيع.
+- التصنيفات من جدول الملخص اليومي (DailySalesSummary) الذي يحمل نفس الأرقام مجمعة مسبقاً.
+
+النتيجة الكاملة (كل المجموعات) تُحفظ في ذاكرة Django المؤقتة بمفتاح (التجميع، البداية، النهاية)،
+والفرز والتقسيم إلى صفحات يتمان عليها في الذاكرة، ثم تُقرأ أسماء صفحة واحدة فقط.
+الفترات الماضية لا تتغير فتبقى يوماً كاملاً، والفترات التي تشمل اليوم الحالي تنتهي
+بعد PROFIT_ANALYTICS_CACHE_TIMEOUT ثانية.
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils.translation import gettext_lazy as _
+
+from .dashboard import from_cents
+from .models import Category, Client, DailySalesSummary, InvoiceItem, Product
+from .periods import business_date, business_day_start, range_filter
+
+KEY_PREFIX = 'analytics:v1:'
+HISTORY_TIMEOUT = 24 * 60 * 60
+
+GROUPINGS = {
+    'product': _('المنتجات'),
+    'category': _('التصنيفات'),
+    'client': _('العملاء'),
+}
+SORTS = {
+    'profit': _('الربح'),
+    'revenue': _('المبيعات'),
+    'quantity': _('الكمية'),
+    'growth': _('نمو الربح'),
+}
+
+
+@dataclass
+class GroupTotals:
+    """أرقام مجموعة واحدة (منتج أو تصنيف أو عميل) في الفترة والفترة السابقة."""
+    key: int
+    quantity: int
+    revenue: Decimal
+    cost: Decimal
+    previous_revenue: Decimal
+    previous_cost: Decimal
+    name: str = ''
+
+    @property
+    def profit(self):
+        return self.revenue - self.cost
+
+    @property
+    def previous_profit(self):
+        return self.previous_revenue - self.previous_cost
+
+    @property
+    def margin(self):
+        """نسبة الربح من المبيعات (%)."""
+        return self.profit / self.revenue * 100 if self.revenue else None
+
+    @property
+    def growth(self):
+        """تغير الربح عن الفترة السابقة (%)، أو None إذا لم يكن هناك ربح سابق."""
+        if not self.previous_profit:
+            return None
+        return (self.profit - self.previous_profit) / abs(self.previous_profit) * 100
+
+
+def preset_periods(today=None):
+    """الفترات الجاهزة في صفحة التحليل: {الاسم: (العنوان، البداية، النهاية)}."""
+    today = today or business_date()
+    return {
+        'this_week': (_('هذا الأسبوع'), today - timedelta(days=today.weekday()), today),
+        'this_month': (_('هذا الشهر'), today.replace(day=1), today),
+        'last_30_days': (_('آخر 30 يوماً'), today - timedelta(days=29), today),
+        'last_90_days': (_('آخر 90 يوماً'), today - timedelta(days=89), today),
+        'this_year': (_('هذه السنة'), today.replace(day=1, month=1), today),
+    }
+
+
+def previous_period(start_day, end_day):
+    """الفترة السابقة مباشرة وبنفس عدد الأيام."""
+    length = end_day - start_day
+    previous_end = start_day - timedelta(days=1)
+    return previous_end - length, previous_end
+
+
+# ===================================================================
+#   1. الاستعلامات التجميعية
+# ===================================================================
+
+def _group_items(group_field, start_day, end_day):
+    line_total = ExpressionWrapper(F('price_at_sale') * F('quantity'), output_field=DecimalField())
+    line_cost = ExpressionWrapper(F('cost_at_sale') * F('quantity'), output_field=DecimalField())
+    previous_start, _previous_end = previous_period(start_day, end_day)
+    current = Q(invoice__created_at__gte=business_day_start(start_day))
+    return (
+        InvoiceItem.objects.filter(**range_filter('invoice__created_at', previous_start, end_day))
+        .values(group_field)
+        .annotate(
+            total_quantity=Sum('quantity', filter=current),
+            total_revenue=Sum(line_total, filter=current),
+            total_cost=Sum(line_cost, filter=current),
+            previous_revenue=Sum(line_total, filter=~current),
+            previous_cost=Sum(line_cost, filter=~current),
+        )
+        .order_by()
+        .values_list(group_field, 'total_quantity', 'total_revenue', 'total_cost', 'previous_revenue', 'previous_cost')
+    )
+
+
+def _group_categories(start_day, end_day):
+    previous_start, _previous_end = previous_period(start_day, end_day)
+    current = Q(date__gte=start_day)
+    return (
+        DailySalesSummary.objects.filter(date__range=(previous_start, end_day))
+        .values('category_id')
+        .annotate(
+            total_quantity=Sum('quantity', filter=current),
+            total_revenue=Sum('revenue', filter=current),
+            total_cost=Sum('cost', filter=current),
+            previous_revenue=Sum('revenue', filter=~current),
+            previous_cost=Sum('cost', filter=~current),
+        )
+        .order_by()
+        .values_list('category_id', 'total_quantity', 'total_revenue', 'total_cost', 'previous_revenue', 'previous_cost')
+    )
+
+
+def _compute(grouping, start_day, end_day):
+    if grouping == 'category':
+        rows = _group_categories(start_day, end_day)
+    elif grouping == 'client':
+        rows = _group_items('invoice__client_id', start_day, end_day)
+    else:
+        rows = _group_items('product_id', start_day, end_day)
+    # المبالغ بالقروش كأعداد صحيحة (مثل عدادات store/dashboard.py): أسرع في الفرز والقراءة من الذاكرة المؤقتة.
+    # التقريب لا القطع، لأن SQLite يجمع الأعمدة العشرية كأعداد عائمة.
+    def cents(amount):
+        return int((amount or Decimal('0.00')).quantize(Decimal('0.01')) * 100)
+
+    return [
+        (key, quantity or 0, cents(revenue), cents(cost), cents(previous_revenue), cents(previous_cost))
+        for key, quantity, revenue, cost, previous_revenue, previous_cost in rows
+    ]
+
+
+def group_totals(grouping, start_day, end_day, refresh=False):
+    """
+    أرقام كل مجموعة في الفترة والفترة السابقة: قائمة صفوف (المفتاح، الكمية، المبيعات،
+    التكلفة، مبيعات الفترة السابقة، تكلفتها) والمبالغ بالقروش.
+    مفتاح العملاء None للبيع النقدي دون عميل. refresh=True يعيد الحساب ولو كانت النتيجة محفوظة.
+    """
+    key = f"{KEY_PREFIX}{grouping}:{start_day.isoformat()}:{end_day.isoformat()}"
+    rows = None if refresh else cache.get(key)
+    if rows is None:
+        rows = _compute(grouping, start_day, end_day)
+        timeout = HISTORY_TIMEOUT if end_day < business_date() else settings.PROFIT_ANALYTICS_CACHE_TIMEOUT
+        cache.set(key, rows, timeout)
+    return rows
+
+
+def warm_presets(today=None):
+    """
+    تعيد حساب الفترات الجاهزة لكل التجميعات وتحفظها، حتى لا ينتظر أول من يفتح الصفحة
+    الاستعلام التجميعي. تعيد عدد النتائج المحفوظة.
+    """
+    warmed = 0
+    for _label, start_day, end_day in preset_periods(today).values():
+        for grouping in GROUPINGS:
+            group_totals(grouping, start_day, end_day, refresh=True)
+            warmed += 1
+    return warmed
+
+
+# ===================================================================
+#   2. التقرير
+# ===================================================================
+
+# الصفوف المخزنة tuples بترتيب حقول GroupTotals (المبالغ بالقروش)، ولا تُحوَّل إلى GroupTotals إلا صفوف الصفحة المعروضة.
+SORT_KEYS = {
+    'profit': lambda row: row[2] - row[3],
+    'revenue': lambda row: row[2],
+    'quantity': lambda row: row[1],
+    # المجموعات دون ربح سابق (الجديدة) في آخر القائمة.
+    'growth': lambda row: (
+        (True, ((row[2] - row[3]) - (row[4] - row[5])) / abs(row[4] - row[5])) if row[4] != row[5] else (False, 0)
+    ),
+}
+
+
+def _as_group(row):
+    key, quantity, *amounts = row
+    return GroupTotals(key, quantity, *(from_cents(amount) for amount in amounts))
+
+
+def ranked_groups(grouping, start_day, end_day, sort='profit'):
+    """
+    تعيد (صفوف المجموعات مرتبة تنازلياً حسب sort، إجماليات الفترة كـ GroupTotals).
+    تشمل المجموعات التي باعت في الفترة السابقة فقط، حتى يظهر تراجعها.
+    الصفوف بلا أسماء؛ صفحة العرض تُحوَّل بـ page_groups.
+    """
+    rows = sorted(group_totals(grouping, start_day, end_day), key=SORT_KEYS.get(sort, SORT_KEYS['profit']), reverse=True)
+    totals = _as_group((None,) + tuple(sum(row[i] for row in rows) for i in range(1, 6)))
+    return rows, totals
+
+
+def page_groups(grouping, rows):
+    """تحوّل صفوف صفحة واحدة إلى GroupTotals مع اسم كل مجموعة باستعلام واحد."""
+    groups = [_as_group(row) for row in rows]
+    keys = [group.key for group in groups if group.key is not None]
+    if grouping == 'category':
+        names = dict(Category.objects.filter(pk__in=keys).values_list('pk', 'name'))
+    elif grouping == 'client':
+        names = dict(Client.objects.filter(pk__in=keys).values_list('pk', 'name'))
+    else:
+        names = {
+            pk: f"{name} ({sku})" if sku else name
+            for pk, name, sku in Product.objects.filter(pk__in=keys).values_list('pk', 'name', 'sku')
+        }
+    for group in groups:
+        if group.key is None:
+            group.name = _('زبون نقدي') if grouping == 'client' else _('بدون تصنيف')
+        else:
+            group.name = names.get(group.key, _('(محذوف)'))
+    return groups
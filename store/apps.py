@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        # تسجيل مستقبلات الإشارات (signals) الخاصة بكتالوج الذاكرة ومؤشرات لوحة التحكم.
+        from . import catalog, dashboard  # noqa: F401
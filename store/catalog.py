@@ -0,0 +1,240 @@
+# store/catalog.py
+
+"""
+## كتالوج المنتجات في الذاكرة ##
+نسخة مختصرة من الكتالوج (الاسم، الرمز، السعر، الكمية) داخل كل عامل، مع رقم
+إصدار مشتق من Product.updated_at وأوقات الحذف (ProductTombstone):
+
+- catalog_changes(since) تعيد المنتجات التي تغيرت والمعرّفات التي حُذفت بعد إصدار
+  معين، وتستخدمها واجهة /api/catalog/ لتزامن نقطة البيع في المتصفح بالتغييرات فقط.
+- حذف منتج يسجّل شاهداً (tombstone) في نفس معاملة الحذف، فيرفع رقم الإصدار
+  وتصل إزالة المنتج إلى كل العمال ونقاط البيع.
+- CatalogIndex يحتفظ بفهرس بادئات (قائمة كلمات مرتبة + bisect) وخريطة معرّفات،
+  ويُحدَّث فوراً عند حفظ منتج في نفس العملية، ومن قاعدة البيانات كل
+  CATALOG_REFRESH_INTERVAL ثانية (لالتقاط تعديلات العمال الآخرين).
+"""
+
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Max
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Product, ProductTombstone
+
+# نافذة تداخل عند طلب التغييرات: معاملة بدأت قبل إصدار ما وحُفظت بعده
+# قد تحمل وقت تعديل أقدم منه، لذا تُعاد آخر دقائق دائماً.
+CHANGES_OVERLAP = timedelta(minutes=5)
+
+CATALOG_FIELDS = ('id', 'name', 'sku', 'sale_price', 'stock_quantity', 'updated_at')
+
+
+# ===================================================================
+#   1. أرقام الإصدار والتغييرات
+# ===================================================================
+
+def to_version(value):
+    """تحوّل وقت التعديل إلى رقم إصدار صحيح (ميكروثانية منذ 1970)."""
+    if value is None:
+        return 0
+    return int(value.timestamp() * 1_000_000)
+
+
+def from_version(version):
+    return datetime.fromtimestamp(version / 1_000_000, tz=dt_timezone.utc)
+
+
+def catalog_version():
+    return max(
+        to_version(Product.objects.aggregate(version=Max('updated_at'))['version']),
+        to_version(ProductTombstone.objects.aggregate(version=Max('deleted_at'))['version']),
+    )
+
+
+def serialize_product(row):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'sku': row['sku'] or '',
+        'price': f"{Decimal(row['sale_price']):.2f}",
+        'stock': row['stock_quantity'],
+    }
+
+
+def catalog_changes(since=0):
+    """
+    تعيد (الإصدار الجديد، قائمة المنتجات المتغيرة، معرّفات المنتجات المحذوفة). إذا كان
+    since = 0 تُعاد كل المنتجات الموجودة ولا حاجة لقائمة المحذوفات.
+    المنتجات التي نفدت كميتها تُعاد أيضاً حتى تُخفيها نقطة البيع.
+    """
+    queryset = Product.objects.order_by()
+    deleted = []
+    version = since
+    if since:
+        changed_after = from_version(since) - CHANGES_OVERLAP
+        queryset = queryset.filter(updated_at__gt=changed_after)
+        for product_id, deleted_at in ProductTombstone.objects.filter(
+            deleted_at__gt=changed_after,
+        ).values_list('product_id', 'deleted_at'):
+            version = max(version, to_version(deleted_at))
+            deleted.append(product_id)
+    products = []
+    for row in queryset.values(*CATALOG_FIELDS).iterator(chunk_size=2000):
+        version = max(version, to_version(row['updated_at']))
+        products.append(serialize_product(row))
+    return version, products, deleted
+
+
+# ===================================================================
+#   2. الفهرس داخل الذاكرة
+# ===================================================================
+
+def _entry_tokens(entry):
+    words = entry['name'].lower().split()
+    if entry['sku']:
+        words.append(entry['sku'].lower())
+    return set(words)
+
+
+class CatalogIndex:
+    """فهرس بحث بالبادئات داخل العملية (لكل عامل gunicorn نسخته)."""
+
+    # أقصى عدد من المرشحين يُجمع من نطاق بادئة واحدة قبل التصفية والترتيب.
+    MAX_CANDIDATES = 5000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._tokens = []  # قائمة مرتبة من (الكلمة، المعرّف)
+        self.version = 0
+        self.loaded = False
+        self._checked_at = 0.0
+
+    # --- التحميل والتحديث ---
+
+    def load(self):
+        version, products, _deleted = catalog_changes(0)
+        with self._lock:
+            self._by_id = {entry['id']: entry for entry in products}
+            self._tokens = sorted(
+                (token, entry['id']) for entry in products for token in _entry_tokens(entry)
+            )
+            self.version = version
+            self.loaded = True
+            self._checked_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """تحمّل الكتالوج عند أول استخدام، ثم تجلب التغييرات كل فترة محددة."""
+        if not self.loaded:
+            self.load()
+            return
+        interval = getattr(settings, 'CATALOG_REFRESH_INTERVAL', 5)
+        if time.monotonic() - self._checked_at < interval:
+            return
+        self._checked_at = time.monotonic()
+        version, products, deleted = catalog_changes(self.version)
+        with self._lock:
+            for entry in products:
+                self._apply(entry)
+            for product_id in deleted:
+                self._discard(product_id)
+            self.version = max(self.version, version)
+
+    def apply(self, product):
+        """تحديث فوري لمنتج حُفظ في نفس العملية."""
+        if not self.loaded:
+            return
+        entry = serialize_product({field: getattr(product, field) for field in CATALOG_FIELDS})
+        with self._lock:
+            self._apply(entry)
+
+    def remove(self, product_id):
+        if not self.loaded:
+            return
+        with self._lock:
+            self._discard(product_id)
+
+    def _discard(self, product_id):
+        old = self._by_id.pop(product_id, None)
+        if old:
+            self._remove_tokens(old)
+
+    def _apply(self, entry):
+        old = self._by_id.get(entry['id'])
+        if old and _entry_tokens(old) == _entry_tokens(entry):
+            self._by_id[entry['id']] = entry
+            return
+        if old:
+            self._remove_tokens(old)
+        self._by_id[entry['id']] = entry
+        for token in _entry_tokens(entry):
+            bisect.insort(self._tokens, (token, entry['id']))
+
+    def _remove_tokens(self, entry):
+        for token in _entry_tokens(entry):
+            position = bisect.bisect_left(self._tokens, (token, entry['id']))
+            if position < len(self._tokens) and self._tokens[position] == (token, entry['id']):
+                del self._tokens[position]
+
+    # --- البحث ---
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        position = bisect.bisect_left(self._tokens, (prefix,))
+        while position < len(self._tokens) and len(ids) < self.MAX_CANDIDATES:
+            token, product_id = self._tokens[position]
+            if not token.startswith(prefix):
+                break
+            ids.add(product_id)
+            position += 1
+        return ids
+
+    def search(self, query, limit=10):
+        """
+        تعيد عناصر الكتالوج المتوفرة التي تبدأ إحدى كلماتها بكل كلمة من كلمات البحث،
+        مع تقديم الرمز المطابق تماماً ثم الأسماء التي تبدأ بالنص كاملاً.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        # الكلمة الأطول هي الأكثر تمييزاً، فتُستخدم لجلب المرشحين ثم تُطابق بقية الكلمات عليهم.
+        words = sorted(query.split(), key=len, reverse=True)
+        with self._lock:
+            entries = []
+            for product_id in self._prefix_ids(words[0]):
+                entry = self._by_id[product_id]
+                if entry['stock'] <= 0:
+                    continue
+                tokens = _entry_tokens(entry)
+                if all(any(token.startswith(word) for token in tokens) for word in words[1:]):
+                    entries.append(entry)
+
+        def rank(entry):
+            if entry['sku'].lower() == query:
+                return (0, entry['name'])
+            if entry['name'].lower().startswith(query):
+                return (1, entry['name'])
+            return (2, entry['name'])
+
+        return sorted(entries, key=rank)[:limit]
+
+
+catalog_index = CatalogIndex()
+
+
+@receiver(post_save, sender=Product, dispatch_uid='catalog_index_product_saved')
+def _product_saved(sender, instance, **kwargs):
+    catalog_index.apply(instance)
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='catalog_index_product_deleted')
+def _product_deleted(sender, instance, **kwargs):
+    # داخل معاملة الحذف: إذا أُلغي الحذف لا يبقى شاهد.
+    ProductTombstone.objects.create(product_id=instance.pk, deleted_at=timezone.now())
+    catalog_index.remove(instance.pk)
@@ -0,0 +1,246 @@
+# store/checkout.py
+
+"""
+## محرك إتمام البيع ##
+ينشئ الفاتورة وبنودها ويخصم المخزون ويحدّث دين العميل داخل معاملة واحدة،
+بطريقة آمنة عند تشغيل عدة عمال (gunicorn) على نفس قاعدة البيانات:
+
+- يتم خصم المخزون بتحديث شرطي واحد لكل منتج
+  (UPDATE ... SET stock = stock - n WHERE id = ? AND stock >= n)،
+  فلا يمكن لنقطتي بيع أن تبيعا آخر قطعة مرتين، ولا تضيع التحديثات.
+- تُحدَّث المنتجات بترتيب تصاعدي حسب المعرّف لتجنب الجمود (deadlock)
+  بين معاملتين تبيعان نفس المنتجات بترتيب مختلف.
+- يُحدَّث دين العميل بتعبير F() داخل قاعدة البيانات بدلاً من القراءة ثم الحفظ،
+  وتُسجَّل الفاتورة في كشف حسابه مع الرصيد بعدها (store/ledger.py)
+  ويُحفظ المتبقي منها لتقرير أعمار الديون (store/aging.py).
+- كل خصم من المخزون يُسجَّل في سجل حركات المخزون (store/inventory.py).
+- الخادم هو مصدر الأسعار: يُحسب الإجمالي من سعر البيع المسجل للمنتج،
+  ويُرفض الطلب إذا أرسل المتصفح سعراً مختلفاً عنه.
+"""
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .aging import apply_credit_to_invoice
+from .catalog import catalog_index
+from .dashboard import schedule_debt_change_in_dashboard, schedule_sale_in_dashboard
+from .inventory import record_sale
+from .ledger import post_entry
+from .models import Product, Client, Invoice, InvoiceItem, LedgerEntry
+from .periods import business_date
+from .reports import schedule_sale_in_summary
+from .telegram_bot import queue_telegram_message, format_low_stock_alert, format_new_debt_alert
+
+
+class InsufficientStockError(ValueError):
+    """الكمية المطلوبة أكبر من المتوفر في المخزن."""
+
+
+class PriceMismatchError(ValueError):
+    """السعر المرسل من نقطة البيع لا يطابق سعر البيع الحالي للمنتج."""
+
+
+# ===================================================================
+#   1. مرحلة التسعير
+# ===================================================================
+
+def merge_cart_lines(cart_items):
+    """
+    تحوّل عناصر السلة إلى قاموس {معرّف المنتج: [الكمية، السعر المرسل]}،
+    مع دمج الأسطر المكررة لنفس المنتج في سطر واحد.
+    السعر المرسل اختياري، ويُستخدم فقط للتحقق من عدم التلاعب.
+    """
+    lines = {}
+    for item in cart_items:
+        product_id = int(item['id'])
+        quantity = int(item['quantity'])
+        if quantity <= 0:
+            raise ValueError("الكمية يجب أن تكون أكبر من صفر.")
+        client_price = Decimal(str(item['price'])) if item.get('price') is not None else None
+        line = lines.get(product_id)
+        if line is None:
+            lines[product_id] = [quantity, client_price]
+            continue
+        if client_price is not None and line[1] is not None and client_price != line[1]:
+            raise PriceMismatchError("أسعار مختلفة لنفس المنتج في السلة.")
+        line[0] += quantity
+        if line[1] is None:
+            line[1] = client_price
+    return lines
+
+
+def price_lines(lines, products):
+    """
+    تحسب بنود الفاتورة والإجمالي في مرور واحد اعتماداً على أسعار المنتجات
+    المقروءة من قاعدة البيانات. تعيد (الإجمالي، [(المنتج، الكمية، السعر)]).
+    """
+    total_amount = Decimal('0.00')
+    priced = []
+    for product_id, (quantity, client_price) in lines.items():
+        product = products[product_id]
+        price = product.sale_price
+        if client_price is not None and client_price != price:
+            raise PriceMismatchError(f"تغير سعر المنتج: {product.name}. يرجى تحديث السلة.")
+        total_amount += price * quantity
+        priced.append((product, quantity, price))
+    return total_amount, priced
+
+
+# ===================================================================
+#   2. إنشاء الفاتورة
+# ===================================================================
+
+def create_invoice(cart_items, payment_method, client=None, idempotency_key=None):
+    """
+    تنشئ فاتورة كاملة من عناصر السلة وتعيد كائن الفاتورة.
+
+    Args:
+        cart_items (list): عناصر بالشكل {'id': ..., 'quantity': ..., 'price': ...}.
+        payment_method (str): إحدى قيم Invoice.PaymentMethod.
+        client (Client | None): العميل في حالة البيع بالدين.
+        idempotency_key (str | None): مفتاح العملية من نقطة البيع (فريد في جدول الفواتير).
+
+    Raises:
+        Product.DoesNotExist: إذا كان أحد المنتجات غير موجود.
+        InsufficientStockError: إذا لم تكفِ الكمية المتوفرة.
+        PriceMismatchError: إذا لم يطابق السعر المرسل سعر البيع الحالي.
+        ValueError: إذا كانت بيانات السلة غير صالحة.
+    """
+    lines = merge_cart_lines(cart_items)
+
+    now = timezone.now()
+    with transaction.atomic():
+        # خصم شرطي بترتيب ثابت للمعرّفات: إما أن ينجح الخصم كاملاً أو لا يتغير شيء.
+        for product_id in sorted(lines):
+            quantity = lines[product_id][0]
+            updated = Product.objects.filter(
+                pk=product_id, stock_quantity__gte=quantity
+            ).update(stock_quantity=F('stock_quantity') - quantity, updated_at=now)
+            if not updated:
+                product = Product.objects.filter(pk=product_id).only('name').first()
+                if product is None:
+                    raise Product.DoesNotExist(f"المنتج برقم ID {product_id} غير موجود.")
+                raise InsufficientStockError(f"كمية غير كافية للمنتج: {product.name}")
+
+        # القيم المقروءة هنا هي القيم بعد الخصم، والصفوف مقفلة لهذه المعاملة حتى نهايتها،
+        # لذا فهي أيضاً جدول الأسعار المعتمد لهذه الفاتورة.
+        products = Product.objects.in_bulk(list(lines))
+        total_amount, priced = price_lines(lines, products)
+
+        invoice = Invoice.objects.create(
+            client=client, total_amount=total_amount, payment_method=payment_method,
+            idempotency_key=idempotency_key, outstanding_amount=total_amount if client else Decimal('0.00'),
+        )
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(
+                invoice=invoice, product=product, quantity=quantity,
+                price_at_sale=price, cost_at_sale=product.purchase_price,
+            )
+            for product, quantity, price in priced
+        ])
+        record_sale(invoice, priced)
+        schedule_sale_in_summary(business_date(invoice.created_at), priced)
+        schedule_sale_in_dashboard(invoice)
+        # update() لا يرسل post_save، لذا يُحدَّث كتالوج الذاكرة في هذا العامل يدوياً.
+        transaction.on_commit(lambda: [catalog_index.apply(product) for product, _q, _p in priced])
+
+        newly_low_stock = [
+            product for product, quantity, _price in priced
+            if product.is_low_on_stock and product.stock_quantity + quantity > product.reorder_level
+        ]
+        # الإشعارات تُرسل من الخلفية بعد نجاح المعاملة فقط، فلا ينتظر البيع استجابة تليجرام.
+        if newly_low_stock:
+            queue_telegram_message(format_low_stock_alert(newly_low_stock))
+
+        if client:
+            entry = post_entry(client, LedgerEntry.Kind.INVOICE, total_amount, invoice=invoice, created_at=invoice.created_at)
+            schedule_debt_change_in_dashboard(entry)
+            apply_credit_to_invoice(client, invoice)
+            queue_telegram_message(format_new_debt_alert(client, total_amount))
+
+    return invoice
+
+
+def create_invoice_once(idempotency_key, cart_items, payment_method, client=None):
+    """
+    مثل create_invoice لكن مرة واحدة لكل مفتاح: إذا سبق تسجيل فاتورة بنفس المفتاح
+    تُعاد كما هي دون خصم مخزون أو دين جديد. تعيد (الفاتورة، هل أُنشئت الآن).
+    """
+    existing = Invoice.objects.filter(idempotency_key=idempotency_key).first()
+    if existing:
+        return existing, False
+    try:
+        return create_invoice(cart_items, payment_method, client, idempotency_key=idempotency_key), True
+    except IntegrityError:
+        # طلب متزامن بنفس المفتاح سبقنا إلى الإدخال؛ القيد الفريد ألغى معاملتنا كاملة.
+        existing = Invoice.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is None:
+            raise
+        return existing, False
+
+
+# ===================================================================
+#   3. مزامنة مبيعات نقطة البيع غير المتصلة
+# ===================================================================
+
+# أقصى عدد من الفواتير في طلب مزامنة واحد (معاملة واحدة تُقفل الكتابة طوال مدتها على SQLite).
+MAX_SYNC_BATCH = 50
+
+
+def sync_invoices(sales):
+    """
+    تسجل دفعة من المبيعات المحفوظة في نقطة البيع أثناء انقطاع الاتصال، داخل معاملة واحدة
+    مع نقطة حفظ (savepoint) لكل فاتورة، فلا يلغي فشل فاتورة ما قبلها أو ما بعدها.
+
+    Args:
+        sales (list): عناصر بالشكل {'idempotency_key', 'cart', 'payment_method', 'client_id'}.
+
+    Returns:
+        list: نتيجة لكل عملية بنفس الترتيب:
+            {'idempotency_key', 'status': 'created' | 'duplicate' | 'error', 'invoice_id', 'message'}.
+    """
+    keys = [sale.get('idempotency_key') for sale in sales]
+    # استعلام واحد لكل المفاتيح المسجلة سابقاً بدلاً من استعلام لكل عملية.
+    known = dict(Invoice.objects.filter(idempotency_key__in=[k for k in keys if k]).values_list('idempotency_key', 'id'))
+    client_ids = {sale.get('client_id') for sale in sales if sale.get('client_id')}
+    clients = Client.objects.in_bulk([int(pk) for pk in client_ids if str(pk).isdigit()])
+
+    results = []
+    with transaction.atomic():
+        for sale in sales:
+            key = sale.get('idempotency_key')
+            result = {'idempotency_key': key, 'status': 'error', 'invoice_id': None, 'message': ''}
+            results.append(result)
+            if not key or len(str(key)) > 64:
+                result['message'] = "مفتاح العملية مفقود أو غير صالح."
+                continue
+            if key in known:
+                result.update(status='duplicate', invoice_id=known[key])
+                continue
+            if not sale.get('cart'):
+                result['message'] = "السلة فارغة."
+                continue
+            payment_method = sale.get('payment_method')
+            client = None
+            if payment_method == Invoice.PaymentMethod.CREDIT:
+                client = clients.get(int(sale['client_id'])) if str(sale.get('client_id') or '').isdigit() else None
+                if client is None:
+                    result['message'] = "العميل غير موجود."
+                    continue
+            elif payment_method != Invoice.PaymentMethod.CASH:
+                result['message'] = "طريقة دفع غير صالحة."
+                continue
+            try:
+                # create_invoice تفتح نقطة حفظ داخل معاملة الدفعة؛ عند الخطأ تُلغى هذه الفاتورة وحدها.
+                invoice, created = create_invoice_once(key, sale['cart'], payment_method, client)
+            except Product.DoesNotExist:
+                result['message'] = "عنصر مطلوب غير موجود."
+            except (KeyError, TypeError, ValueError, ArithmeticError) as error:
+                result['message'] = str(error) if isinstance(error, ValueError) else "بيانات السلة غير صالحة."
+            else:
+                known[key] = invoice.id
+                result.update(status='created' if created else 'duplicate', invoice_id=invoice.id)
+    return results
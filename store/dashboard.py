@@ -0,0 +1,183 @@
+# store/dashboard.py
+
+"""
+## مؤشرات لوحة التحكم ##
+لقطة من مؤشرات الصفحة الرئيسية محفوظة في ذاكرة Django المؤقتة (CACHES)،
+لأن كل نقطة بيع تحدّث هذه الصفحة باستمرار:
+
+- العدادات (مبيعات اليوم، عدد فواتيره، إجمالي الديون) تُحفظ كأعداد صحيحة بالقروش
+  وتُحدَّث بـ incr/decr بعد نجاح معاملة البيع أو الدفع.
+- إجمالي الديون هو مجموع الأرصدة الموجبة فقط (رصيد العميل الدائن لا يُنقص ديون غيره)،
+  لذا تضيف كل حركة في كشف الحساب تغيّر الجزء الموجب من رصيد عميلها، لا مبلغها كاملاً.
+- القوائم (أكبر المدينين، النواقص، الملاحظات) تُحذف عند الأحداث التي تغيّرها
+  وتُعاد قراءتها عند أول طلب بعدها.
+- أي مفتاح غير موجود يُحسب من قاعدة البيانات. كل المفاتيح تنتهي بعد
+  DASHBOARD_CACHE_TIMEOUT ثانية، وهذا هو أقصى تأخر ممكن لأي رقم عن قاعدة البيانات
+  (مثلاً عند استخدام ذاكرة محلية لكل عامل بدلاً من Redis مشترك).
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Product, Client, Invoice, LedgerEntry, Note
+from .periods import business_date, range_filter
+
+KEY_PREFIX = 'dashboard:v1:'
+TOP_LIST_SIZE = 5
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+
+
+def _key(name, day=None):
+    return f"{KEY_PREFIX}{name}:{day.isoformat()}" if day else f"{KEY_PREFIX}{name}"
+
+
+def to_cents(amount):
+    return int((amount or Decimal('0.00')) * 100)
+
+
+def from_cents(cents):
+    return Decimal(cents) / 100
+
+
+def _cached(key, compute):
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, _timeout())
+    return value
+
+
+def _increment(key, delta):
+    """يزيد عداداً موجوداً؛ إذا لم يكن موجوداً يُترك ليُحسب من قاعدة البيانات عند الطلب."""
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass
+
+
+# ===================================================================
+#   1. الحساب من قاعدة البيانات (عند عدم وجود المفتاح)
+# ===================================================================
+
+def _compute_day_sales(day):
+    totals = Invoice.objects.filter(**range_filter('created_at', day)).aggregate(total=Sum('total_amount'))
+    return to_cents(totals['total'])
+
+
+def _compute_day_count(day):
+    return Invoice.objects.filter(**range_filter('created_at', day)).count()
+
+
+def _compute_debt_total():
+    return to_cents(Client.objects.filter(total_debt__gt=0).aggregate(total=Sum('total_debt'))['total'])
+
+
+def _compute_top_debtors():
+    return list(
+        Client.objects.filter(total_debt__gt=0).order_by('-total_debt')
+        .values('id', 'name', 'total_debt')[:TOP_LIST_SIZE]
+    )
+
+
+def _compute_low_stock():
+    return list(
+        Product.objects.low_stock().order_by('stock_quantity')
+        .values('id', 'name', 'stock_quantity', 'reorder_level')[:TOP_LIST_SIZE]
+    )
+
+
+def _compute_notes():
+    return list(Note.objects.order_by('-created_at').values('id', 'content', 'is_important', 'created_at')[:TOP_LIST_SIZE])
+
+
+# ===================================================================
+#   2. قراءة اللقطة
+# ===================================================================
+
+def dashboard_metrics():
+    """تعيد قاموس مؤشرات لوحة التحكم بنفس أسماء متغيرات القالب."""
+    today = business_date()
+    return {
+        'daily_sales_total': from_cents(_cached(_key('sales', today), lambda: _compute_day_sales(today))),
+        'daily_invoice_count': _cached(_key('count', today), lambda: _compute_day_count(today)),
+        'total_debt_sum': from_cents(_cached(_key('debt'), _compute_debt_total)),
+        'top_debtors': _cached(_key('top_debtors'), _compute_top_debtors),
+        'top_low_stock': _cached(_key('low_stock'), _compute_low_stock),
+        'recent_notes': _cached(_key('notes'), _compute_notes),
+    }
+
+
+def clear_dashboard_cache():
+    today = business_date()
+    cache.delete_many([
+        _key('sales', today), _key('count', today), _key('debt'),
+        _key('top_debtors'), _key('low_stock'), _key('notes'),
+    ])
+
+
+# ===================================================================
+#   3. الأحداث
+# ===================================================================
+
+def _apply_sale(day, total_amount):
+    _increment(_key('sales', day), to_cents(total_amount))
+    _increment(_key('count', day), 1)
+    # كل بيع يغيّر الكميات، وقد يدخل منتج في قائمة النواقص أو يتغير ترتيبها.
+    cache.delete(_key('low_stock'))
+
+
+def schedule_sale_in_dashboard(invoice):
+    """تُحدّث العدادات بعد نجاح معاملة البيع فقط، فلا تُحتسب فاتورة أُلغيت معاملتها."""
+    day = business_date(invoice.created_at)
+    transaction.on_commit(lambda: _apply_sale(day, invoice.total_amount), robust=True)
+
+
+def positive_debt_delta(entry):
+    """
+    تغيّر مساهمة العميل في إجمالي الديون بسبب حركة كشف الحساب entry:
+    max(الرصيد بعدها، 0) - max(الرصيد قبلها، 0)، بنفس تعريف _compute_debt_total.
+    """
+    delta = entry.amount if entry.kind == LedgerEntry.Kind.INVOICE else -entry.amount
+    before = entry.balance_after - delta
+    return max(entry.balance_after, Decimal('0.00')) - max(before, Decimal('0.00'))
+
+
+def _apply_debt_change(delta):
+    _increment(_key('debt'), to_cents(delta))
+    cache.delete(_key('top_debtors'))
+
+
+def schedule_debt_change_in_dashboard(entry):
+    """تُستدعى بعد post_entry (فاتورة آجلة أو دفعة) داخل نفس المعاملة."""
+    delta = positive_debt_delta(entry)
+    transaction.on_commit(lambda: _apply_debt_change(delta), robust=True)
+
+
+@receiver(post_save, sender=Product, dispatch_uid='dashboard_product_saved')
+@receiver(post_delete, sender=Product, dispatch_uid='dashboard_product_deleted')
+def _product_changed(sender, **kwargs):
+    cache.delete(_key('low_stock'))
+
+
+@receiver(post_save, sender=Client, dispatch_uid='dashboard_client_saved')
+@receiver(post_delete, sender=Client, dispatch_uid='dashboard_client_deleted')
+def _client_changed(sender, **kwargs):
+    # تعديل العميل من الأدمن قد يغيّر دينه مباشرة، فيُعاد حساب المجموع والقائمة.
+    cache.delete_many([_key('debt'), _key('top_debtors')])
+
+
+@receiver(post_save, sender=Note, dispatch_uid='dashboard_note_saved')
+@receiver(post_delete, sender=Note, dispatch_uid='dashboard_note_deleted')
+def _note_changed(sender, **kwargs):
+    cache.delete(_key('notes'))
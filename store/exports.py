@@ -0,0 +1,132 @@
+# store/exports.py
+
+"""
+## تصدير التقارير (CSV) ##
+كل تصدير هو مولّد صفوف يقرأ من قاعدة البيانات بـ .iterator(chunk_size=...)
+(مؤشر من جهة الخادم على PostgreSQL)، ويُكتب سطراً سطراً في StreamingHttpResponse.
+لذا يبدأ إرسال الملف فوراً وتبقى الذاكرة ثابتة مهما كبر حجم التقرير.
+"""
+
+import csv
+
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from . import aging
+from .models import Product, InvoiceItem
+from .periods import range_filter, shop_timezone
+
+CHUNK_SIZE = 2000
+
+
+def _local_time(moment):
+    return timezone.localtime(moment, shop_timezone()).isoformat(sep=' ', timespec='seconds')
+
+
+class Echo:
+    """كائن بواجهة الملف يعيد ما يُكتب فيه، حتى يُستخدم csv.writer داخل مولّد."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(filename, header, rows):
+    """
+    تعيد استجابة CSV متدفقة. يُكتب BOM في البداية حتى يفتح Excel الملف بترميز UTF-8
+    (كما في التصدير السابق).
+    """
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield '\ufeff'
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ===================================================================
+#   مولدات الصفوف
+# ===================================================================
+
+def low_stock_rows():
+    products = Product.objects.low_stock().annotate(
+        deficit=F('reorder_level') - F('stock_quantity')
+    ).order_by('-deficit').values_list('name', 'stock_quantity', 'reorder_level', 'deficit')
+    return products.iterator(chunk_size=CHUNK_SIZE)
+
+
+def invoice_line_rows(start_day, end_day):
+    items = InvoiceItem.objects.filter(
+        **range_filter('invoice__created_at', start_day, end_day)
+    ).order_by('invoice__created_at', 'id').values_list(
+        'invoice_id', 'invoice__created_at', 'invoice__payment_method', 'invoice__client__name',
+        'product__name', 'product__sku', 'quantity', 'price_at_sale', 'cost_at_sale',
+    )
+    for invoice_id, created_at, method, client_name, name, sku, quantity, price, cost in items.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            invoice_id, _local_time(created_at), method, client_name or '',
+            name, sku or '', quantity, price, cost, price * quantity,
+        ]
+
+
+def client_statement_rows(client):
+    entries = client.ledger_entries.order_by('id').values_list(
+        'created_at', 'kind', 'description', 'amount', 'balance_after'
+    )
+    for created_at, kind, description, amount, balance_after in entries.iterator(chunk_size=CHUNK_SIZE):
+        yield [_local_time(created_at), kind, description, amount, balance_after]
+
+
+def product_profit_rows(start_day, end_day):
+    line_total = ExpressionWrapper(F('price_at_sale') * F('quantity'), output_field=DecimalField())
+    line_cost = ExpressionWrapper(F('cost_at_sale') * F('quantity'), output_field=DecimalField())
+    rows = InvoiceItem.objects.filter(
+        **range_filter('invoice__created_at', start_day, end_day)
+    ).values('product_id', 'product__name', 'product__sku').annotate(
+        total_quantity=Sum('quantity'), revenue=Sum(line_total), cost=Sum(line_cost),
+    ).order_by('product__name')
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield [
+            row['product__name'], row['product__sku'] or '', row['total_quantity'],
+            row['revenue'], row['cost'], row['revenue'] - row['cost'],
+        ]
+
+
+def debt_aging_rows():
+    names = [name for name, _label, _days in aging.BUCKETS]
+    for row in aging.client_aging().iterator(chunk_size=CHUNK_SIZE):
+        # SQLite يجمع الأعمدة العشرية كأعداد عائمة، فتُقرَّب المبالغ إلى قرشين.
+        yield [row['client__name'], *(round(row[name], 2) for name in names), round(row['total'], 2), _local_time(row['oldest'])]
+
+
+# ===================================================================
+#   عناوين الأعمدة
+# ===================================================================
+
+def low_stock_header():
+    return [_('اسم المنتج'), _('الكمية المتبقية'), _('حد إعادة الطلب'), _('مقدار النقص')]
+
+
+def invoice_line_header():
+    return [
+        _('رقم الفاتورة'), _('التاريخ'), _('طريقة الدفع'), _('العميل'), _('القطعة'), _('الرمز'),
+        _('الكمية'), _('سعر البيع'), _('التكلفة'), _('الإجمالي'),
+    ]
+
+
+def client_statement_header():
+    return [_('التاريخ'), _('نوع الحركة'), _('البيان'), _('المبلغ'), _('الرصيد بعد الحركة')]
+
+
+def product_profit_header():
+    return [_('القطعة'), _('الرمز'), _('الكمية المباعة'), _('المبيعات'), _('التكلفة'), _('الربح')]
+
+
+def debt_aging_header():
+    return [_('العميل'), *(label for _name, label, _days in aging.BUCKETS), _('الإجمالي'), _('أقدم فاتورة مفتوحة')]
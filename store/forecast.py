@@ -0,0 +1,188 @@
+# store/forecast.py
+
+"""
+## خطة إعادة الطلب ##
+تحسب سرعة بيع كل منتج من سجل المبيعات الفعلي، ومنها حد الطلب وكمية الطلب المقترحة:
+
+- استعلام تجميع واحد يعيد الكمية المباعة لكل (منتج، يوم عمل) خلال فترة السجل.
+- الحساب يتم بـ NumPy على كل المنتجات معاً دون مصفوفة (منتج × يوم) كاملة:
+  كل مجموع هو np.bincount على رقم المنتج بأوزان مناسبة لعمر اليوم، فتبقى الذاكرة
+  بحجم عدد الأسطر المجمعة وليس (عدد المنتجات × عدد الأيام).
+- السرعة = متوسط أسي (نصف عمر half_life يوم) مع تصحيح لبداية بيع كل منتج،
+  والتذبذب = الانحراف المعياري للبيع اليومي في آخر window يوم.
+- حد الطلب = السرعة × مدة التوريد + مخزون أمان (z × التذبذب × √مدة التوريد).
+  وعند الوصول إليه تُقترح كمية تكفي حتى التوريد التالي (مدة التوريد + فترة المراجعة).
+
+النتائج تُكتب في ReorderSuggestion (صف لكل منتج) ويقرؤها تقرير النواقص وصفحة خطة الطلب.
+لا يحتاج الموقع نفسه NumPy؛ فقط الأمر compute_reorder_plan.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import InvoiceItem, Product, ReorderSuggestion
+from .periods import business_date, business_date_expression, range_filter
+
+WRITE_BATCH_SIZE = 5000
+
+
+@dataclass
+class PlanSettings:
+    """معاملات الحساب؛ ما لم يُحدَّد من مدد التوريد والمراجعة ومعامل الأمان يؤخذ من الإعدادات."""
+    history_days: int = 730
+    window: int = 28
+    half_life: float = 14.0
+    lead_time: float = None
+    review_days: float = None
+    service_z: float = None
+
+    def __post_init__(self):
+        if self.lead_time is None:
+            self.lead_time = settings.REORDER_LEAD_TIME_DAYS
+        if self.review_days is None:
+            self.review_days = settings.REORDER_REVIEW_DAYS
+        if self.service_z is None:
+            self.service_z = settings.REORDER_SERVICE_Z
+
+
+# ===================================================================
+#   1. قراءة المبيعات
+# ===================================================================
+
+def daily_sales(start_day, end_day):
+    """
+    الكمية المباعة لكل (منتج، يوم عمل) بين اليومين (شاملاً) في استعلام واحد.
+    تعيد ثلاث مصفوفات: معرّفات المنتجات، رقم اليوم من بداية الفترة، والكمية.
+    """
+    rows = (
+        InvoiceItem.objects.filter(**range_filter('invoice__created_at', start_day, end_day))
+        .annotate(day=business_date_expression('invoice__created_at'))
+        .values('product_id', 'day')
+        .annotate(quantity=Sum('quantity'))
+        .order_by()
+        .values_list('product_id', 'day', 'quantity')
+    )
+    origin = start_day.toordinal()
+    product_ids, days, quantities = [], [], []
+    for product_id, day, quantity in rows.iterator(chunk_size=20000):
+        product_ids.append(product_id)
+        days.append(day.toordinal() - origin)
+        quantities.append(quantity)
+    return (
+        np.array(product_ids, dtype=np.int64),
+        np.array(days, dtype=np.int32),
+        np.array(quantities, dtype=np.float64),
+    )
+
+
+# ===================================================================
+#   2. الحساب
+# ===================================================================
+
+def compute_plan(product_ids, stock, sale_products, sale_days, sale_quantities, days, options):
+    """
+    تحسب الخطة لكل المنتجات معاً. product_ids مرتبة تصاعدياً و stock بنفس ترتيبها،
+    و days عدد أيام الفترة (آخر يوم رقمه days - 1). تعيد قاموس مصفوفات بنفس ترتيب المنتجات.
+    """
+    count = len(product_ids)
+    if not count:
+        sale_products, sale_days, sale_quantities = sale_products[:0], sale_days[:0], sale_quantities[:0]
+    index = np.minimum(np.searchsorted(product_ids, sale_products), max(count - 1, 0))
+    # أسطر منتج حُذف بين الاستعلامين لا تطابق أي صف فتُهمل.
+    known = product_ids[index] == sale_products
+    index, sale_days, sale_quantities = index[known], sale_days[known], sale_quantities[known]
+    age = (days - 1) - sale_days
+
+    # المتوسط الأسي في آخر يوم: alpha × Σ (1 - alpha)^العمر × الكمية.
+    alpha = 1 - 0.5 ** (1 / options.half_life)
+    smoothed = np.bincount(index, weights=sale_quantities * alpha * (1 - alpha) ** age, minlength=count)
+    # تصحيح البداية: منتج بدأ بيعه قبل أيام قليلة لا يُحسب كأن قبله أشهراً بلا مبيعات.
+    first_day = np.full(count, days, dtype=np.int64)
+    np.minimum.at(first_day, index, sale_days)
+    span = days - first_day
+    correction = 1 - (1 - alpha) ** span
+    smoothed = np.divide(smoothed, correction, out=np.zeros(count), where=correction > 0)
+
+    recent = age < options.window
+    window_sum = np.bincount(index[recent], weights=sale_quantities[recent], minlength=count)
+    window_squares = np.bincount(index[recent], weights=sale_quantities[recent] ** 2, minlength=count)
+    average = window_sum / options.window
+    deviation = np.sqrt(np.maximum(window_squares / options.window - average ** 2, 0))
+
+    safety_stock = options.service_z * deviation * np.sqrt(options.lead_time)
+    reorder_level = np.ceil(smoothed * options.lead_time + safety_stock)
+    order_up_to = np.ceil(smoothed * (options.lead_time + options.review_days) + safety_stock)
+    order_quantity = np.where(stock <= reorder_level, np.maximum(order_up_to - stock, 0), 0)
+    days_of_cover = np.divide(stock, smoothed, out=np.full(count, np.nan), where=smoothed > 0)
+
+    return {
+        'average_daily_sales': average,
+        'smoothed_daily_sales': smoothed,
+        'days_of_cover': days_of_cover,
+        'reorder_level': reorder_level.astype(np.int64),
+        'order_quantity': order_quantity.astype(np.int64),
+    }
+
+
+# ===================================================================
+#   3. التشغيل والحفظ
+# ===================================================================
+
+def save_plan(product_ids, plan, computed_at):
+    columns = [plan[name].tolist() for name in (
+        'average_daily_sales', 'smoothed_daily_sales', 'days_of_cover', 'reorder_level', 'order_quantity',
+    )]
+    suggestions = [
+        ReorderSuggestion(
+            product_id=product_id, average_daily_sales=round(average, 4), smoothed_daily_sales=round(smoothed, 4),
+            days_of_cover=None if cover != cover else round(cover, 1),  # NaN = لا مبيعات
+            reorder_level=level, order_quantity=quantity, computed_at=computed_at,
+        )
+        for product_id, average, smoothed, cover, level, quantity in zip(product_ids.tolist(), *columns)
+    ]
+    with transaction.atomic():
+        ReorderSuggestion.objects.bulk_create(
+            suggestions,
+            batch_size=WRITE_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=[
+                'average_daily_sales', 'smoothed_daily_sales', 'days_of_cover',
+                'reorder_level', 'order_quantity', 'computed_at',
+            ],
+        )
+
+
+def build_reorder_plan(options=None, save=True):
+    """
+    تقرأ المبيعات والكميات وتحسب الخطة وتحفظها. تعيد (معرّفات المنتجات، الخطة، أزمنة المراحل بالثواني).
+    """
+    options = options or PlanSettings()
+    timings = {}
+    started = time.perf_counter()
+
+    end_day = business_date()
+    start_day = end_day - timedelta(days=options.history_days - 1)
+    sale_products, sale_days, sale_quantities = daily_sales(start_day, end_day)
+    stock_rows = np.array(list(Product.objects.order_by('pk').values_list('pk', 'stock_quantity')), dtype=np.int64)
+    stock_rows = stock_rows.reshape(-1, 2)
+    product_ids, stock = stock_rows[:, 0], stock_rows[:, 1].astype(np.float64)
+    timings['read'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    plan = compute_plan(product_ids, stock, sale_products, sale_days, sale_quantities, options.history_days, options)
+    timings['compute'] = time.perf_counter() - started
+
+    if save:
+        started = time.perf_counter()
+        save_plan(product_ids, plan, timezone.now())
+        timings['write'] = time.perf_counter() - started
+    timings['sale_rows'] = len(sale_products)
+    return product_ids, plan, timings
@@ -1,7 +1,7 @@
 # store/forms.py
 
 from django import forms
-from .models import Client
+from .models import Client, StockMovement
 
 class ClientForm(forms.ModelForm):
     class Meta:
@@ -30,4 +30,44 @@ class ClientForm(forms.ModelForm):
                 'class': 'w-full p-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-blue-500',
                 'placeholder': 'مثال:  بجانب الجامع الشمالي ',
             }),
-        }
\ No newline at end of file
+        }
+
+
+class ProductImportForm(forms.Form):
+    """نموذج رفع ملف المنتجات في لوحة الأدمن."""
+    file = forms.FileField(label='ملف المنتجات (CSV أو XLSX)')
+    batch_size = forms.IntegerField(label='حجم الدفعة', min_value=1, max_value=10000, initial=1000)
+    dry_run = forms.BooleanField(label='تجربة فقط (دون حفظ)', required=False, initial=True)
+
+
+class StockMovementForm(forms.ModelForm):
+    """حركة مخزون يدوية من لوحة الأدمن (توريد، مرتجع، تسوية جرد). البيع يُسجَّل من نقطة البيع فقط."""
+    MANUAL_KINDS = [
+        (value, label) for value, label in StockMovement.Kind.choices if value != StockMovement.Kind.SALE
+    ]
+
+    class Meta:
+        model = StockMovement
+        fields = ['product', 'kind', 'quantity', 'note']
+        help_texts = {
+            'quantity': 'موجبة للتوريد والمرتجع، وموجبة أو سالبة لتسوية الجرد.',
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['kind'].choices = self.MANUAL_KINDS
+
+    def clean(self):
+        cleaned_data = super().clean()
+        kind = cleaned_data.get('kind')
+        quantity = cleaned_data.get('quantity')
+        product = cleaned_data.get('product')
+        if quantity is None or kind is None:
+            return cleaned_data
+        if quantity == 0:
+            self.add_error('quantity', 'الكمية يجب ألا تكون صفراً.')
+        elif kind in (StockMovement.Kind.RESTOCK, StockMovement.Kind.RETURN) and quantity < 0:
+            self.add_error('quantity', 'كمية التوريد أو المرتجع يجب أن تكون موجبة.')
+        elif product is not None and product.stock_quantity + quantity < 0:
+            self.add_error('quantity', f'الكمية المتوفرة من {product.name} هي {product.stock_quantity} فقط.')
+        return cleaned_data
@@ -0,0 +1,263 @@
+# store/importer.py
+
+"""
+## استيراد المنتجات بالجملة ##
+قراءة قوائم أسعار الموردين (CSV أو XLSX) سطراً سطراً، والتحقق من كل سطر،
+ثم إدخال/تحديث المنتجات حسب الرمز (sku) على دفعات:
+
+- التصنيفات تُقرأ مرة واحدة في قاموس {الاسم: المعرّف}، والجديد منها يُنشأ دفعة واحدة لكل دفعة.
+- كل دفعة هي bulk_create(update_conflicts=True) واحد داخل معاملتها الخاصة،
+  فلا تُقفل الجداول طوال الاستيراد، وفشل دفعة لا يلغي ما قبلها.
+- الأعمدة غير الموجودة في الملف لا تُحدَّث للمنتجات الموجودة (مثلاً قائمة أسعار بلا كميات).
+- وضع التجربة (dry run) يتحقق ويحسب عدد المنتجات الجديدة والمحدَّثة دون أي كتابة.
+
+التحديث الجماعي لا يرسل post_save، لكنه يضبط updated_at فيلتقط كتالوج الذاكرة
+ونقاط البيع التغييرات في المزامنة التالية، وجدول البحث FTS يُحدَّث عبر triggers.
+تغييرات الكميات تُسجَّل في سجل حركات المخزون (store/inventory.py) بالفرق عن الكمية السابقة.
+"""
+
+import csv
+import io
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .inventory import record_movements
+from .models import Category, Product, StockMovement
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+# أسماء الأعمدة المقبولة (بالإنجليزية أو بأسماء الحقول العربية).
+COLUMN_ALIASES = {
+    'sku': 'sku', 'رمز القطعة/sku': 'sku', 'رمز القطعة': 'sku', 'الرمز': 'sku',
+    'name': 'name', 'اسم القطعة': 'name', 'الاسم': 'name',
+    'category': 'category', 'التصنيف': 'category',
+    'purchase_price': 'purchase_price', 'سعر الشراء': 'purchase_price',
+    'sale_price': 'sale_price', 'سعر البيع': 'sale_price',
+    'stock_quantity': 'stock_quantity', 'الكمية في المخزن': 'stock_quantity', 'الكمية': 'stock_quantity',
+    'reorder_level': 'reorder_level', 'حد إعادة الطلب': 'reorder_level',
+}
+REQUIRED_COLUMNS = ('sku', 'name', 'sale_price')
+DECIMAL_COLUMNS = ('purchase_price', 'sale_price')
+INTEGER_COLUMNS = ('stock_quantity', 'reorder_level')
+
+
+class ImportFileError(ValueError):
+    """الملف نفسه غير صالح (صيغة غير مدعومة أو أعمدة ناقصة)."""
+
+
+class ImportReport:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.new_categories = set()
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        prefix = "تجربة فقط - " if self.dry_run else ""
+        return (
+            f"{prefix}الأسطر: {self.rows} | جديدة: {self.created} | محدَّثة: {self.updated} | "
+            f"مرفوضة: {self.skipped} | تصنيفات جديدة: {len(self.new_categories)}"
+        )
+
+
+# ===================================================================
+#   1. قراءة الملف
+# ===================================================================
+
+def _csv_rows(stream):
+    # utf-8-sig يتجاهل BOM الذي يضيفه Excel في بداية الملف.
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    header = next(reader, None)
+    if header is None:
+        return None, iter(())
+    return header, reader
+
+
+def _xlsx_rows(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("قراءة ملفات XLSX تتطلب تثبيت الحزمة openpyxl. يمكن حفظ الملف بصيغة CSV بدلاً من ذلك.")
+    # read_only يقرأ الورقة تدريجياً دون تحميلها كاملة في الذاكرة.
+    sheet = load_workbook(stream, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    return header, rows
+
+
+def read_rows(stream, filename):
+    """
+    تعيد مولّداً من (رقم السطر، قاموس بالأعمدة المعروفة) بالإضافة لقائمة الأعمدة الموجودة.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        header, rows = _csv_rows(stream)
+    elif extension in ('.xlsx', '.xlsm'):
+        header, rows = _xlsx_rows(stream)
+    else:
+        raise ImportFileError("صيغة الملف غير مدعومة. الصيغ المقبولة: CSV و XLSX.")
+    if not header:
+        raise ImportFileError("الملف فارغ.")
+
+    columns = [COLUMN_ALIASES.get(str(name or '').strip().lower()) for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ImportFileError(f"أعمدة مطلوبة غير موجودة: {', '.join(missing)}")
+
+    def generate():
+        for line, values in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in values):
+                continue
+            yield line, {
+                column: value for column, value in zip(columns, values) if column is not None
+            }
+
+    return [column for column in columns if column], generate()
+
+
+# ===================================================================
+#   2. التحقق من الأسطر
+# ===================================================================
+
+def clean_row(row):
+    """تحوّل قيم السطر إلى أنواعها وتعيد قاموساً نظيفاً، أو ترفع ValueError برسالة عربية."""
+    cleaned = {}
+    sku = str(row.get('sku') or '').strip()
+    name = str(row.get('name') or '').strip()
+    if not sku:
+        raise ValueError("الرمز (sku) مطلوب.")
+    if not name:
+        raise ValueError("اسم القطعة مطلوب.")
+    cleaned['sku'] = sku[:100]
+    cleaned['name'] = name[:200]
+
+    for column in DECIMAL_COLUMNS:
+        if column in row:
+            try:
+                value = Decimal(str(row[column] if row[column] not in (None, '') else '0').strip()).quantize(Decimal('0.01'))
+            except InvalidOperation:
+                raise ValueError(f"قيمة غير صالحة في العمود {column}: {row[column]}")
+            if value < 0:
+                raise ValueError(f"قيمة سالبة في العمود {column}.")
+            cleaned[column] = value
+    for column in INTEGER_COLUMNS:
+        if column in row:
+            try:
+                value = int(Decimal(str(row[column] if row[column] not in (None, '') else '0').strip()))
+            except (InvalidOperation, ValueError):
+                raise ValueError(f"قيمة غير صالحة في العمود {column}: {row[column]}")
+            if value < 0:
+                raise ValueError(f"قيمة سالبة في العمود {column}.")
+            cleaned[column] = value
+    if 'category' in row:
+        cleaned['category'] = str(row['category'] or '').strip()[:100]
+    return cleaned
+
+
+# ===================================================================
+#   3. الإدخال والتحديث على دفعات
+# ===================================================================
+
+def _update_fields(columns):
+    fields = [column for column in columns if column in (
+        'name', 'purchase_price', 'sale_price', 'stock_quantity', 'reorder_level'
+    )]
+    if 'category' in columns:
+        fields.append('category')
+    # updated_at هو رقم إصدار الكتالوج، فيجب أن يتغير مع كل تحديث.
+    fields.append('updated_at')
+    return fields
+
+
+def _flush(batch, categories, update_fields, report):
+    """تكتب دفعة واحدة (قاموس {sku: سطر}) وتحدّث التقرير."""
+    existing = set(Product.objects.filter(sku__in=list(batch)).values_list('sku', flat=True))
+    report.created += len(batch) - len(existing)
+    report.updated += len(existing)
+
+    wanted = {row['category'] for row in batch.values() if row.get('category')}
+    missing = wanted - categories.keys()
+    report.new_categories |= missing
+    if report.dry_run:
+        return
+
+    track_stock = 'stock_quantity' in update_fields
+    with transaction.atomic():
+        if missing:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            categories.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+        if track_stock:
+            # الكميات قبل الكتابة، مع قفل الصفوف حتى لا يغيرها بيع متزامن قبل حساب الفرق.
+            previous = dict(
+                Product.objects.select_for_update().filter(sku__in=list(batch)).values_list('sku', 'stock_quantity')
+            )
+        now = timezone.now()
+        products = []
+        for row in batch.values():
+            category_name = row.pop('category', None)
+            product = Product(**row, updated_at=now)
+            if 'category' in update_fields:
+                product.category_id = categories.get(category_name) if category_name else None
+            products.append(product)
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=update_fields,
+        )
+        if track_stock:
+            ids = dict(Product.objects.filter(sku__in=list(batch)).values_list('sku', 'id'))
+            record_movements(
+                [
+                    (
+                        ids[sku],
+                        StockMovement.Kind.ADJUSTMENT if sku in previous else StockMovement.Kind.RESTOCK,
+                        row['stock_quantity'] - previous.get(sku, 0),
+                    )
+                    for sku, row in batch.items()
+                ],
+                note="استيراد المنتجات",
+                created_at=now,
+            )
+
+
+def import_products(stream, filename, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    تستورد المنتجات من ملف مفتوح (ثنائي) وتعيد ImportReport.
+
+    Raises:
+        ImportFileError: إذا كانت صيغة الملف أو أعمدته غير صالحة.
+    """
+    columns, rows = read_rows(stream, filename)
+    update_fields = _update_fields(columns)
+    categories = dict(Category.objects.values_list('name', 'id'))
+    report = ImportReport(dry_run)
+
+    batch = {}
+    for line, row in rows:
+        report.rows += 1
+        try:
+            cleaned = clean_row(row)
+        except ValueError as error:
+            report.add_error(line, str(error))
+            continue
+        # السطر الأخير لنفس الرمز هو المعتمد؛ التكرار داخل دفعة واحدة يرفضه ON CONFLICT.
+        batch[cleaned['sku']] = cleaned
+        if len(batch) >= batch_size:
+            _flush(batch, categories, update_fields, report)
+            batch = {}
+    if batch:
+        _flush(batch, categories, update_fields, report)
+    return report
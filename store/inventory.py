@@ -0,0 +1,172 @@
+# store/inventory.py
+
+"""
+## سجل حركات المخزون ##
+كل تغيير في Product.stock_quantity يُسجَّل في StockMovement داخل نفس المعاملة:
+البيع من محرك البيع (store/checkout.py)، والتوريد والمرتجعات والتسويات من لوحة الإدارة،
+والكميات الجديدة من استيراد المنتجات (store/importer.py).
+
+الكمية في أي لحظة = آخر لقطة (StockSnapshot) قبلها + مجموع الحركات بعد اللقطة حتى تلك اللحظة.
+اللقطات تُنشأ دورياً (snapshot_stock) فيبقى عدد الحركات المقروءة محدوداً مهما طال السجل.
+وتُلتقط متأخرة قليلاً عن الوقت الحالي (SNAPSHOT_LAG) حتى لا تفوتها حركة من معاملة لم تكتمل بعد.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, StockMovement, StockSnapshot
+
+SNAPSHOT_LAG = timedelta(minutes=10)
+# بداية افتراضية للمنتجات التي ليس لها لقطة (أُضيفت بعد اللقطة الافتتاحية).
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class NegativeStockError(ValueError):
+    """الحركة تجعل كمية المنتج في المخزن سالبة."""
+
+
+# ===================================================================
+#   1. تسجيل الحركات
+# ===================================================================
+
+def record_sale(invoice, priced_lines):
+    """حركات البيع لبنود فاتورة [(المنتج، الكمية، السعر)] في استعلام واحد."""
+    StockMovement.objects.bulk_create([
+        StockMovement(
+            product=product, kind=StockMovement.Kind.SALE, quantity=-quantity,
+            invoice=invoice, created_at=invoice.created_at,
+        )
+        for product, quantity, _price in priced_lines
+    ])
+
+
+def record_movements(changes, note='', created_at=None):
+    """تسجل تغييرات حصلت فعلاً على الكميات: [(معرّف المنتج، النوع، التغير)]، وتتجاهل التغير الصفري."""
+    created_at = created_at or timezone.now()
+    StockMovement.objects.bulk_create([
+        StockMovement(product_id=product_id, kind=kind, quantity=quantity, note=note[:255], created_at=created_at)
+        for product_id, kind, quantity in changes
+        if quantity
+    ])
+
+
+def adjust_stock(product, quantity, kind, note=''):
+    """
+    تضيف quantity (موجبة أو سالبة) إلى كمية المنتج وتسجل الحركة. يُقفل صف المنتج
+    حتى لا يتداخل التعديل مع بيع متزامن. تعيد الحركة المنشأة.
+
+    Raises:
+        NegativeStockError: إذا أصبحت الكمية سالبة.
+    """
+    with transaction.atomic():
+        locked = Product.objects.select_for_update().get(pk=product.pk)
+        if locked.stock_quantity + quantity < 0:
+            raise NegativeStockError(f"الكمية المتوفرة من {locked.name} هي {locked.stock_quantity} فقط.")
+        locked.stock_quantity += quantity
+        # save() وليس update() حتى تصل الإشارات إلى كتالوج الذاكرة ولوحة التحكم.
+        locked.save(update_fields=['stock_quantity', 'updated_at'])
+        movement = StockMovement.objects.create(
+            product=locked, kind=kind, quantity=quantity, note=note[:255], created_at=timezone.now(),
+        )
+    product.stock_quantity = locked.stock_quantity
+    return movement
+
+
+# ===================================================================
+#   2. الكمية من السجل
+# ===================================================================
+
+def with_journal_quantity(queryset, moment=None):
+    """
+    تضيف لكل منتج journal_quantity (الكمية حسب السجل في اللحظة moment، أو حتى الآن)
+    و snapshot_at (وقت اللقطة المستخدمة) في نفس الاستعلام.
+    """
+    snapshots = StockSnapshot.objects.filter(product=OuterRef('pk'))
+    if moment is not None:
+        snapshots = snapshots.filter(taken_at__lte=moment)
+    latest = snapshots.order_by('-taken_at')
+    queryset = queryset.annotate(
+        snapshot_quantity=Coalesce(Subquery(latest.values('quantity')[:1]), Value(0)),
+        snapshot_at=Coalesce(Subquery(latest.values('taken_at')[:1]), Value(EPOCH)),
+    )
+    movements = StockMovement.objects.filter(product=OuterRef('pk'), created_at__gt=OuterRef('snapshot_at'))
+    if moment is not None:
+        movements = movements.filter(created_at__lte=moment)
+    delta = movements.order_by().values('product').annotate(total=Sum('quantity')).values('total')
+    return queryset.annotate(journal_quantity=F('snapshot_quantity') + Coalesce(Subquery(delta), Value(0)))
+
+
+def stock_at(moment, products=None):
+    """
+    كمية المخزون في لحظة سابقة: {معرّف المنتج: الكمية}.
+    products قائمة معرّفات أو QuerySet منتجات (الافتراضي: كل المنتجات).
+    """
+    queryset = Product.objects.all()
+    if products is not None:
+        queryset = queryset.filter(pk__in=products)
+    return dict(with_journal_quantity(queryset, moment).values_list('pk', 'journal_quantity'))
+
+
+# ===================================================================
+#   3. اللقطات والمطابقة
+# ===================================================================
+
+def _id_batches(batch_size):
+    last_id = 0
+    while True:
+        ids = list(Product.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def take_snapshots(moment=None, batch_size=2000):
+    """
+    تنشئ لقطة في اللحظة moment (الافتراضي: الآن - SNAPSHOT_LAG) للمنتجات التي لها حركات
+    بعد آخر لقطة فقط. تعيد عدد اللقطات المنشأة.
+    """
+    moment = moment or timezone.now() - SNAPSHOT_LAG
+    created = 0
+    for ids in _id_batches(batch_size):
+        queryset = with_journal_quantity(Product.objects.filter(pk__in=ids), moment)
+        changed = queryset.filter(Exists(StockMovement.objects.filter(
+            product=OuterRef('pk'), created_at__gt=OuterRef('snapshot_at'), created_at__lte=moment,
+        )))
+        snapshots = [
+            StockSnapshot(product_id=product_id, quantity=quantity, taken_at=moment)
+            for product_id, quantity in changed.values_list('pk', 'journal_quantity')
+        ]
+        StockSnapshot.objects.bulk_create(snapshots)
+        created += len(snapshots)
+    return created
+
+
+def reconcile(batch_size=2000, fix=False):
+    """
+    تقارن Product.stock_quantity مع الكمية حسب السجل على دفعات، وتعيد قائمة الفروقات
+    [(المعرّف، الاسم، الكمية في المخزن، الكمية حسب السجل)]. مع fix=True تُسجَّل لكل فرق
+    حركة تسوية تجعل السجل مطابقاً للكمية الحالية.
+    """
+    mismatches = []
+    for ids in _id_batches(batch_size):
+        with transaction.atomic():
+            queryset = Product.objects.filter(pk__in=ids)
+            if fix:
+                # قفل الدفعة حتى لا يغيّر بيع متزامن الكمية بين المقارنة والتسوية.
+                queryset = queryset.select_for_update()
+            rows = list(
+                with_journal_quantity(queryset).values_list('pk', 'name', 'stock_quantity', 'journal_quantity')
+            )
+            batch = [row for row in rows if row[2] != row[3]]
+            if fix:
+                record_movements(
+                    [(pk, StockMovement.Kind.ADJUSTMENT, stock - journal) for pk, _name, stock, journal in batch],
+                    note="تسوية تلقائية من المطابقة (reconcile_stock)",
+                )
+        mismatches.extend(batch)
+    return mismatches
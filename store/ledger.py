@@ -0,0 +1,213 @@
+# store/ledger.py
+
+"""
+## كشف حساب العميل ##
+تسجيل الحركات (فواتير الدين والدفعات) في جدول LedgerEntry مع الرصيد بعد كل حركة:
+
+- post_entry تُستدعى داخل معاملة البيع أو الدفع: تحدّث دين العميل بتعبير F()
+  ثم تقرأ القيمة الناتجة وتخزنها كرصيد بعد الحركة. تحديث صف العميل يقفله حتى
+  نهاية المعاملة، فتُسجَّل حركات العميل الواحد بالتتابع ويبقى الرصيد متسلسلاً.
+- rebuild_client_ledger تعيد بناء كشف عميل من الفواتير والدفعات (دمج مرتب بالتاريخ)،
+  وتعيد الرصيد الناتج لمقارنته مع Client.total_debt.
+- reconcile_debts تطابق Client.total_debt لكل العملاء (أو من تعاملوا منذ آخر تشغيل) مع
+  مجموع فواتير الدين ناقص الدفعات، باستعلامين تجميعيين لكل دفعة من العملاء.
+"""
+
+import heapq
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import Client, Invoice, JobCheckpoint, LedgerEntry, Payment
+
+# عدد الحركات في صفحة كشف الحساب.
+LEDGER_PAGE_SIZE = 50
+
+RECONCILE_JOB = 'reconcile_debts'
+# نقطة التوقف تسبق بداية المطابقة بهذا الهامش، حتى لا تفوت التشغيلَ التالي حركةٌ
+# من معاملة بدأت قبل المطابقة ولم تكتمل إلا بعدها (مثل SNAPSHOT_LAG في store/inventory.py).
+RECONCILE_LAG = timedelta(minutes=10)
+
+
+# ===================================================================
+#   1. التسجيل مع كل حركة
+# ===================================================================
+
+def invoice_description(invoice):
+    return f"فاتورة رقم {invoice.pk}"
+
+
+def payment_description(payment):
+    return payment.notes or "دفعة"
+
+
+def post_entry(client, kind, amount, invoice=None, payment=None, created_at=None):
+    """
+    تضيف حركة إلى حساب العميل وتحدّث دينه. يجب استدعاؤها داخل transaction.atomic.
+    الفاتورة تزيد الدين والدفعة تنقصه، ويُحدَّث وقت آخر تعامل في نفس الاستعلام.
+    تعيد الحركة المنشأة، وتحدّث client.total_debt و client.last_transaction_at و client.unapplied_credit.
+    """
+    created_at = created_at or timezone.now()
+    delta = amount if kind == LedgerEntry.Kind.INVOICE else -amount
+    Client.objects.filter(pk=client.pk).update(
+        total_debt=F('total_debt') + delta, last_transaction_at=created_at
+    )
+    # unapplied_credit في نفس القراءة، لتوزيع الفاتورة أو الدفعة بعدها (store/aging.py).
+    client.refresh_from_db(fields=['total_debt', 'last_transaction_at', 'unapplied_credit'])
+
+    if invoice is not None:
+        description = invoice_description(invoice)
+    else:
+        description = payment_description(payment)
+    return LedgerEntry.objects.create(
+        client=client,
+        kind=kind,
+        invoice=invoice,
+        payment=payment,
+        description=description[:255],
+        amount=amount,
+        balance_after=client.total_debt,
+        created_at=created_at,
+    )
+
+
+def ledger_page(client, before=None, page_size=LEDGER_PAGE_SIZE):
+    """
+    صفحة من كشف الحساب بترقيم المفاتيح (الأحدث أولاً).
+    تعيد (الحركات، معرّف بداية الصفحة التالية أو None).
+    """
+    entries = client.ledger_entries.order_by('-id')
+    if before:
+        entries = entries.filter(id__lt=before)
+    entries = list(entries[:page_size + 1])
+    if len(entries) > page_size:
+        return entries[:page_size], entries[page_size - 1].id
+    return entries, None
+
+
+# ===================================================================
+#   2. إعادة البناء
+# ===================================================================
+
+def _history(client):
+    """حركات العميل من الفواتير والدفعات مرتبة بالتاريخ، دون تحميلها كلها في الذاكرة."""
+    invoices = (
+        (invoice.created_at, 0, invoice.pk, LedgerEntry.Kind.INVOICE, invoice)
+        for invoice in client.invoices.filter(
+            payment_method=Invoice.PaymentMethod.CREDIT
+        ).only('id', 'created_at', 'total_amount').order_by('created_at', 'id').iterator(chunk_size=2000)
+    )
+    payments = (
+        (payment.payment_date, 1, payment.pk, LedgerEntry.Kind.PAYMENT, payment)
+        for payment in client.payments.only(
+            'id', 'payment_date', 'amount', 'notes'
+        ).order_by('payment_date', 'id').iterator(chunk_size=2000)
+    )
+    return heapq.merge(invoices, payments, key=lambda row: row[:3])
+
+
+def rebuild_client_ledger(client, batch_size=1000):
+    """
+    تحذف كشف العميل وتعيد بناءه من فواتير الدين والدفعات. يُقفل صف العميل أثناء
+    إعادة البناء حتى لا تتداخل معه حركة جديدة. تعيد الرصيد النهائي المحسوب.
+    """
+    with transaction.atomic():
+        Client.objects.select_for_update().filter(pk=client.pk).exists()
+        client.ledger_entries.all().delete()
+        balance = Decimal('0.00')
+        batch = []
+        for created_at, _order, _pk, kind, source in _history(client):
+            if kind == LedgerEntry.Kind.INVOICE:
+                amount = source.total_amount
+                balance += amount
+                entry = LedgerEntry(invoice=source, description=invoice_description(source)[:255])
+            else:
+                amount = source.amount
+                balance -= amount
+                entry = LedgerEntry(payment=source, description=payment_description(source)[:255])
+            entry.client = client
+            entry.kind = kind
+            entry.amount = amount
+            entry.balance_after = balance
+            entry.created_at = created_at
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                LedgerEntry.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            LedgerEntry.objects.bulk_create(batch)
+    return balance
+
+
+# ===================================================================
+#   3. مطابقة الديون
+# ===================================================================
+
+def _client_batches(clients, batch_size):
+    last_id = 0
+    while True:
+        ids = list(clients.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _sums(queryset, amount_field, ids):
+    return (
+        queryset.filter(client_id__in=ids).values('client_id')
+        .annotate(total=Sum(amount_field)).order_by().values_list('client_id', 'total')
+    )
+
+
+def true_balances(ids):
+    """الدين الصحيح لكل عميل في ids: مجموع فواتير الدين ناقص مجموع الدفعات."""
+    balances = dict.fromkeys(ids, Decimal('0.00'))
+    for client_id, total in _sums(Invoice.objects.filter(payment_method=Invoice.PaymentMethod.CREDIT), 'total_amount', ids):
+        balances[client_id] += total
+    for client_id, total in _sums(Payment.objects.all(), 'amount', ids):
+        balances[client_id] -= total
+    # SQLite يجمع الأعمدة العشرية كأعداد عائمة.
+    return {pk: balance.quantize(Decimal('0.01')) for pk, balance in balances.items()}
+
+
+def reconcile_debts(incremental=False, batch_size=2000, fix=False):
+    """
+    تقارن Client.total_debt مع الدين المحسوب من الفواتير والدفعات على دفعات من العملاء،
+    وتعيد قائمة الفروقات [(المعرّف، الاسم، الدين المسجل، الدين الصحيح)].
+    - incremental=True: العملاء الذين تعاملوا منذ آخر نقطة توقف فقط (كل العملاء في أول تشغيل).
+      تعديل الدين يدوياً لا يغيّر last_transaction_at، فلا يكشفه إلا التشغيل الكامل.
+    - fix=True: يُكتب الدين الصحيح بـ bulk_update والدفعة مقفلة حتى لا تتداخل معها حركة جديدة.
+    تُحفظ نقطة التوقف إذا لم يبقَ فرق دون تصحيح، حتى يعود التشغيل التالي إلى الفروقات المتبقية.
+    """
+    started = timezone.now() - RECONCILE_LAG
+    clients = Client.objects.all()
+    if incremental:
+        checkpoint = JobCheckpoint.objects.filter(name=RECONCILE_JOB).values_list('checkpoint', flat=True).first()
+        if checkpoint is not None:
+            clients = clients.filter(last_transaction_at__gte=checkpoint)
+
+    mismatches = []
+    for ids in _client_batches(clients, batch_size):
+        with transaction.atomic():
+            queryset = Client.objects.filter(pk__in=ids)
+            if fix:
+                queryset = queryset.select_for_update()
+            recorded = list(queryset.order_by('pk').values_list('pk', 'name', 'total_debt'))
+            balances = true_balances(ids)
+            batch = [
+                (pk, name, total_debt, balances[pk])
+                for pk, name, total_debt in recorded if total_debt != balances[pk]
+            ]
+            if fix and batch:
+                Client.objects.bulk_update(
+                    [Client(pk=pk, total_debt=balance) for pk, _name, _debt, balance in batch], ['total_debt'],
+                )
+        mismatches.extend(batch)
+
+    if fix or not mismatches:
+        JobCheckpoint.objects.update_or_create(name=RECONCILE_JOB, defaults={'checkpoint': started})
+    return mismatches
@@ -0,0 +1,72 @@
+# store/management/commands/benchmark_dashboard.py
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from store.dashboard import clear_dashboard_cache
+from store.models import Client, Invoice
+from store.views import dashboard_view
+
+
+class Command(BaseCommand):
+    help = "قياس كلفة الصفحة الرئيسية (زمن الاستجابة وعدد الاستعلامات) دون ذاكرة مؤقتة ومعها."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="عدد الطلبات في كل قياس.")
+        parser.add_argument('--seed-invoices', type=int, default=0, help="عدد فواتير اليوم التجريبية المراد إنشاؤها قبل القياس.")
+        parser.add_argument('--seed-clients', type=int, default=0, help="عدد العملاء المدينين التجريبيين المراد إنشاؤهم قبل القياس.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        self.seed(options['seed_clients'], options['seed_invoices'], rng)
+
+        factory = RequestFactory()
+        cold = self.measure(factory, options['requests'], clear_each=True)
+        warm = self.measure(factory, options['requests'], clear_each=False)
+
+        self.stdout.write(
+            f"قاعدة البيانات: {connection.vendor} | الفواتير: {Invoice.objects.count()} | العملاء: {Client.objects.count()}"
+        )
+        for label, (samples, queries) in (("دون ذاكرة مؤقتة", cold), ("مع الذاكرة المؤقتة", warm)):
+            quantiles = statistics.quantiles(samples, n=100)
+            self.stdout.write(self.style.SUCCESS(
+                f"{label}: استعلامات/طلب={queries:.1f}  p50={quantiles[49]:.2f}ms  "
+                f"p95={quantiles[94]:.2f}ms  p99={quantiles[98]:.2f}ms"
+            ))
+
+    def measure(self, factory, count, clear_each):
+        clear_dashboard_cache()
+        samples = []
+        total_queries = 0
+        for _ in range(count):
+            if clear_each:
+                clear_dashboard_cache()
+            request = factory.get('/')
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                dashboard_view(request)
+                samples.append((time.perf_counter() - started) * 1000)
+            total_queries += len(queries)
+        return samples, total_queries / count
+
+    def seed(self, clients, invoices, rng):
+        if not clients and not invoices:
+            return
+        with transaction.atomic():
+            if clients:
+                Client.objects.bulk_create(
+                    [Client(name=f"عميل تجريبي {i}", total_debt=rng.randint(100, 100000) / 100) for i in range(clients)],
+                    batch_size=1000,
+                )
+            if invoices:
+                Invoice.objects.bulk_create(
+                    [Invoice(total_amount=rng.randint(100, 50000) / 100, payment_method=Invoice.PaymentMethod.CASH) for _ in range(invoices)],
+                    batch_size=1000,
+                )
+        self.stdout.write(f"تم إنشاء {clients} عميل و {invoices} فاتورة تجريبية.")
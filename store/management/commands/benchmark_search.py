@@ -0,0 +1,88 @@
+# store/management/commands/benchmark_search.py
+
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from store.models import Product
+from store.search import get_search_backend
+
+# كلمات لتوليد أسماء قطع واقعية للاختبار.
+WORDS = [
+    'فلتر', 'زيت', 'هواء', 'بنزين', 'مكابح', 'قشاط', 'بوجيه', 'رديتر', 'مساعد', 'كفر',
+    'بلف', 'طرمبة', 'حساس', 'لمبة', 'مراية', 'جوان', 'بستم', 'دينمو', 'سلف', 'كلتش',
+    'تويوتا', 'هيونداي', 'كيا', 'نيسان', 'مرسيدس', 'أمامي', 'خلفي', 'يمين', 'يسار', 'أصلي',
+]
+
+
+class Command(BaseCommand):
+    help = "قياس زمن البحث عن المنتجات (p50/p95/p99) مع إمكانية توليد كتالوج تجريبي كبير."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help="عدد المنتجات التجريبية المراد إنشاؤها قبل القياس.")
+        parser.add_argument('--queries', type=int, default=500, help="عدد عمليات البحث المقاسة.")
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        if options['seed']:
+            self.seed_catalog(options['seed'], options['batch_size'], rng)
+
+        names = list(Product.objects.values_list('name', 'sku').order_by('?')[:1000])
+        if not names:
+            self.stderr.write("لا توجد منتجات للبحث. استخدم --seed لإنشاء كتالوج تجريبي.")
+            return
+
+        backend = get_search_backend()
+        samples = []
+        for _ in range(options['queries']):
+            name, sku = rng.choice(names)
+            kind = rng.random()
+            if kind < 0.2 and sku:
+                query = sku  # مسح باركود
+            elif kind < 0.6:
+                query = name[:rng.randint(1, len(name))]  # كتابة تدريجية من البداية
+            else:
+                word = rng.choice(name.split())
+                query = word[rng.randint(0, max(len(word) - 3, 0)):]  # جزء من كلمة
+            started = time.perf_counter()
+            backend.search(query, limit=10)
+            samples.append((time.perf_counter() - started) * 1000)
+
+        samples.sort()
+        quantiles = statistics.quantiles(samples, n=100)
+        self.stdout.write(
+            f"المحرك: {type(backend).__name__} | قاعدة البيانات: {connection.vendor} | "
+            f"المنتجات: {Product.objects.count()} | عمليات البحث: {len(samples)}"
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"p50={quantiles[49]:.2f}ms  p95={quantiles[94]:.2f}ms  p99={quantiles[98]:.2f}ms  max={samples[-1]:.2f}ms"
+            )
+        )
+
+    def seed_catalog(self, count, batch_size, rng):
+        self.stdout.write(f"إنشاء {count} منتج تجريبي...")
+        started = time.perf_counter()
+        prefix = ''.join(rng.choices(string.ascii_uppercase, k=3))
+        batch = []
+        with transaction.atomic():
+            for i in range(count):
+                batch.append(Product(
+                    name=' '.join(rng.sample(WORDS, 3)) + f" {i}",
+                    sku=f"BENCH-{prefix}-{i:07d}",
+                    purchase_price=rng.randint(100, 10000) / 100,
+                    sale_price=rng.randint(100, 15000) / 100,
+                    stock_quantity=rng.randint(0, 50),
+                    reorder_level=5,
+                ))
+                if len(batch) >= batch_size:
+                    Product.objects.bulk_create(batch)
+                    batch = []
+            if batch:
+                Product.objects.bulk_create(batch)
+        self.stdout.write(f"تم الإنشاء خلال {time.perf_counter() - started:.1f} ثانية.")
@@ -0,0 +1,290 @@
+# store/management/commands/benchmark_store.py
+
+import json
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client as TestClient
+from django.test.utils import override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from store import urls as store_urls
+from store.dashboard import clear_dashboard_cache
+from store.models import Client, Invoice, Product
+
+# الواجهات التي تكتب في قاعدة البيانات، فلا تُقاس بطلبات GET (البيع يُقاس وحده بـ --checkouts).
+WRITE_ONLY_VIEWS = {'record-payment', 'api-create-invoice', 'api-sync-invoices'}
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {'p50': value, 'p95': value, 'p99': value, 'mean': value, 'max': value}
+    quantiles = statistics.quantiles(samples, n=100)
+    return {
+        'p50': round(quantiles[49], 2), 'p95': round(quantiles[94], 2), 'p99': round(quantiles[98], 2),
+        'mean': round(statistics.fmean(samples), 2), 'max': round(samples[-1], 2),
+    }
+
+
+class InProcessTransport:
+    """الطلبات عبر عميل Django للاختبار (نفس العملية، دون شبكة)."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = TestClient()
+        return self.local.client
+
+    def request(self, method, url, params=None, body=None, headers=None):
+        if method == 'GET':
+            response = self.client().get(url, params or {}, headers=headers)
+        else:
+            response = self.client().post(url, json.dumps(body), content_type='application/json', headers=headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class HttpTransport:
+    """الطلبات عبر HTTP إلى خادم يعمل (مثلاً gunicorn محلي) بمكتبة requests."""
+
+    def __init__(self, base_url):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, method, url, params=None, body=None, headers=None):
+        if not hasattr(self.local, 'session'):
+            self.local.session = self.requests.Session()
+        response = self.local.session.request(method, self.base_url + url, params=params, json=body, headers=headers, timeout=60)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class Command(BaseCommand):
+    help = (
+        "قياس زمن الاستجابة (p50/p95/p99) لكل صفحة في store/urls.py، وإنتاجية البيع مع طلبات "
+        "متزامنة، وحفظ النتائج بصيغة JSON للمقارنة بين الإصدارات. للحصول على أرقام واقعية "
+        "تُولَّد البيانات أولاً بالأمر seed_store."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="عدد الطلبات المقاسة لكل صفحة.")
+        parser.add_argument('--warmup', type=int, default=3, help="طلبات إحماء غير مقاسة لكل صفحة.")
+        parser.add_argument(
+            '--checkouts', type=int, default=0,
+            help="عدد عمليات البيع في قياس الإنتاجية. تُنشأ فواتير حقيقية وتُخصم الكميات، "
+                 "لذا لا يُستخدم إلا على قاعدة تجريبية (الافتراضي 0 = بلا قياس بيع).",
+        )
+        parser.add_argument('--concurrency', type=int, default=4, help="عدد الطلبات المتزامنة في قياس البيع.")
+        parser.add_argument('--url', help="عنوان خادم يعمل (مثلاً http://127.0.0.1:8000) بدلاً من عميل Django الداخلي.")
+        parser.add_argument('--only', nargs='*', help="أسماء المسارات المراد قياسها فقط.")
+        parser.add_argument('--label', default='', help="وصف يُحفظ مع النتائج.")
+        parser.add_argument('--output', help="ملف JSON لحفظ النتائج.")
+        parser.add_argument('--compare', help="ملف JSON سابق لمقارنة p50/p95 معه.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        transport = HttpTransport(options['url']) if options['url'] else InProcessTransport()
+        targets = self.targets(options['only'])
+        if not targets:
+            raise CommandError("لا توجد صفحات للقياس.")
+
+        results = {
+            'label': options['label'],
+            'commit': self.git_commit(),
+            'started_at': timezone.now().isoformat(timespec='seconds'),
+            'transport': 'http' if options['url'] else 'in-process',
+            'database': connection.vendor,
+            'rows': {
+                'products': Product.objects.count(),
+                'clients': Client.objects.count(),
+                'invoices': Invoice.objects.count(),
+            },
+            'urls': {},
+        }
+        with override_settings(ALLOWED_HOSTS=['*']):
+            for name, url, params in targets:
+                results['urls'][name] = self.measure_url(transport, url, params, options)
+                self.report_url(name, results['urls'][name])
+            if options['checkouts']:
+                results['checkout'] = self.measure_checkout(transport, options, rng)
+                self.report_checkout(results['checkout'])
+        clear_dashboard_cache()
+
+        if options['compare']:
+            self.compare(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"تم حفظ النتائج في {options['output']}"))
+
+    # ===================================================================
+    #   الصفحات
+    # ===================================================================
+
+    def targets(self, only):
+        """(الاسم، العنوان، معاملات الاستعلام) لكل مسار GET في store/urls.py مع قيم نموذجية."""
+        client = Client.objects.filter(ledger_entries__isnull=False).order_by('-id').first() or Client.objects.order_by('-id').first()
+        product = Product.objects.order_by('-id').only('name').first()
+        today = timezone.localdate()
+        params = {
+            'api-search-products': {'q': product.name[:4] if product else 'فلتر'},
+            'api-search-clients': {'q': client.name[:3] if client else 'محمد'},
+            'export-invoice-lines-csv': {'start': (today - timedelta(days=7)).isoformat(), 'end': today.isoformat()},
+            'export-product-profit-csv': {'start': (today - timedelta(days=30)).isoformat(), 'end': today.isoformat()},
+        }
+        targets = []
+        for pattern in store_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern) or pattern.name in WRITE_ONLY_VIEWS:
+                continue
+            if only and pattern.name not in only:
+                continue
+            if 'client_id' in pattern.pattern.converters:
+                if client is None:
+                    continue
+                url = reverse(pattern.name, args=[client.id])
+            else:
+                url = reverse(pattern.name)
+            targets.append((pattern.name, url, params.get(pattern.name)))
+        return targets
+
+    def measure_url(self, transport, url, params, options):
+        for _ in range(options['warmup']):
+            transport.request('GET', url, params)
+        samples, queries, errors = [], [], 0
+        for _ in range(options['requests']):
+            started = time.perf_counter()
+            status, timing = transport.request('GET', url, params)
+            samples.append((time.perf_counter() - started) * 1000)
+            errors += status >= 400
+            match = SERVER_TIMING_QUERIES.search(timing)
+            if match:
+                queries.append(int(match.group(1)))
+        return {
+            'url': url,
+            'requests': len(samples),
+            'errors': errors,
+            'queries': round(statistics.fmean(queries), 1) if queries else None,
+            'latency_ms': percentiles(samples),
+        }
+
+    def report_url(self, name, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f"{name:<30} p50={latency['p50']:>8.2f}ms  p95={latency['p95']:>8.2f}ms  p99={latency['p99']:>8.2f}ms  "
+            f"استعلامات={result['queries']}  أخطاء={result['errors']}"
+        )
+
+    # ===================================================================
+    #   إنتاجية البيع
+    # ===================================================================
+
+    def measure_checkout(self, transport, options, rng):
+        # أكثر المنتجات كمية، حتى لا تفشل المبيعات بسبب نفاد المخزون.
+        products = list(Product.objects.filter(stock_quantity__gte=100).order_by('-stock_quantity').values('id', 'sale_price')[:200])
+        if not products:
+            raise CommandError("لا توجد منتجات بكمية كافية لقياس البيع. استخدم seed_store أولاً.")
+        carts = []
+        for _ in range(options['checkouts']):
+            lines = rng.sample(products, min(len(products), rng.choice((1, 1, 2, 3, 5))))
+            carts.append({
+                'cart': [{'id': line['id'], 'quantity': 1, 'price': str(line['sale_price'])} for line in lines],
+                'payment_method': Invoice.PaymentMethod.CASH,
+            })
+        run_id = f"{int(time.time())}-{rng.randint(0, 10 ** 6)}"
+
+        pending = iter(range(len(carts)))
+        lock = threading.Lock()
+        outcomes = []
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        index = next(pending, None)
+                    if index is None:
+                        return
+                    started = time.perf_counter()
+                    status, _timing = transport.request(
+                        'POST', reverse('api-create-invoice'), body=carts[index],
+                        headers={'Idempotency-Key': f"bench-{run_id}-{index}"},
+                    )
+                    with lock:
+                        outcomes.append((status, (time.perf_counter() - started) * 1000))
+            finally:
+                # في الوضع الداخلي يفتح كل خيط اتصاله الخاص بقاعدة البيانات.
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['concurrency'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        succeeded = [latency for status, latency in outcomes if status == 200]
+        return {
+            'checkouts': len(outcomes),
+            'concurrency': options['concurrency'],
+            'succeeded': len(succeeded),
+            'failed': len(outcomes) - len(succeeded),
+            'seconds': round(elapsed, 2),
+            'per_second': round(len(succeeded) / elapsed, 1) if elapsed else None,
+            'latency_ms': percentiles(succeeded),
+        }
+
+    def report_checkout(self, result):
+        latency = result['latency_ms']
+        self.stdout.write(self.style.SUCCESS(
+            f"البيع: {result['succeeded']}/{result['checkouts']} ناجحة بتزامن {result['concurrency']} | "
+            f"{result['per_second']} عملية/ثانية | p50={latency['p50']:.2f}ms  p95={latency['p95']:.2f}ms"
+        ))
+
+    # ===================================================================
+    #   المقارنة
+    # ===================================================================
+
+    def compare(self, results, path):
+        try:
+            with open(path, encoding='utf-8') as previous_file:
+                previous = json.load(previous_file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"تعذرت قراءة ملف المقارنة: {error}")
+        self.stdout.write(f"المقارنة مع {previous.get('commit') or path} {previous.get('label', '')}:")
+        for key in ('transport', 'database', 'rows'):
+            if previous.get(key) != results[key]:
+                self.stdout.write(self.style.WARNING(f"  تنبيه: {key} مختلف ({previous.get(key)} / {results[key]})، فالمقارنة تقريبية."))
+        for name, result in results['urls'].items():
+            before = previous.get('urls', {}).get(name)
+            if not before:
+                continue
+            changes = []
+            for key in ('p50', 'p95'):
+                old, new = before['latency_ms'][key], result['latency_ms'][key]
+                change = (new - old) / old * 100 if old else 0
+                changes.append(f"{key}: {old:.2f} -> {new:.2f}ms ({change:+.0f}%)")
+            self.stdout.write(f"  {name:<30} " + "  ".join(changes))
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,50 @@
+# store/management/commands/check_low_stock.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from store.dashboard import _compute_low_stock
+from store.exports import low_stock_rows
+from store.models import Product
+
+INDEX_NAME = 'store_product_low_stock_idx'
+
+
+class Command(BaseCommand):
+    help = (
+        "التحقق من أن استعلامات النواقص (لوحة التحكم، التقرير، التصدير) تقرأ الفهرس الجزئي "
+        f"{INDEX_NAME} بدلاً من الجدول كاملاً، بعرض خطة التنفيذ (EXPLAIN) لكل منها."
+    )
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Product._meta.db_table)
+        if INDEX_NAME not in constraints:
+            raise CommandError(f"الفهرس {INDEX_NAME} غير موجود. نفّذ migrate أولاً.")
+
+        queries = {
+            "لوحة التحكم": Product.objects.low_stock().order_by('stock_quantity').values('id')[:5],
+            "تقرير النواقص": Product.objects.low_stock().order_by('stock_quantity'),
+            "العدد": Product.objects.low_stock().order_by().values('id'),
+        }
+        unused = []
+        for label, queryset in queries.items():
+            plan = queryset.explain()
+            used = INDEX_NAME in plan
+            if not used:
+                unused.append(label)
+            style = self.style.SUCCESS if used else self.style.WARNING
+            self.stdout.write(style(f"{label}: {'يستخدم الفهرس' if used else 'لا يستخدم الفهرس'}"))
+            if options['verbosity'] > 1 or not used:
+                self.stdout.write(f"    {plan}")
+
+        low, total = Product.objects.low_stock().count(), Product.objects.count()
+        self.stdout.write(f"النواقص: {low} من {total} منتج.")
+        # التأكد من أن الدوال المستخدمة فعلاً في الواجهات تعمل على نفس الشرط.
+        if len(_compute_low_stock()) != min(low, 5) or sum(1 for _row in low_stock_rows()) != low:
+            raise CommandError("نتائج لوحة التحكم أو التصدير لا تطابق عدد النواقص.")
+        if unused:
+            self.stdout.write(self.style.WARNING(
+                "مخطط قاعدة البيانات لم يختر الفهرس لبعض الاستعلامات. إذا كانت نسبة النواقص كبيرة "
+                "فقراءة الجدول كاملاً قد تكون أسرع فعلاً؛ وإلا فحدِّث الإحصاءات (ANALYZE)."
+            ))
@@ -0,0 +1,108 @@
+# store/management/commands/check_query_budgets.py
+
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client as TestClient
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from store import analytics
+from store.dashboard import clear_dashboard_cache
+from store.metrics import query_budget
+from store.models import Category, Client, Invoice, Product
+
+# أحجام السلة (عدد الأسطر) التي يُقاس بها البيع؛ حده يكبر بعدد الأسطر.
+CART_SIZES = (1, 10, 30)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "يطلب الواجهات الأساسية على بيانات تجريبية (داخل معاملة تُلغى في النهاية) ويقارن عدد "
+        "استعلاماتها مع QUERY_BUDGETS. يفشل إذا تجاوزت أي واجهة حدها؛ البيع يُقاس بعدة أحجام "
+        "للسلة ويُقارن بحده لكل حجم. يُشغَّل على قاعدة تطوير أو ضمن الاختبارات "
+        "(store/tests/test_query_budgets.py)، لا على قاعدة الإنتاج: ينشئ بيانات ومبيعات تقفل الصفوف "
+        "ويمسح مؤشرات لوحة التحكم المخزنة."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=max(CART_SIZES),
+            help=f"عدد المنتجات والعملاء التجريبيين (لا يقل عن {max(CART_SIZES)}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+                results = self.measure(max(options['rows'], *CART_SIZES))
+                raise Rollback
+        except Rollback:
+            # المؤشرات المخزنة حُسبت من البيانات التجريبية التي أُلغيت.
+            clear_dashboard_cache()
+
+        failures = []
+        for label, view_name, lines, queries in results:
+            budget = query_budget(view_name, lines)
+            over = budget is not None and len(queries) > budget
+            line = f"{label}: {len(queries)} استعلام (الحد: {budget if budget is not None else '-'})"
+            self.stdout.write(self.style.ERROR(line) if over else line)
+            if over:
+                failures.append(label)
+            if options['verbosity'] > 1 or over:
+                for query in queries:
+                    self.stdout.write(f"    {query['sql'][:200]}")
+
+        if failures:
+            raise CommandError(f"تجاوز حد الاستعلامات: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("كل الواجهات ضمن حدودها."))
+
+    def seed(self, rows):
+        category = Category.objects.create(name="تصنيف فحص الاستعلامات")
+        products = Product.objects.bulk_create([
+            Product(
+                name=f"قطعة فحص {i}", sku=f"QB-{i}", category=category, purchase_price=Decimal('5.00'),
+                sale_price=Decimal('8.00'), stock_quantity=100, reorder_level=5 if i % 3 else 200,
+            )
+            for i in range(rows)
+        ])
+        clients = Client.objects.bulk_create([Client(name=f"عميل فحص {i}") for i in range(rows)])
+        return products, clients
+
+    def measure(self, rows):
+        products, clients = self.seed(rows)
+        client = clients[0]
+        http = TestClient()
+
+        def run(label, view_name, method, url, lines=0, **kwargs):
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(http, method)(url, **kwargs)
+            if response.status_code >= 400:
+                raise CommandError(f"{label}: رمز الاستجابة {response.status_code}")
+            results.append((label, view_name, lines, queries.captured_queries))
+
+        def sale(lines, key):
+            cart = [{'id': product.id, 'quantity': 1, 'price': str(product.sale_price)} for product in products[:lines]]
+            body = {'cart': cart, 'payment_method': Invoice.PaymentMethod.CREDIT, 'client_id': client.id}
+            return {'data': json.dumps(body), 'content_type': 'application/json', 'headers': {'Idempotency-Key': key}}
+
+        results = []
+        # البيع أولاً حتى يكون لدى العميل حركات في كشف الحساب.
+        for lines in CART_SIZES:
+            run(f"البيع ({lines} سطر)", 'api-create-invoice', 'post', reverse('api-create-invoice'),
+                lines=lines, **sale(lines, f'budget-check-{lines}'))
+        clear_dashboard_cache()
+        run("الرئيسية", 'dashboard', 'get', reverse('dashboard'))
+        run("قائمة العملاء", 'client-list', 'get', reverse('client-list'))
+        run("كشف حساب العميل", 'client-detail', 'get', reverse('client-detail', args=[client.id]))
+        run("بحث المنتجات", 'api-search-products', 'get', reverse('api-search-products'), data={'q': 'قطعة'})
+        run("بحث العملاء", 'api-search-clients', 'get', reverse('api-search-clients'), data={'q': 'عميل'})
+        run("أعمار الديون", 'debt-aging', 'get', reverse('debt-aging'))
+        for grouping in analytics.GROUPINGS:
+            run(f"تحليل الأرباح ({grouping})", 'profit-analytics', 'get', reverse('profit-analytics'), data={'group': grouping})
+        return results
@@ -0,0 +1,30 @@
+# store/management/commands/check_search_index.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.search import missing_fts_triggers, restore_fts_triggers
+
+
+class Command(BaseCommand):
+    help = (
+        "التحقق من triggers جدول البحث FTS5 في SQLite. أي هجرة تعيد بناء جدول المنتجات تحذفها، "
+        "فلا تظهر المنتجات الجديدة أو المعدلة في البحث. يفشل الأمر إذا كانت مفقودة، "
+        "ومع --fix يعيد إنشاءها ويعيد بناء الفهرس."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help="إعادة إنشاء triggers المفقودة وإعادة بناء فهرس البحث.")
+
+    def handle(self, *args, **options):
+        if options['fix']:
+            restored = restore_fts_triggers()
+            if restored:
+                self.stdout.write(self.style.WARNING(
+                    f"أُعيد إنشاء {len(restored)} trigger وأُعيد بناء فهرس البحث: {', '.join(restored)}"
+                ))
+        missing = missing_fts_triggers()
+        if missing:
+            raise CommandError(
+                f"triggers جدول البحث مفقودة: {', '.join(missing)}. نفّذ check_search_index --fix."
+            )
+        self.stdout.write(self.style.SUCCESS("فهرس البحث مكتمل."))
@@ -0,0 +1,46 @@
+# store/management/commands/compute_reorder_plan.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.forecast import PlanSettings, build_reorder_plan
+
+
+class Command(BaseCommand):
+    help = (
+        "حساب سرعة بيع كل منتج من سجل الفواتير، ومنها حد الطلب وكمية الطلب المقترحة وأيام التغطية، "
+        "وحفظها في ReorderSuggestion لتقرير النواقص وصفحة خطة الطلب. يُشغَّل دورياً (مثلاً ليلاً عبر cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=730, help="طول سجل المبيعات المقروء بالأيام.")
+        parser.add_argument('--window', type=int, default=28, help="عدد الأيام الأخيرة لحساب المتوسط والتذبذب.")
+        parser.add_argument('--half-life', type=float, default=14, help="نصف عمر المتوسط الأسي بالأيام.")
+        parser.add_argument('--lead-time', type=float, help="مدة التوريد بالأيام (الافتراضي REORDER_LEAD_TIME_DAYS).")
+        parser.add_argument('--review-days', type=float, help="الأيام بين طلبيتين (الافتراضي REORDER_REVIEW_DAYS).")
+        parser.add_argument('--service-z', type=float, help="معامل مخزون الأمان (الافتراضي REORDER_SERVICE_Z).")
+        parser.add_argument('--dry-run', action='store_true', help="الحساب وعرض الملخص دون الحفظ.")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['window'] < 1 or options['half_life'] <= 0:
+            raise CommandError("يجب أن تكون --days و --window و --half-life أكبر من صفر.")
+        plan_settings = PlanSettings(
+            history_days=options['days'],
+            window=min(options['window'], options['days']),
+            half_life=options['half_life'],
+            lead_time=options['lead_time'],
+            review_days=options['review_days'],
+            service_z=options['service_z'],
+        )
+        product_ids, plan, timings = build_reorder_plan(plan_settings, save=not options['dry_run'])
+
+        to_order = int((plan['order_quantity'] > 0).sum())
+        self.stdout.write(
+            f"قراءة {timings['sale_rows']} سطر مبيعات يومية و {len(product_ids)} منتج: {timings['read']:.2f} ثانية | "
+            f"الحساب: {timings['compute']:.2f} ثانية"
+            + (f" | الحفظ: {timings['write']:.2f} ثانية" if 'write' in timings else "")
+        )
+        message = f"{to_order} منتج بحاجة لإعادة طلب (مجموع الكميات المقترحة {int(plan['order_quantity'].sum())})."
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"تجربة دون حفظ: {message}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,34 @@
+# store/management/commands/import_products.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.importer import DEFAULT_BATCH_SIZE, ImportFileError, import_products
+
+
+class Command(BaseCommand):
+    help = "استيراد أو تحديث المنتجات بالجملة من ملف CSV أو XLSX حسب الرمز (sku)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="مسار الملف (.csv أو .xlsx).")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help="عدد المنتجات في كل دفعة/معاملة.")
+        parser.add_argument('--dry-run', action='store_true', help="التحقق وعرض التقرير دون حفظ أي تغيير.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], 'rb') as stream:
+                report = import_products(
+                    stream, options['path'], batch_size=options['batch_size'], dry_run=options['dry_run']
+                )
+        except FileNotFoundError:
+            raise CommandError(f"الملف غير موجود: {options['path']}")
+        except ImportFileError as error:
+            raise CommandError(str(error))
+
+        for line, message in report.errors:
+            self.stdout.write(self.style.WARNING(f"السطر {line}: {message}"))
+        if report.new_categories:
+            self.stdout.write(f"تصنيفات جديدة: {', '.join(sorted(report.new_categories))}")
+        self.stdout.write(self.style.SUCCESS(f"{report.summary()} | المدة: {time.perf_counter() - started:.1f} ثانية"))
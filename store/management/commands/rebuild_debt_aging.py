@@ -0,0 +1,26 @@
+# store/management/commands/rebuild_debt_aging.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.aging import rebuild_aging
+
+
+class Command(BaseCommand):
+    help = (
+        "إعادة توزيع كل الدفعات على فواتير الدين من الأقدم (FIFO) بمرور واحد مرتب حسب العميل والتاريخ، "
+        "وتصحيح المتبقي من كل فاتورة والرصيد الدائن لكل عميل. تُكتب القيم المختلفة فقط. "
+        "يُشغَّل بعد تعديل الفواتير أو الدفعات من لوحة الإدارة، ويُفضل في وقت لا تُسجَّل فيه مبيعات."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="عدد الصفوف في كل تحديث.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = rebuild_aging(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"تمت مراجعة {stats['clients']} عميل في {time.perf_counter() - started:.1f} ثانية: "
+            f"تصحيح {stats['invoices']} فاتورة، و {stats['credits']} عميل لديه رصيد دائن."
+        ))
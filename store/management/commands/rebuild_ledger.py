@@ -0,0 +1,34 @@
+# store/management/commands/rebuild_ledger.py
+
+from django.core.management.base import BaseCommand
+
+from store.ledger import rebuild_client_ledger
+from store.models import Client
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء كشوف حسابات العملاء من الفواتير والدفعات ومطابقتها مع إجمالي الدين المسجل."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--client', type=int, action='append', help="معرّف عميل محدد (يمكن تكراره). الافتراضي: كل العملاء.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="عدد الحركات في كل دفعة إدخال.")
+
+    def handle(self, *args, **options):
+        clients = Client.objects.order_by('pk')
+        if options['client']:
+            clients = clients.filter(pk__in=options['client'])
+
+        rebuilt = mismatched = 0
+        for client in clients.iterator(chunk_size=500):
+            balance = rebuild_client_ledger(client, batch_size=options['batch_size'])
+            rebuilt += 1
+            client.refresh_from_db(fields=['total_debt'])
+            if balance != client.total_debt:
+                mismatched += 1
+                self.stdout.write(self.style.WARNING(
+                    f"العميل {client.pk} ({client.name}): رصيد الكشف {balance} لا يطابق الدين المسجل {client.total_debt}"
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة بناء كشوف {rebuilt} عميل."))
+        if mismatched:
+            self.stdout.write(self.style.WARNING(f"عدد العملاء غير المتطابقين: {mismatched}"))
@@ -0,0 +1,29 @@
+# store/management/commands/rebuild_sales_summary.py
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.reports import rebuild_daily_summary
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء جدول الملخص اليومي للمبيعات والأرباح من بنود الفواتير."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help="إعادة بناء الأيام ابتداءً من هذا التاريخ فقط (YYYY-MM-DD). الافتراضي: كل السجل.",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help="عدد الصفوف في كل دفعة إدخال.")
+
+    def handle(self, *args, **options):
+        start_date = None
+        if options['since']:
+            try:
+                start_date = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("صيغة التاريخ غير صحيحة، استخدم YYYY-MM-DD.")
+
+        created = rebuild_daily_summary(start_date=start_date, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة بناء الملخص اليومي: {created} صف."))
@@ -0,0 +1,39 @@
+# store/management/commands/reconcile_debts.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.ledger import reconcile_debts
+
+
+class Command(BaseCommand):
+    help = (
+        "مطابقة دين كل عميل (total_debt) مع مجموع فواتير الدين ناقص الدفعات على دفعات من العملاء. "
+        "مناسب للتشغيل الليلي مع --incremental، وتشغيل كامل دوري لكشف التعديلات اليدوية."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="عدد العملاء في كل دفعة.")
+        parser.add_argument('--incremental', action='store_true', help="مراجعة العملاء الذين تعاملوا منذ آخر تشغيل فقط.")
+        parser.add_argument('--fix', action='store_true', help="كتابة الدين الصحيح لكل عميل غير مطابق.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        mismatches = reconcile_debts(
+            incremental=options['incremental'], batch_size=options['batch_size'], fix=options['fix'],
+        )
+        for client_id, name, recorded, actual in mismatches:
+            self.stdout.write(self.style.WARNING(
+                f"العميل {client_id} ({name}): الدين المسجل {recorded} والصحيح {actual} (الفرق {recorded - actual:+})"
+            ))
+        elapsed = time.perf_counter() - started
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS(f"كل الديون مطابقة للفواتير والدفعات ({elapsed:.1f} ثانية)."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(
+                f"تم تصحيح دين {len(mismatches)} عميل ({elapsed:.1f} ثانية). "
+                "أعد بناء كشوف حساباتهم بالأمر rebuild_ledger --client."
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(f"عدد العملاء غير المطابقين: {len(mismatches)} ({elapsed:.1f} ثانية)"))
@@ -0,0 +1,29 @@
+# store/management/commands/reconcile_stock.py
+
+from django.core.management.base import BaseCommand
+
+from store.inventory import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "مطابقة كمية كل منتج (stock_quantity) مع الكمية حسب سجل حركات المخزون على دفعات. "
+        "أي فرق يعني تغييراً لم يُسجَّل (مثلاً تعديلاً مباشراً في قاعدة البيانات)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help="عدد المنتجات في كل دفعة.")
+        parser.add_argument('--fix', action='store_true', help="تسجيل حركة تسوية لكل فرق حتى يطابق السجل الكمية الحالية.")
+
+    def handle(self, *args, **options):
+        mismatches = reconcile(batch_size=options['batch_size'], fix=options['fix'])
+        for product_id, name, stock, journal in mismatches:
+            self.stdout.write(self.style.WARNING(
+                f"المنتج {product_id} ({name}): الكمية {stock} والسجل {journal} (الفرق {stock - journal:+d})"
+            ))
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS("كل الكميات مطابقة لسجل المخزون."))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS(f"تم تسجيل {len(mismatches)} حركة تسوية."))
+        else:
+            self.stdout.write(self.style.WARNING(f"عدد المنتجات غير المطابقة: {len(mismatches)}"))
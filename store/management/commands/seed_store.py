@@ -0,0 +1,197 @@
+# store/management/commands/seed_store.py
+
+import random
+import string
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from store.aging import rebuild_aging
+from store.dashboard import clear_dashboard_cache
+from store.ledger import rebuild_client_ledger
+from store.models import Category, Client, Invoice, InvoiceItem, Payment, Product, StockSnapshot
+from store.reports import rebuild_daily_summary
+
+CATEGORIES = [
+    'فلاتر', 'زيوت', 'مكابح', 'كهرباء', 'تعليق', 'محرك', 'تبريد', 'إضاءة', 'إطارات', 'هيكل',
+    'قير', 'عوادم', 'تكييف', 'بطاريات', 'إكسسوارات',
+]
+PARTS = [
+    'فلتر زيت', 'فلتر هواء', 'فلتر بنزين', 'فحمات مكابح', 'قشاط', 'بوجيه', 'رديتر', 'مساعد',
+    'كفر', 'بلف', 'طرمبة ماء', 'حساس أكسجين', 'لمبة', 'مراية', 'جوان', 'بستم', 'دينمو', 'سلف',
+    'كلتش', 'ديسك', 'كمبروسر', 'بطارية', 'مساحات', 'ترموستات',
+]
+MAKES = ['تويوتا', 'هيونداي', 'كيا', 'نيسان', 'مرسيدس', 'ميتسوبيشي', 'فورد', 'شيفروليه', 'هوندا', 'مازدا']
+SIDES = ['', 'أمامي', 'خلفي', 'يمين', 'يسار', 'أصلي', 'تجاري']
+FIRST_NAMES = ['محمد', 'أحمد', 'علي', 'حسن', 'خالد', 'عمر', 'يوسف', 'سامر', 'ماهر', 'فادي', 'رامي', 'باسل', 'وائل', 'زياد', 'طارق']
+LAST_NAMES = ['الأحمد', 'الخطيب', 'الحلبي', 'الشامي', 'العلي', 'السيد', 'النجار', 'الحداد', 'الزين', 'المصري', 'درويش', 'قاسم']
+
+
+@contextmanager
+def keep_timestamps(*fields):
+    """
+    يوقف auto_now_add مؤقتاً حتى تُحفظ التواريخ التاريخية المولّدة كما هي
+    (bulk_create يستبدلها بالوقت الحالي في الوضع العادي).
+    """
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "توليد بيانات متجر تجريبية بحجم الإنتاج: منتجات بشعبية متفاوتة (توزيع Zipf)، عملاء بعضهم "
+        "مدينون، وسجل فواتير ودفعات يمتد لعدة سنوات. يُضاف إلى البيانات الموجودة ولا يحذف شيئاً."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000, help="عدد المنتجات.")
+        parser.add_argument('--clients', type=int, default=500, help="عدد العملاء.")
+        parser.add_argument('--invoices', type=int, default=20000, help="عدد الفواتير.")
+        parser.add_argument('--years', type=float, default=3, help="طول السجل التاريخي بالسنوات.")
+        parser.add_argument('--credit-share', type=float, default=0.3, help="نسبة فواتير الدين من الفواتير.")
+        parser.add_argument('--debtor-share', type=float, default=0.4, help="نسبة العملاء الذين يشترون بالدين.")
+        parser.add_argument('--skew', type=float, default=1.1, help="أس توزيع Zipf لشعبية المنتجات (0 = متساوية).")
+        parser.add_argument('--batch-size', type=int, default=2000, help="عدد الفواتير في كل دفعة إدخال.")
+        parser.add_argument('--seed', type=int, default=42, help="بذرة المولّد العشوائي لتكرار نفس البيانات.")
+
+    def handle(self, *args, **options):
+        if options['invoices'] and not options['products']:
+            raise CommandError("لا يمكن توليد فواتير دون منتجات.")
+        rng = random.Random(options['seed'])
+        # بادئة فريدة للرموز حتى يمكن تشغيل الأمر أكثر من مرة على نفس القاعدة.
+        prefix = ''.join(random.choices(string.ascii_uppercase, k=4))
+        started = time.perf_counter()
+
+        products = self.seed_products(options['products'], prefix, rng)
+        clients = self.seed_clients(options['clients'], rng)
+        debtors = clients[:int(len(clients) * options['debtor_share'])]
+        if options['invoices']:
+            self.seed_history(products, debtors, options, rng)
+
+        self.stdout.write("إعادة بناء كشوف الحسابات وأعمار الديون والملخص اليومي...")
+        self.rebuild_balances(debtors)
+        rebuild_aging()
+        rebuild_daily_summary()
+        clear_dashboard_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f"تم إنشاء {len(products)} منتج و {len(clients)} عميل و {options['invoices']} فاتورة "
+            f"في {time.perf_counter() - started:.1f} ثانية."
+        ))
+
+    # ===================================================================
+    #   الكتالوج والعملاء
+    # ===================================================================
+
+    def seed_products(self, count, prefix, rng):
+        categories = list(Category.objects.filter(name__in=CATEGORIES))
+        missing = set(CATEGORIES) - {category.name for category in categories}
+        categories += Category.objects.bulk_create([Category(name=name) for name in missing])
+
+        products = []
+        for i in range(count):
+            cost = Decimal(rng.randint(200, 20000)) / 100
+            margin = Decimal(rng.randint(110, 160)) / 100
+            products.append(Product(
+                name=f"{rng.choice(PARTS)} {rng.choice(MAKES)} {rng.choice(SIDES)}".strip() + f" {i}",
+                sku=f"SEED-{prefix}-{i:07d}",
+                category=rng.choice(categories),
+                purchase_price=cost,
+                sale_price=(cost * margin).quantize(Decimal('0.01')),
+                # الكميات كبيرة حتى لا ترفض مقاييس البيع بسبب نفاد المخزون، ونحو 5% منها تحت حد الطلب.
+                stock_quantity=rng.randint(0, 5) if rng.random() < 0.05 else rng.randint(50, 5000),
+                reorder_level=rng.randint(2, 20),
+            ))
+        with transaction.atomic():
+            products = Product.objects.bulk_create(products, batch_size=5000)
+            # الكميات المولّدة هي رصيد افتتاحي لسجل المخزون (مثل اللقطة الافتتاحية في الهجرة 0014).
+            now = timezone.now()
+            StockSnapshot.objects.bulk_create(
+                [StockSnapshot(product=product, quantity=product.stock_quantity, taken_at=now) for product in products],
+                batch_size=5000,
+            )
+        return products
+
+    def seed_clients(self, count, rng):
+        clients = [
+            Client(
+                name=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}",
+                phone=f"09{rng.randint(10000000, 99999999)}",
+            )
+            for i in range(count)
+        ]
+        with transaction.atomic():
+            return Client.objects.bulk_create(clients, batch_size=5000)
+
+    # ===================================================================
+    #   سجل الفواتير والدفعات
+    # ===================================================================
+
+    def seed_history(self, products, debtors, options, rng):
+        count = options['invoices']
+        # شعبية المنتجات: المنتج رقم r في الترتيب (العشوائي) وزنه 1 / r^skew.
+        popularity = products[:]
+        rng.shuffle(popularity)
+        cum_weights = list(accumulate(1 / (rank + 1) ** options['skew'] for rank in range(len(popularity))))
+
+        now = timezone.now()
+        moment = now - timedelta(days=365 * options['years'])
+        average_gap = (now - moment).total_seconds() / count
+        batch_size = options['batch_size']
+        invoice_field = Invoice._meta.get_field('created_at')
+        payment_field = Payment._meta.get_field('payment_date')
+
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            invoices, carts, payments = [], [], []
+            for _ in range(size):
+                # فواصل أُسّية بين الفواتير، فالتواريخ متزايدة مع المعرّفات كما في الواقع.
+                moment = min(moment + timedelta(seconds=rng.expovariate(1 / average_gap)), now)
+                client = rng.choice(debtors) if debtors and rng.random() < options['credit_share'] else None
+                cart = {}
+                for product in rng.choices(popularity, cum_weights=cum_weights, k=rng.choice((1, 1, 1, 2, 2, 3, 4, 6))):
+                    cart[product.pk] = (product, cart.get(product.pk, (product, 0))[1] + rng.choice((1, 1, 1, 2, 4)))
+                total = sum((product.sale_price * quantity for product, quantity in cart.values()), Decimal('0.00'))
+                invoices.append(Invoice(
+                    client=client, created_at=moment, total_amount=total,
+                    payment_method=Invoice.PaymentMethod.CREDIT if client else Invoice.PaymentMethod.CASH,
+                ))
+                carts.append(cart)
+                # معظم المدينين يسددون جزءاً من الفاتورة لاحقاً.
+                if client and rng.random() < 0.7:
+                    paid_at = min(moment + timedelta(days=rng.randint(1, 60)), now)
+                    amount = (total * rng.choice((25, 50, 100)) / 100).quantize(Decimal('0.01'))
+                    payments.append(Payment(client=client, amount=amount, payment_date=paid_at, notes="دفعة تجريبية"))
+
+            with transaction.atomic(), keep_timestamps(invoice_field, payment_field):
+                Invoice.objects.bulk_create(invoices)
+                InvoiceItem.objects.bulk_create([
+                    InvoiceItem(
+                        invoice=invoice, product=product, quantity=quantity,
+                        price_at_sale=product.sale_price, cost_at_sale=product.purchase_price,
+                    )
+                    for invoice, cart in zip(invoices, carts)
+                    for product, quantity in cart.values()
+                ], batch_size=5000)
+                Payment.objects.bulk_create(payments)
+            created += size
+            self.stdout.write(f"  {created}/{count} فاتورة")
+
+    def rebuild_balances(self, debtors):
+        """يحسب كشف كل عميل مدين من فواتيره ودفعاته ويضبط دينه ووقت آخر تعامل وفقاً له."""
+        for client in debtors:
+            client.total_debt = rebuild_client_ledger(client)
+            last = client.ledger_entries.order_by('-id').values_list('created_at', flat=True).first()
+            client.last_transaction_at = last
+        Client.objects.bulk_update(debtors, ['total_debt', 'last_transaction_at'], batch_size=1000)
@@ -0,0 +1,26 @@
+# store/management/commands/send_telegram_outbox.py
+
+from django.core.management.base import BaseCommand
+
+from store.models import OutboxMessage
+from store.telegram_bot import dispatcher
+
+
+class Command(BaseCommand):
+    help = (
+        "إرسال رسائل صندوق صادر تليجرام المستحقة الآن من هذه العملية. العمال يرسلونها تلقائياً؛ "
+        "الأمر مفيد عند توقفهم أو للتأكد من إفراغ الصندوق."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=float, default=60, help="أقصى مدة بالثواني.")
+
+    def handle(self, *args, **options):
+        emptied = dispatcher.flush(timeout=options['timeout'])
+        pending = OutboxMessage.objects.filter(failed=False).count()
+        failed = OutboxMessage.objects.filter(failed=True).count()
+        message = f"الرسائل المتبقية: {pending} مؤجلة، و {failed} مرفوضة (راجعها من لوحة الإدارة)."
+        if emptied and not failed:
+            self.stdout.write(self.style.SUCCESS(message))
+        else:
+            self.stdout.write(self.style.WARNING(message))
@@ -0,0 +1,37 @@
+# store/management/commands/snapshot_stock.py
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from store.inventory import SNAPSHOT_LAG, take_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "إنشاء لقطة لكميات المنتجات التي تحركت منذ آخر لقطة، حتى يبقى حساب الكمية في تاريخ "
+        "سابق محدوداً بالحركات بعد آخر لقطة. يُشغَّل دورياً (مثلاً يومياً عبر cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--at',
+            help=f"وقت اللقطة بصيغة ISO (الافتراضي: الآن ناقص {int(SNAPSHOT_LAG.total_seconds() // 60)} دقائق).",
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help="عدد المنتجات في كل دفعة.")
+
+    def handle(self, *args, **options):
+        moment = None
+        if options['at']:
+            try:
+                moment = datetime.fromisoformat(options['at'])
+            except ValueError:
+                raise CommandError("صيغة الوقت غير صحيحة، استخدم مثلاً 2024-01-31T23:59.")
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            if moment > timezone.now() - SNAPSHOT_LAG:
+                raise CommandError("لا يمكن أخذ لقطة لوقت قريب جداً من الآن؛ قد تفوتها حركات لم تُحفظ بعد.")
+
+        created = take_snapshots(moment, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"تم إنشاء {created} لقطة."))
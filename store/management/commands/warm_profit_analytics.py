@@ -0,0 +1,25 @@
+# store/management/commands/warm_profit_analytics.py
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from store.analytics import warm_presets
+
+
+class Command(BaseCommand):
+    help = (
+        "إعادة حساب تحليل الأرباح للفترات الجاهزة (هذا الأسبوع، هذا الشهر...) لكل التجميعات وحفظه في "
+        "الذاكرة المؤقتة، فتُفتح الصفحة دون انتظار الاستعلام التجميعي. يُشغَّل عبر cron بفاصل أقل من "
+        "PROFIT_ANALYTICS_CACHE_TIMEOUT (مثلاً كل 4 دقائق مع المهلة الافتراضية). يفيد فقط مع ذاكرة "
+        "مشتركة بين العمليات (REDIS_URL)، لأن الذاكرة المحلية لكل عملية لا يراها الخادم."
+    )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        warmed = warm_presets()
+        self.stdout.write(self.style.SUCCESS(
+            f"تم حساب {warmed} نتيجة في {time.perf_counter() - started:.1f} ثانية "
+            f"(تبقى {settings.PROFIT_ANALYTICS_CACHE_TIMEOUT} ثانية)."
+        ))
@@ -0,0 +1,164 @@
+# store/metrics.py
+
+"""
+## قياس الطلبات ##
+وسيط (middleware) يقيس لكل طلب: عدد استعلامات SQL وزمنها، والزمن الكلي، وحجم الاستجابة.
+
+- القياس يتم عبر connection.execute_wrapper، فلا يحتاج DEBUG=True ولا يخزن نصوص الاستعلامات.
+- النتيجة تُرسل مع كل استجابة في ترويسة Server-Timing (تظهر في أدوات المطور في المتصفح).
+- المجاميع تُحفظ في ذاكرة العامل (process) وتُعرض بصيغة Prometheus النصية على /metrics؛
+  مع عدة عمال gunicorn يقرأ كل طلب سحب أرقام العامل الذي استقبله فقط.
+- QUERY_BUDGETS تحدد أقصى عدد استعلامات لكل واجهة (باسم المسار في urls.py)؛ تجاوزه
+  يُسجَّل في السجل وفي العداد store_query_budget_exceeded_total، ويفحصه الأمر check_query_budgets.
+  الحد (أساس، لكل سطر) يُحسب بعدد الأسطر الذي تضعه الواجهة في request.query_budget_lines.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# حدود فئات زمن الاستجابة (بالثواني) في مخطط Prometheus.
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def query_budget(view_name, lines=0):
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+    if isinstance(budget, (tuple, list)):
+        base, per_line = budget
+        return base + per_line * lines
+    return budget
+
+
+class QueryTimer:
+    """يُمرَّر إلى execute_wrapper ويجمع عدد الاستعلامات وزمنها."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+# ===================================================================
+#   1. المجاميع
+# ===================================================================
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = defaultdict(int)            # (view, method, status) -> عدد
+            self.duration_sum = defaultdict(float)       # view -> ثوان
+            self.duration_buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+            self.duration_count = defaultdict(int)
+            self.queries = defaultdict(int)
+            self.query_seconds = defaultdict(float)
+            self.response_bytes = defaultdict(int)
+            self.budget_exceeded = defaultdict(int)
+
+    def observe(self, view, method, status, queries, db_seconds, seconds, size, over_budget):
+        with self._lock:
+            self.requests[(view, method, status)] += 1
+            self.duration_sum[view] += seconds
+            self.duration_count[view] += 1
+            buckets = self.duration_buckets[view]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    buckets[index] += 1
+            self.queries[view] += queries
+            self.query_seconds[view] += db_seconds
+            self.response_bytes[view] += size
+            if over_budget:
+                self.budget_exceeded[view] += 1
+
+    def render(self):
+        """المجاميع بصيغة Prometheus النصية (text/plain; version=0.0.4)."""
+        with self._lock:
+            lines = [
+                '# HELP store_http_requests_total Requests handled, by view, method and status.',
+                '# TYPE store_http_requests_total counter',
+            ]
+            for (view, method, status), count in sorted(self.requests.items()):
+                lines.append(f'store_http_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}')
+
+            lines += [
+                '# HELP store_http_request_duration_seconds Total time spent handling requests.',
+                '# TYPE store_http_request_duration_seconds histogram',
+            ]
+            for view in sorted(self.duration_count):
+                for bound, count in zip(DURATION_BUCKETS, self.duration_buckets[view]):
+                    lines.append(f'store_http_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+                lines.append(f'store_http_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {self.duration_count[view]}')
+                lines.append(f'store_http_request_duration_seconds_sum{{view="{view}"}} {self.duration_sum[view]:.6f}')
+                lines.append(f'store_http_request_duration_seconds_count{{view="{view}"}} {self.duration_count[view]}')
+
+            for name, kind, help_text, values, fmt in (
+                ('store_db_queries_total', 'counter', 'SQL queries issued while handling requests.', self.queries, '{}'),
+                ('store_db_query_duration_seconds_total', 'counter', 'Time spent in SQL queries.', self.query_seconds, '{:.6f}'),
+                ('store_http_response_bytes_total', 'counter', 'Response body bytes (streaming responses excluded).', self.response_bytes, '{}'),
+                ('store_query_budget_exceeded_total', 'counter', 'Requests that issued more queries than QUERY_BUDGETS allows.', self.budget_exceeded, '{}'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for view, value in sorted(values.items()):
+                    lines.append(f'{name}{{view="{view}"}} {fmt.format(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+# ===================================================================
+#   2. الوسيط
+# ===================================================================
+
+def _server_timing(queries, db_seconds, seconds):
+    return (
+        f'db;dur={db_seconds * 1000:.1f};desc="{queries} queries", '
+        f'app;dur={(seconds - db_seconds) * 1000:.1f}, '
+        f'total;dur={seconds * 1000:.1f}'
+    )
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(timer))
+            response = self.get_response(request)
+        seconds = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        budget = query_budget(view, getattr(request, 'query_budget_lines', 0))
+        over_budget = budget is not None and timer.count > budget
+        if over_budget:
+            logger.warning(
+                "الواجهة %s نفذت %d استعلاماً والحد المسموح %d (%s)", view, timer.count, budget, request.path
+            )
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, timer.count, timer.duration, seconds, size, over_budget)
+
+        # الاستجابات المتدفقة لا تُقاس استعلامات مولّدها لأنها تُنفذ بعد خروجها من الوسيط.
+        response['Server-Timing'] = _server_timing(timer.count, timer.duration, seconds)
+        return response
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='اليوم')),
+                ('quantity', models.PositiveBigIntegerField(default=0, verbose_name='عدد القطع المباعة')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='إجمالي المبيعات')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='إجمالي التكلفة')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales', to='store.category', verbose_name='التصنيف')),
+            ],
+            options={
+                'verbose_name': 'ملخص مبيعات يومي',
+                'verbose_name_plural': 'ملخصات المبيعات اليومية',
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['date', 'category'], name='store_dailysummary_date_idx')],
+            },
+        ),
+    ]
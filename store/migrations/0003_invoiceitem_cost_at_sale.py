@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0002_dailysalessummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoiceitem',
+            name='cost_at_sale',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='التكلفة عند البيع'),
+        ),
+        migrations.AddIndex(
+            model_name='invoiceitem',
+            index=models.Index(fields=['invoice', 'quantity', 'price_at_sale', 'cost_at_sale'], name='store_invoiceitem_profit_idx'),
+        ),
+    ]
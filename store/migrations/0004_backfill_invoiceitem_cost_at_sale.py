@@ -0,0 +1,34 @@
+# تعبئة التكلفة عند البيع للبنود القديمة على دفعات.
+# لا يتوفر سعر الشراء التاريخي، لذا يُستخدم سعر الشراء الحالي للمنتج كأفضل تقدير.
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 5000
+
+
+def backfill_cost_at_sale(apps, schema_editor):
+    InvoiceItem = apps.get_model('store', 'InvoiceItem')
+    Product = apps.get_model('store', 'Product')
+
+    purchase_price = Subquery(
+        Product.objects.filter(pk=OuterRef('product_id')).values('purchase_price')[:1]
+    )
+    last_id = InvoiceItem.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        InvoiceItem.objects.filter(
+            pk__gte=start, pk__lt=start + BATCH_SIZE
+        ).update(cost_at_sale=purchase_price)
+
+
+class Migration(migrations.Migration):
+    # كل دفعة تُحفظ في معاملتها الخاصة حتى لا تُقفل الجداول الكبيرة طوال التعبئة.
+    atomic = False
+
+    dependencies = [
+        ('store', '0003_invoiceitem_cost_at_sale'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_cost_at_sale, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# فهارس البحث عن المنتجات حسب نوع قاعدة البيانات:
+# - PostgreSQL: امتداد pg_trgm وفهارس GIN على UPPER(name) و UPPER(sku) (وهي الصيغة التي يولدها icontains).
+# - SQLite: جدول ظل FTS5 بمقسّم trigram تحدّثه triggers عند الإضافة والتعديل والحذف.
+
+import logging
+
+from django.db import migrations
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS store_product_name_trgm ON store_product USING gin (UPPER(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS store_product_sku_trgm ON store_product USING gin (UPPER(sku) gin_trgm_ops)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS store_product_name_trgm",
+    "DROP INDEX IF EXISTS store_product_sku_trgm",
+]
+
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS store_product_fts USING fts5(
+        name, sku, content='store_product', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_insert AFTER INSERT ON store_product BEGIN
+        INSERT INTO store_product_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_delete AFTER DELETE ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_update AFTER UPDATE OF name, sku ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+        INSERT INTO store_product_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+    END""",
+    "INSERT INTO store_product_fts(store_product_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS store_product_fts_insert",
+    "DROP TRIGGER IF EXISTS store_product_fts_delete",
+    "DROP TRIGGER IF EXISTS store_product_fts_update",
+    "DROP TABLE IF EXISTS store_product_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+    elif vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except OperationalError as e:
+            # نسخ SQLite القديمة (< 3.34) لا تدعم مقسّم trigram؛ يعمل البحث حينها بدون فهرس.
+            logger.warning("تعذر إنشاء جدول البحث FTS5: %s", e)
+            _run(schema_editor, SQLITE_REVERSE)
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_REVERSE)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0004_backfill_invoiceitem_cost_at_sale'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
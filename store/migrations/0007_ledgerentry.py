@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('INVOICE', 'فاتورة'), ('PAYMENT', 'دفعة')], max_length=10, verbose_name='نوع الحركة')),
+                ('description', models.CharField(blank=True, max_length=255, verbose_name='البيان')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='المبلغ')),
+                ('balance_after', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='الرصيد بعد الحركة')),
+                ('created_at', models.DateTimeField(verbose_name='التاريخ')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='store.client', verbose_name='العميل')),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='store.invoice', verbose_name='الفاتورة')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='store.payment', verbose_name='الدفعة')),
+            ],
+            options={
+                'verbose_name': 'حركة حساب',
+                'verbose_name_plural': 'كشوف الحسابات',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['client', '-id'], name='store_ledger_client_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# تعبئة كشوف الحسابات للعملاء الحاليين من فواتير الدين والدفعات.
+# نفس منطق store.ledger.rebuild_client_ledger لكن بالنماذج التاريخية للهجرة.
+
+import heapq
+from decimal import Decimal
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_ledger(apps, schema_editor):
+    Client = apps.get_model('store', 'Client')
+    LedgerEntry = apps.get_model('store', 'LedgerEntry')
+
+    for client in Client.objects.order_by('pk').iterator(chunk_size=500):
+        invoices = (
+            (i.created_at, 0, i.pk, i) for i in
+            client.invoices.filter(payment_method='CREDIT').order_by('created_at', 'id').iterator(chunk_size=2000)
+        )
+        payments = (
+            (p.payment_date, 1, p.pk, p) for p in
+            client.payments.order_by('payment_date', 'id').iterator(chunk_size=2000)
+        )
+        balance = Decimal('0.00')
+        batch = []
+        for created_at, order, _pk, source in heapq.merge(invoices, payments, key=lambda row: row[:3]):
+            if order == 0:
+                balance += source.total_amount
+                batch.append(LedgerEntry(
+                    client=client, kind='INVOICE', invoice=source, description=f"فاتورة رقم {source.pk}",
+                    amount=source.total_amount, balance_after=balance, created_at=created_at,
+                ))
+            else:
+                balance -= source.amount
+                batch.append(LedgerEntry(
+                    client=client, kind='PAYMENT', payment=source, description=(source.notes or "دفعة")[:255],
+                    amount=source.amount, balance_after=balance, created_at=created_at,
+                ))
+            if len(batch) >= BATCH_SIZE:
+                LedgerEntry.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            LedgerEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_ledgerentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
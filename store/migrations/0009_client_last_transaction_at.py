@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_backfill_ledgerentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='last_transaction_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='آخر تعامل'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['-last_transaction_at', '-id'], name='store_client_last_tx_idx'),
+        ),
+    ]
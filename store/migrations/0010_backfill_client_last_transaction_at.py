@@ -0,0 +1,42 @@
+# تعبئة وقت آخر تعامل للعملاء الحاليين من أحدث فاتورة أو دفعة، على دفعات.
+
+from django.db import migrations
+from django.db.models import Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+BATCH_SIZE = 5000
+
+
+def backfill_last_transaction_at(apps, schema_editor):
+    Client = apps.get_model('store', 'Client')
+    Invoice = apps.get_model('store', 'Invoice')
+    Payment = apps.get_model('store', 'Payment')
+
+    last_invoice = Subquery(
+        Invoice.objects.filter(client=OuterRef('pk')).order_by().values('client')
+        .annotate(last=Max('created_at')).values('last')[:1]
+    )
+    last_payment = Subquery(
+        Payment.objects.filter(client=OuterRef('pk')).order_by().values('client')
+        .annotate(last=Max('payment_date')).values('last')[:1]
+    )
+    # Greatest تعيد NULL في SQLite إذا كان أحد الطرفين NULL، لذا يُكمَّل كل طرف بالآخر.
+    latest = Greatest(Coalesce(last_invoice, last_payment), Coalesce(last_payment, last_invoice))
+
+    last_id = Client.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        Client.objects.filter(
+            pk__gte=start, pk__lt=start + BATCH_SIZE
+        ).update(last_transaction_at=latest)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('store', '0009_client_last_transaction_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_last_transaction_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_invoice_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SALE', 'بيع'), ('RESTOCK', 'توريد'), ('ADJUSTMENT', 'تسوية جرد'), ('RETURN', 'مرتجع')], max_length=12, verbose_name='نوع الحركة')),
+                ('quantity', models.IntegerField(verbose_name='التغير في الكمية')),
+                ('note', models.CharField(blank=True, max_length=255, verbose_name='ملاحظة')),
+                ('created_at', models.DateTimeField(verbose_name='التاريخ')),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='store.invoice', verbose_name='الفاتورة')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='store.product', verbose_name='القطعة')),
+            ],
+            options={
+                'verbose_name': 'حركة مخزون',
+                'verbose_name_plural': 'حركات المخزون',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['product', 'created_at'], name='store_stockmove_product_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='الكمية')),
+                ('taken_at', models.DateTimeField(verbose_name='وقت اللقطة')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='store.product', verbose_name='القطعة')),
+            ],
+            options={
+                'verbose_name': 'لقطة مخزون',
+                'verbose_name_plural': 'لقطات المخزون',
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['product', '-taken_at'], name='store_stocksnap_product_idx')],
+            },
+        ),
+    ]
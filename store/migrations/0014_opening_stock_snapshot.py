@@ -0,0 +1,32 @@
+# لقطة افتتاحية لكمية كل منتج حالي، فيبدأ سجل حركات المخزون من الكميات الموجودة.
+
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 5000
+
+
+def opening_snapshot(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    StockSnapshot = apps.get_model('store', 'StockSnapshot')
+
+    taken_at = timezone.now()
+    batch = []
+    for product_id, quantity in Product.objects.order_by('pk').values_list('pk', 'stock_quantity').iterator(chunk_size=BATCH_SIZE):
+        batch.append(StockSnapshot(product_id=product_id, quantity=quantity, taken_at=taken_at))
+        if len(batch) >= BATCH_SIZE:
+            StockSnapshot.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        StockSnapshot.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_stockmovement_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.RunPython(opening_snapshot, migrations.RunPython.noop),
+    ]
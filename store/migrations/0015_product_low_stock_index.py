@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0014_opening_stock_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stock_quantity__lte', models.F('reorder_level'))), fields=['stock_quantity'], name='store_product_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_product_low_stock_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderSuggestion',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reorder_suggestion', serialize=False, to='store.product', verbose_name='القطعة')),
+                ('average_daily_sales', models.FloatField(verbose_name='متوسط البيع اليومي')),
+                ('smoothed_daily_sales', models.FloatField(verbose_name='سرعة البيع (تنعيم أسي)')),
+                ('days_of_cover', models.FloatField(blank=True, null=True, verbose_name='أيام التغطية')),
+                ('reorder_level', models.PositiveIntegerField(verbose_name='حد الطلب المقترح')),
+                ('order_quantity', models.PositiveIntegerField(verbose_name='كمية الطلب المقترحة')),
+                ('computed_at', models.DateTimeField(verbose_name='وقت الحساب')),
+            ],
+            options={
+                'verbose_name': 'اقتراح إعادة طلب',
+                'verbose_name_plural': 'اقتراحات إعادة الطلب',
+                'indexes': [models.Index(condition=models.Q(('order_quantity__gt', 0)), fields=['days_of_cover'], name='store_reorder_needed_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_reordersuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='unapplied_credit',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='رصيد دائن غير موزع'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='outstanding_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, verbose_name='المتبقي غير المسدد'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('outstanding_amount__gt', 0)), fields=['client', 'created_at'], name='store_invoice_open_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# توزيع الدفعات الحالية على فواتير الدين من الأقدم (FIFO) لتعبئة المتبقي من كل فاتورة
+# والرصيد الدائن لكل عميل. نفس منطق store.aging.rebuild_aging لكن بالنماذج التاريخية للهجرة.
+
+import heapq
+from collections import deque
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_outstanding(apps, schema_editor):
+    Client = apps.get_model('store', 'Client')
+    Invoice = apps.get_model('store', 'Invoice')
+    Payment = apps.get_model('store', 'Payment')
+
+    invoices = (
+        (client_id, created_at, 0, pk, amount) for client_id, created_at, pk, amount in
+        Invoice.objects.filter(payment_method='CREDIT', client__isnull=False).order_by('client_id', 'created_at', 'id')
+        .values_list('client_id', 'created_at', 'id', 'total_amount').iterator(chunk_size=5000)
+    )
+    payments = (
+        (client_id, payment_date, 1, pk, amount) for client_id, payment_date, pk, amount in
+        Payment.objects.order_by('client_id', 'payment_date', 'id')
+        .values_list('client_id', 'payment_date', 'id', 'amount').iterator(chunk_size=5000)
+    )
+    open_batch, credit_batch = [], []
+    for client_id, events in groupby(heapq.merge(invoices, payments, key=lambda row: row[:4]), key=lambda row: row[0]):
+        open_invoices = deque()
+        credit = Decimal('0.00')
+        for _client_id, _date, order, pk, amount in events:
+            if order == 0:
+                used = min(credit, amount)
+                credit -= used
+                if amount - used:
+                    open_invoices.append([pk, amount - used])
+                continue
+            while amount and open_invoices:
+                applied = min(amount, open_invoices[0][1])
+                open_invoices[0][1] -= applied
+                amount -= applied
+                if not open_invoices[0][1]:
+                    open_invoices.popleft()
+            credit += amount
+        # القيمة الافتراضية صفر، فتُكتب الفواتير المفتوحة والأرصدة الدائنة فقط.
+        open_batch.extend(Invoice(pk=pk, outstanding_amount=outstanding) for pk, outstanding in open_invoices)
+        if credit:
+            credit_batch.append(Client(pk=client_id, unapplied_credit=credit))
+        if len(open_batch) >= BATCH_SIZE:
+            Invoice.objects.bulk_update(open_batch, ['outstanding_amount'])
+            open_batch = []
+        if len(credit_batch) >= BATCH_SIZE:
+            Client.objects.bulk_update(credit_batch, ['unapplied_credit'])
+            credit_batch = []
+    Invoice.objects.bulk_update(open_batch, ['outstanding_amount'])
+    Client.objects.bulk_update(credit_batch, ['unapplied_credit'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0017_invoice_outstanding_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_outstanding, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_backfill_invoice_outstanding_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='المهمة')),
+                ('checkpoint', models.DateTimeField(verbose_name='نقطة التوقف')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تشغيل')),
+            ],
+            options={
+                'verbose_name': 'نقطة توقف مهمة',
+                'verbose_name_plural': 'نقاط توقف المهام',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# الهجرة 0006 (إضافة updated_at) أعادت بناء جدول المنتجات في SQLite فحُذفت معه triggers
+# جدول البحث FTS5 التي أنشأتها 0005، ولم تعد المنتجات الجديدة أو المعدلة تظهر في البحث.
+# تعيد هذه الهجرة إنشاءها ثم تعيد بناء الفهرس من store_product.
+
+from django.db import migrations
+
+TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_insert AFTER INSERT ON store_product BEGIN
+        INSERT INTO store_product_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_delete AFTER DELETE ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS store_product_fts_update AFTER UPDATE OF name, sku ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+        INSERT INTO store_product_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+    END""",
+]
+
+
+def restore_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    # جدول FTS5 غير موجود في PostgreSQL، أو في SQLite قديم لا يدعم مقسّم trigram (انظر 0005).
+    if connection.vendor != 'sqlite' or 'store_product_fts' not in connection.introspection.table_names():
+        return
+    for statement in TRIGGERS:
+        schema_editor.execute(statement)
+    schema_editor.execute("INSERT INTO store_product_fts(store_product_fts) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_job_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_triggers, migrations.RunPython.noop),
+    ]
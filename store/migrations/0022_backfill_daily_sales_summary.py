@@ -0,0 +1,94 @@
+# تعبئة الملخص اليومي (DailySalesSummary، الهجرة 0002) من بنود الفواتير السابقة.
+# تقرير الأرباح يقرأ الملخص فقط، فبدون هذه التعبئة يظهر كل السجل السابق للنشر بصفر.
+# نفس تجميع rebuild_daily_summary (store/reports.py) لكن على نوافذ من أيام العمل:
+# كل نافذة تُحذف صفوفها وتُعاد كتابتها في معاملتها الخاصة، فيُعاد حساب ما سجله التحديث
+# التدريجي بعد النشر أيضاً ولا يتكرر.
+# حدود أيام العمل منسوخة من store/periods.py كما كانت عند كتابة الهجرة، حتى لا يتغير
+# سلوكها مع تعديلات ذلك الملف لاحقاً.
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations, transaction
+from django.db.models import DateTimeField, DecimalField, ExpressionWrapper, F, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+WINDOW_DAYS = 31
+BATCH_SIZE = 1000
+
+
+def shop_timezone():
+    return ZoneInfo(getattr(settings, 'SHOP_TIME_ZONE', settings.TIME_ZONE))
+
+
+def cutover_hour():
+    return getattr(settings, 'SHOP_DAY_CUTOVER_HOUR', 0)
+
+
+def business_date(moment):
+    local = timezone.localtime(moment, shop_timezone())
+    return (local - timedelta(hours=cutover_hour())).date()
+
+
+def business_day_start(day):
+    local = datetime.combine(day, time(cutover_hour()), tzinfo=shop_timezone())
+    return local.astimezone(dt_timezone.utc)
+
+
+def business_date_expression(field):
+    moment = F(field)
+    if cutover_hour():
+        moment = ExpressionWrapper(moment - timedelta(hours=cutover_hour()), output_field=DateTimeField())
+    return TruncDate(moment, tzinfo=shop_timezone())
+
+
+def backfill_daily_summary(apps, schema_editor):
+    Invoice = apps.get_model('store', 'Invoice')
+    InvoiceItem = apps.get_model('store', 'InvoiceItem')
+    DailySalesSummary = apps.get_model('store', 'DailySalesSummary')
+
+    bounds = Invoice.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None:
+        return
+    day, last_day = business_date(bounds['first']), business_date(bounds['last'])
+
+    line_total = ExpressionWrapper(F('price_at_sale') * F('quantity'), output_field=DecimalField())
+    line_cost = ExpressionWrapper(F('cost_at_sale') * F('quantity'), output_field=DecimalField())
+    while day <= last_day:
+        end = day + timedelta(days=WINDOW_DAYS)
+        rows = InvoiceItem.objects.filter(
+            invoice__created_at__gte=business_day_start(day), invoice__created_at__lt=business_day_start(end),
+        ).annotate(
+            day=business_date_expression('invoice__created_at'),
+        ).values('day', 'product__category').annotate(
+            total_quantity=Sum('quantity'), total_revenue=Sum(line_total), total_cost=Sum(line_cost),
+        ).order_by()
+        with transaction.atomic():
+            DailySalesSummary.objects.filter(date__gte=day, date__lt=end).delete()
+            DailySalesSummary.objects.bulk_create([
+                DailySalesSummary(
+                    date=row['day'],
+                    category_id=row['product__category'],
+                    quantity=row['total_quantity'] or 0,
+                    revenue=row['total_revenue'] or Decimal('0.00'),
+                    cost=row['total_cost'] or Decimal('0.00'),
+                )
+                for row in rows
+            ], batch_size=BATCH_SIZE)
+        day = end
+
+
+class Migration(migrations.Migration):
+    # كل نافذة تُحفظ في معاملتها الخاصة حتى لا تُقفل الجداول الكبيرة طوال التعبئة.
+    atomic = False
+
+    dependencies = [
+        ('store', '0021_product_upper_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_summary, migrations.RunPython.noop),
+    ]
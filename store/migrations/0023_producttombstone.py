@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0022_backfill_daily_sales_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(verbose_name='معرّف القطعة')),
+                ('deleted_at', models.DateTimeField(db_index=True, verbose_name='وقت الحذف')),
+            ],
+            options={
+                'verbose_name': 'منتج محذوف',
+                'verbose_name_plural': 'المنتجات المحذوفة',
+            },
+        ),
+    ]
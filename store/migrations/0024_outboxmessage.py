@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0023_producttombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.TextField(verbose_name='النص')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='وقت الإنشاء')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='موعد المحاولة التالية')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('claim_token', models.CharField(blank=True, editable=False, max_length=32, verbose_name='رمز الحجز')),
+                ('failed', models.BooleanField(default=False, verbose_name='فشل نهائياً')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+            ],
+            options={
+                'verbose_name': 'إشعار بانتظار الإرسال',
+                'verbose_name_plural': 'صندوق صادر الإشعارات',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('failed', False)), fields=['available_at'], name='store_outbox_due_idx')],
+            },
+        ),
+    ]
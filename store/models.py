@@ -1,6 +1,8 @@
 # store/models.py
 
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 # ===================================================================
@@ -18,6 +20,16 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+# شرط النواقص. يجب أن تستخدمه كل الاستعلامات بهذا الشكل تماماً حتى تطابق شرط الفهرس الجزئي
+# store_product_low_stock_idx (يختار SQLite الفهرس الجزئي فقط إذا تطابق الشرط حرفياً).
+LOW_STOCK = models.Q(stock_quantity__lte=models.F('reorder_level'))
+
+
+class ProductQuerySet(models.QuerySet):
+    def low_stock(self):
+        return self.filter(LOW_STOCK)
+
+
 class Product(models.Model):
     name = models.CharField(_("اسم القطعة"), max_length=200, db_index=True)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("التصنيف"), related_name='products')
@@ -28,11 +40,24 @@ class Product(models.Model):
     
     stock_quantity = models.PositiveIntegerField(_("الكمية في المخزن"), default=0)
     reorder_level = models.PositiveIntegerField(_("حد إعادة الطلب"), default=5)
+    # وقت آخر تعديل، ويُستخدم كرقم إصدار للكتالوج لمزامنة التغييرات فقط مع نقاط البيع.
+    # التحديثات الجماعية (update/bulk_update) يجب أن تضبطه يدوياً.
+    updated_at = models.DateTimeField(_("آخر تعديل"), auto_now=True, db_index=True)
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("منتج")
         verbose_name_plural = _("المنتجات")
         ordering = ['name']
+        indexes = [
+            # فهرس جزئي يحوي النواقص فقط: قاعدة البيانات تحدّثه مع كل تغيير في الكمية أو الحد
+            # (بما فيها التحديثات الجماعية)، فتقرأ تقارير النواقص صفوفه القليلة بدل الجدول كاملاً.
+            models.Index(fields=['stock_quantity'], condition=LOW_STOCK, name='store_product_low_stock_idx'),
+            # البحث من بداية الاسم أو الرمز والمطابقة التامة مع الرمز دون تمييز حالة الأحرف (store/search.py).
+            models.Index(Upper('name'), name='store_product_name_upper_idx'),
+            models.Index(Upper('sku'), name='store_product_sku_upper_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -46,6 +71,74 @@ class Product(models.Model):
         """دالة لحساب الربح من بيع قطعة واحدة."""
         return self.sale_price - self.purchase_price
 
+class ProductTombstone(models.Model):
+    """
+    منتج محذوف: يبقى معرّفه مع وقت الحذف حتى تحذفه مزامنة الكتالوج من ذاكرة العمال
+    الآخرين ومن نقاط البيع (store/catalog.py)، لأن الحذف لا يترك updated_at يمكن تتبعه.
+    """
+    product_id = models.BigIntegerField(_("معرّف القطعة"))
+    deleted_at = models.DateTimeField(_("وقت الحذف"), db_index=True)
+
+    class Meta:
+        verbose_name = _("منتج محذوف")
+        verbose_name_plural = _("المنتجات المحذوفة")
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class StockMovement(models.Model):
+    """
+    سجل حركات المخزون (إضافة فقط، لا تعديل ولا حذف): كل تغيير في Product.stock_quantity
+    يُسجَّل هنا بكميته الموجبة أو السالبة. الكمية في أي لحظة = آخر لقطة قبلها
+    (StockSnapshot) + مجموع الحركات بعد اللقطة حتى تلك اللحظة (store/inventory.py).
+    """
+    class Kind(models.TextChoices):
+        SALE = 'SALE', _('بيع')
+        RESTOCK = 'RESTOCK', _('توريد')
+        ADJUSTMENT = 'ADJUSTMENT', _('تسوية جرد')
+        RETURN = 'RETURN', _('مرتجع')
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name=_("القطعة"), related_name='stock_movements')
+    kind = models.CharField(_("نوع الحركة"), max_length=12, choices=Kind.choices)
+    quantity = models.IntegerField(_("التغير في الكمية"))
+    invoice = models.ForeignKey('Invoice', on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("الفاتورة"), related_name='stock_movements')
+    note = models.CharField(_("ملاحظة"), max_length=255, blank=True)
+    created_at = models.DateTimeField(_("التاريخ"))
+
+    class Meta:
+        verbose_name = _("حركة مخزون")
+        verbose_name_plural = _("حركات المخزون")
+        ordering = ['-id']
+        indexes = [
+            # الكمية في لحظة معينة = مدى واحد على هذا الفهرس بعد آخر لقطة.
+            models.Index(fields=['product', 'created_at'], name='store_stockmove_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.get_kind_display()} {self.quantity:+d}"
+
+
+class StockSnapshot(models.Model):
+    """
+    كمية منتج في لحظة معينة محسوبة من سجل الحركات، تُنشأ دورياً بالأمر snapshot_stock
+    حتى لا يحتاج حساب الكمية في تاريخ سابق لجمع كل الحركات منذ البداية.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name=_("القطعة"), related_name='stock_snapshots')
+    quantity = models.IntegerField(_("الكمية"))
+    taken_at = models.DateTimeField(_("وقت اللقطة"))
+
+    class Meta:
+        verbose_name = _("لقطة مخزون")
+        verbose_name_plural = _("لقطات المخزون")
+        ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['product', '-taken_at'], name='store_stocksnap_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.taken_at:%Y-%m-%d %H:%M}: {self.quantity}"
+
 # ===================================================================
 #   2. نماذج العملاء والديون
 # ===================================================================
@@ -55,11 +148,18 @@ class Client(models.Model):
     phone = models.CharField(_("رقم الهاتف"), max_length=20, blank=True)
     address = models.CharField(_("العنوان"), max_length=250, blank=True)
     total_debt = models.DecimalField(_("إجمالي الدين"), max_digits=10, decimal_places=2, default=0.0)
+    # وقت آخر فاتورة أو دفعة، يُحدَّث مع كل حركة (store/ledger.py) بدلاً من تجميعه من الفواتير والدفعات.
+    last_transaction_at = models.DateTimeField(_("آخر تعامل"), null=True, blank=True, editable=False)
+    # دفعات زادت عن فواتير الدين المفتوحة، تُخصم من فواتير الدين التالية (store/aging.py).
+    unapplied_credit = models.DecimalField(_("رصيد دائن غير موزع"), max_digits=10, decimal_places=2, default=0, editable=False)
 
     class Meta:
         verbose_name = _("عميل")
         verbose_name_plural = _("العملاء")
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['-last_transaction_at', '-id'], name='store_client_last_tx_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -77,11 +177,23 @@ class Invoice(models.Model):
     created_at = models.DateTimeField(_("تاريخ الإنشاء"), auto_now_add=True)
     total_amount = models.DecimalField(_("المبلغ الإجمالي"), max_digits=10, decimal_places=2)
     payment_method = models.CharField(_("طريقة الدفع"), max_length=10, choices=PaymentMethod.choices)
+    # مفتاح تولّده نقطة البيع لكل عملية بيع، حتى لا تُسجَّل نفس العملية مرتين عند إعادة الإرسال.
+    idempotency_key = models.CharField(_("مفتاح منع التكرار"), max_length=64, unique=True, null=True, blank=True, editable=False)
+    # الجزء غير المسدد من فاتورة الدين بعد توزيع الدفعات على الفواتير الأقدم أولاً (store/aging.py).
+    outstanding_amount = models.DecimalField(_("المتبقي غير المسدد"), max_digits=10, decimal_places=2, default=0, editable=False)
 
     class Meta:
         verbose_name = _("فاتورة")
         verbose_name_plural = _("الفواتير")
         ordering = ['-created_at']
+        indexes = [
+            # مدى زمني (created_at >= ? AND created_at < ?) لتقارير الأيام، ويغطي مجموع المبيعات.
+            models.Index(fields=['created_at', 'total_amount'], name='store_invoice_created_idx'),
+            # الفواتير المفتوحة فقط (جزء صغير من الجدول): توزيع الدفعة على فواتير العميل وتقرير أعمار الديون.
+            models.Index(
+                fields=['client', 'created_at'], condition=models.Q(outstanding_amount__gt=0), name='store_invoice_open_idx',
+            ),
+        ]
 
     def __str__(self):
         client_name = self.client.name if self.client else _('زبون نقدي')
@@ -92,10 +204,16 @@ class InvoiceItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT, verbose_name=_("القطعة"), related_name='invoice_items')
     quantity = models.PositiveIntegerField(_("الكمية"))
     price_at_sale = models.DecimalField(_("السعر عند البيع"), max_digits=10, decimal_places=2)
+    # سعر الشراء لحظة البيع، حتى لا يتغير الربح التاريخي عند تعديل سعر الشراء لاحقاً.
+    cost_at_sale = models.DecimalField(_("التكلفة عند البيع"), max_digits=10, decimal_places=2, default=0)
 
     class Meta:
         verbose_name = _("بند فاتورة")
         verbose_name_plural = _("بنود الفواتير")
+        indexes = [
+            # فهرس مغطٍّ لتجميع الأرباح دون الرجوع إلى جدول المنتجات أو صفوف البنود.
+            models.Index(fields=['invoice', 'quantity', 'price_at_sale', 'cost_at_sale'], name='store_invoiceitem_profit_idx'),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
@@ -110,11 +228,45 @@ class Payment(models.Model):
         verbose_name = _("دفعة")
         verbose_name_plural = _("الدفعات")
         ordering = ['-payment_date']
+        indexes = [
+            models.Index(fields=['client', 'payment_date'], name='store_payment_client_date_idx'),
+        ]
 
     def __str__(self):
         # تم إصلاح الخطأ هنا: self. Amount أصبحت self.amount
         return f"{_('دفعة من')} {self.client.name} {_('بقيمة')} {self.amount}"
 
+class LedgerEntry(models.Model):
+    """
+    حركة في كشف حساب العميل مع الرصيد بعدها، تُكتب مع كل فاتورة دين أو دفعة
+    في نفس معاملة تحديث الدين، فلا يحتاج عرض الكشف لإعادة حساب السجل كاملاً.
+    الترتيب المعتمد هو المعرّف (ترتيب التسجيل)، ويمكن إعادة بناء الجدول بالأمر rebuild_ledger.
+    """
+    class Kind(models.TextChoices):
+        INVOICE = 'INVOICE', _('فاتورة')
+        PAYMENT = 'PAYMENT', _('دفعة')
+
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, verbose_name=_("العميل"), related_name='ledger_entries')
+    kind = models.CharField(_("نوع الحركة"), max_length=10, choices=Kind.choices)
+    invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("الفاتورة"), related_name='ledger_entries')
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("الدفعة"), related_name='ledger_entries')
+    description = models.CharField(_("البيان"), max_length=255, blank=True)
+    amount = models.DecimalField(_("المبلغ"), max_digits=12, decimal_places=2)
+    balance_after = models.DecimalField(_("الرصيد بعد الحركة"), max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(_("التاريخ"))
+
+    class Meta:
+        verbose_name = _("حركة حساب")
+        verbose_name_plural = _("كشوف الحسابات")
+        ordering = ['-id']
+        indexes = [
+            # صفحة الكشف = مدى واحد على هذا الفهرس (client = ? AND id < ? ORDER BY id DESC).
+            models.Index(fields=['client', '-id'], name='store_ledger_client_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_id} - {self.get_kind_display()} {self.amount}"
+
 # ===================================================================
 #   4. نماذج أخرى
 # ===================================================================
@@ -130,4 +282,104 @@ class Note(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return self.content[:50]
\ No newline at end of file
+        return self.content[:50]
+
+
+class OutboxMessage(models.Model):
+    """
+    إشعار تليجرام بانتظار الإرسال: يُكتب في نفس معاملة الحدث (فاتورة دين، نقص مخزون)
+    ويحذفه المرسل الخلفي بعد إرساله (store/telegram_bot.py)، فلا يضيع عند إعادة تشغيل العامل.
+    """
+    text = models.TextField(_("النص"))
+    created_at = models.DateTimeField(_("وقت الإنشاء"), auto_now_add=True)
+    # موعد المحاولة التالية، ويُؤجَّل أثناء الإرسال (حجز) وبعد كل فشل مؤقت.
+    available_at = models.DateTimeField(_("موعد المحاولة التالية"), default=timezone.now)
+    attempts = models.PositiveIntegerField(_("عدد المحاولات"), default=0)
+    claim_token = models.CharField(_("رمز الحجز"), max_length=32, blank=True, editable=False)
+    failed = models.BooleanField(_("فشل نهائياً"), default=False)
+    last_error = models.TextField(_("آخر خطأ"), blank=True)
+
+    class Meta:
+        verbose_name = _("إشعار بانتظار الإرسال")
+        verbose_name_plural = _("صندوق صادر الإشعارات")
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['available_at'], condition=models.Q(failed=False), name='store_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.text[:50]
+
+
+class JobCheckpoint(models.Model):
+    """
+    نقطة توقف مهمة دورية (مثل reconcile_debts): التشغيل التالي يراجع ما تغيّر بعدها فقط.
+    """
+    name = models.CharField(_("المهمة"), max_length=100, unique=True)
+    checkpoint = models.DateTimeField(_("نقطة التوقف"))
+    updated_at = models.DateTimeField(_("آخر تشغيل"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("نقطة توقف مهمة")
+        verbose_name_plural = _("نقاط توقف المهام")
+
+    def __str__(self):
+        return f"{self.name} @ {self.checkpoint:%Y-%m-%d %H:%M}"
+
+# ===================================================================
+#   5. نماذج التقارير (جداول تجميع محسوبة مسبقاً)
+# ===================================================================
+
+class DailySalesSummary(models.Model):
+    """
+    ملخص يومي للمبيعات والتكلفة لكل تصنيف، يُحدَّث مع كل فاتورة جديدة
+    ويمكن إعادة بنائه بالكامل عبر الأمر rebuild_sales_summary.
+    قد يوجد أكثر من صف لنفس (اليوم، التصنيف) بعد عمليات متزامنة، لذا
+    يجب دائماً جمع الصفوف (Sum) وعدم افتراض صف واحد.
+    """
+    date = models.DateField(_("اليوم"))
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, verbose_name=_("التصنيف"), related_name='daily_sales')
+    quantity = models.PositiveBigIntegerField(_("عدد القطع المباعة"), default=0)
+    revenue = models.DecimalField(_("إجمالي المبيعات"), max_digits=14, decimal_places=2, default=0)
+    cost = models.DecimalField(_("إجمالي التكلفة"), max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = _("ملخص مبيعات يومي")
+        verbose_name_plural = _("ملخصات المبيعات اليومية")
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date', 'category'], name='store_dailysummary_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.category or _('بدون تصنيف')}"
+
+    @property
+    def profit(self):
+        return self.revenue - self.cost
+
+
+class ReorderSuggestion(models.Model):
+    """
+    خطة إعادة الطلب لكل منتج محسوبة من سرعة البيع الفعلية (store/forecast.py)،
+    تُعاد كتابتها بالكامل مع كل تشغيل للأمر compute_reorder_plan.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, verbose_name=_("القطعة"), related_name='reorder_suggestion')
+    average_daily_sales = models.FloatField(_("متوسط البيع اليومي"))
+    smoothed_daily_sales = models.FloatField(_("سرعة البيع (تنعيم أسي)"))
+    days_of_cover = models.FloatField(_("أيام التغطية"), null=True, blank=True)
+    reorder_level = models.PositiveIntegerField(_("حد الطلب المقترح"))
+    order_quantity = models.PositiveIntegerField(_("كمية الطلب المقترحة"))
+    computed_at = models.DateTimeField(_("وقت الحساب"))
+
+    class Meta:
+        verbose_name = _("اقتراح إعادة طلب")
+        verbose_name_plural = _("اقتراحات إعادة الطلب")
+        indexes = [
+            # صفحة الخطة تعرض المنتجات المطلوب شراؤها فقط، الأقل تغطية أولاً.
+            models.Index(fields=['days_of_cover'], condition=models.Q(order_quantity__gt=0), name='store_reorder_needed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.order_quantity}"
+
@@ -0,0 +1,63 @@
+# store/periods.py
+
+"""
+## أيام العمل وفترات التقارير ##
+يوم العمل في المحل لا يطابق بالضرورة يوم UTC: يُحدد بالمنطقة الزمنية للمحل
+(SHOP_TIME_ZONE) وساعة بداية اليوم (SHOP_DAY_CUTOVER_HOUR، مثلاً 4 تعني أن
+مبيعات ما بعد منتصف الليل حتى الرابعة فجراً تُحسب على اليوم السابق).
+
+كل التقارير تحوّل أيام العمل إلى مدى زمني نصف مفتوح بتوقيت UTC
+(created_at >= البداية AND created_at < النهاية)، فيستخدم الاستعلام فهرس العمود
+مباشرة بدلاً من __date التي تغلّف العمود بدالة تحويل وتمنع استخدام الفهرس.
+"""
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import DateTimeField, ExpressionWrapper, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def shop_timezone():
+    return ZoneInfo(getattr(settings, 'SHOP_TIME_ZONE', settings.TIME_ZONE))
+
+
+def cutover_hour():
+    return getattr(settings, 'SHOP_DAY_CUTOVER_HOUR', 0)
+
+
+def business_date(moment=None):
+    """يوم العمل الذي تتبع له لحظة معينة (الافتراضي: الآن)."""
+    local = timezone.localtime(moment or timezone.now(), shop_timezone())
+    return (local - timedelta(hours=cutover_hour())).date()
+
+
+def business_day_start(day):
+    """بداية يوم العمل كلحظة بتوقيت UTC."""
+    local = datetime.combine(day, time(cutover_hour()), tzinfo=shop_timezone())
+    return local.astimezone(dt_timezone.utc)
+
+
+def business_range(start_day, end_day=None):
+    """
+    المدى [بداية start_day، بداية اليوم التالي لـ end_day) بتوقيت UTC.
+    إذا لم يُحدد end_day يكون المدى يوماً واحداً.
+    """
+    end_day = end_day or start_day
+    return business_day_start(start_day), business_day_start(end_day + timedelta(days=1))
+
+
+def range_filter(field, start_day, end_day=None):
+    """شروط الفلترة لعمود وقت ضمن أيام عمل: {field__gte: ..., field__lt: ...}."""
+    start, end = business_range(start_day, end_day)
+    return {f'{field}__gte': start, f'{field}__lt': end}
+
+
+def business_date_expression(field):
+    """تعبير قاعدة بيانات يحسب يوم العمل لعمود وقت (للتجميع حسب اليوم)."""
+    moment = F(field)
+    if cutover_hour():
+        moment = ExpressionWrapper(moment - timedelta(hours=cutover_hour()), output_field=DateTimeField())
+    return TruncDate(moment, tzinfo=shop_timezone())
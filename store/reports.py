@@ -0,0 +1,131 @@
+# store/reports.py
+
+"""
+## خدمات التقارير ##
+صيانة جدول الملخص اليومي (DailySalesSummary) وقراءة الأرباح منه،
+حتى تكون كلفة تقرير الأرباح بعدد الأيام لا بعدد بنود الفواتير.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q, Sum, DecimalField, ExpressionWrapper
+
+from .models import InvoiceItem, DailySalesSummary
+from .periods import business_date_expression, business_day_start
+
+
+# ===================================================================
+#   1. التحديث التدريجي مع كل فاتورة
+# ===================================================================
+
+def record_sale_in_summary(sale_date, priced_lines):
+    """
+    تضيف بنود فاتورة إلى الملخص اليومي.
+
+    Args:
+        sale_date (date): يوم العمل الذي تمت فيه عملية البيع (store/periods.py).
+        priced_lines (list): عناصر بالشكل (المنتج، الكمية، سعر البيع).
+    """
+    totals = defaultdict(lambda: [0, Decimal('0.00'), Decimal('0.00')])
+    for product, quantity, price in priced_lines:
+        bucket = totals[product.category_id]
+        bucket[0] += quantity
+        bucket[1] += price * quantity
+        bucket[2] += product.purchase_price * quantity  # نفس قيمة cost_at_sale للبند
+
+    for category_id, (quantity, revenue, cost) in totals.items():
+        row_id = DailySalesSummary.objects.filter(
+            date=sale_date, category_id=category_id
+        ).values_list('pk', flat=True).first()
+        if row_id is None:
+            DailySalesSummary.objects.create(
+                date=sale_date, category_id=category_id, quantity=quantity, revenue=revenue, cost=cost
+            )
+        else:
+            DailySalesSummary.objects.filter(pk=row_id).update(
+                quantity=F('quantity') + quantity,
+                revenue=F('revenue') + revenue,
+                cost=F('cost') + cost,
+            )
+
+
+def schedule_sale_in_summary(sale_date, priced_lines):
+    """
+    تؤجل تحديث الملخص إلى ما بعد نجاح معاملة البيع، حتى لا يبقى صف اليوم
+    مقفلاً طوال معاملة الفاتورة فيتسلسل البيع بين نقاط البيع المختلفة.
+    أي فشل هنا يُسجَّل فقط، ويمكن تصحيحه بالأمر rebuild_sales_summary.
+    """
+    transaction.on_commit(lambda: record_sale_in_summary(sale_date, priced_lines), robust=True)
+
+
+# ===================================================================
+#   2. إعادة البناء الكاملة
+# ===================================================================
+
+def rebuild_daily_summary(start_date=None, batch_size=1000):
+    """
+    تعيد حساب الملخص اليومي من بنود الفواتير بتجميع واحد في قاعدة البيانات،
+    اعتماداً على التكلفة المحفوظة في كل بند (cost_at_sale) دون الرجوع للمنتجات.
+    إذا حُدد start_date يُعاد بناء الأيام من ذلك التاريخ فقط. تعيد عدد الصفوف المنشأة.
+    """
+    items = InvoiceItem.objects.all()
+    summaries = DailySalesSummary.objects.all()
+    if start_date:
+        items = items.filter(invoice__created_at__gte=business_day_start(start_date))
+        summaries = summaries.filter(date__gte=start_date)
+
+    rows = items.annotate(
+        day=business_date_expression('invoice__created_at')
+    ).values('day', 'product__category').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum(ExpressionWrapper(F('price_at_sale') * F('quantity'), output_field=DecimalField())),
+        total_cost=Sum(ExpressionWrapper(F('cost_at_sale') * F('quantity'), output_field=DecimalField())),
+    ).order_by()
+
+    with transaction.atomic():
+        summaries.delete()
+        created = 0
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(DailySalesSummary(
+                date=row['day'],
+                category_id=row['product__category'],
+                quantity=row['total_quantity'] or 0,
+                revenue=row['total_revenue'] or Decimal('0.00'),
+                cost=row['total_cost'] or Decimal('0.00'),
+            ))
+            if len(batch) >= batch_size:
+                DailySalesSummary.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        if batch:
+            DailySalesSummary.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+# ===================================================================
+#   3. قراءة التقارير
+# ===================================================================
+
+def profit_totals(periods):
+    """
+    تحسب الربح لعدة فترات باستعلام تجميعي واحد على جدول الملخص.
+
+    Args:
+        periods (dict): {اسم الفترة: (تاريخ البداية، تاريخ النهاية) أو None لكل الفترات}.
+
+    Returns:
+        dict: {اسم الفترة: الربح}.
+    """
+    profit = ExpressionWrapper(F('revenue') - F('cost'), output_field=DecimalField())
+    aggregates = {}
+    for name, date_range in periods.items():
+        if date_range is None:
+            aggregates[name] = Sum(profit)
+        else:
+            aggregates[name] = Sum(profit, filter=Q(date__range=date_range))
+    totals = DailySalesSummary.objects.aggregate(**aggregates)
+    return {name: value or Decimal('0.00') for name, value in totals.items()}
@@ -0,0 +1,214 @@
+# store/search.py
+
+"""
+## محرك البحث عن المنتجات ##
+واجهة بحث قابلة للتبديل يستخدمها البحث الفوري في نقطة البيع:
+
+- PostgreSQL: فهارس GIN بامتداد pg_trgm على UPPER(name) و UPPER(sku)،
+  فيستفيد استعلام icontains (LIKE '%q%') من الفهرس مباشرة.
+- SQLite (التطوير): جدول ظل FTS5 بمقسّم trigram تحدّثه قاعدة البيانات نفسها
+  عبر triggers (الهجرة 0005)، فيشمل ذلك bulk_create/bulk_update أيضاً.
+  أي هجرة تعيد بناء جدول المنتجات في SQLite تحذف هذه الـ triggers معه، لذا يتحقق منها
+  الأمر check_search_index بعد migrate (build.sh) ويعيد إنشاءها مع --fix.
+- مسار سريع للمطابقة التامة مع الرمز (SKU/باركود).
+- الترتيب: المطابقة من بداية الاسم أو الرمز أولاً، ثم ما يحتوي النص، مع حد أعلى
+  لعدد المرشحين حتى لا تتأثر السرعة بالكلمات الشائعة.
+- كل المطابقات دون تمييز حالة الأحرف ('hy' تجد "Hydraulic Filter")؛ البادئة والرمز
+  التام يستخدمان الفهرسين UPPER(name) و UPPER(sku) في SQLite.
+
+يمكن تحديد المحرك عبر الإعداد PRODUCT_SEARCH_BACKEND (مسار الصنف) أو تركه 'auto'،
+ومنها CatalogSearchBackend الذي يبحث في نسخة الكتالوج داخل ذاكرة كل عامل.
+"""
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+FTS_TABLE = 'store_product_fts'
+
+# نفس تعريفات الهجرة 0005: تُبقي جدول FTS5 مطابقاً لجدول المنتجات.
+FTS_TRIGGERS = {
+    'store_product_fts_insert': """CREATE TRIGGER IF NOT EXISTS store_product_fts_insert AFTER INSERT ON store_product BEGIN
+        INSERT INTO store_product_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+    END""",
+    'store_product_fts_delete': """CREATE TRIGGER IF NOT EXISTS store_product_fts_delete AFTER DELETE ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+    END""",
+    'store_product_fts_update': """CREATE TRIGGER IF NOT EXISTS store_product_fts_update AFTER UPDATE OF name, sku ON store_product BEGIN
+        INSERT INTO store_product_fts(store_product_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+        INSERT INTO store_product_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+    END""",
+}
+
+# فهارس trigram لا تفيد في نص أقصر من ثلاثة أحرف، لذا يُكتفى حينها بالمطابقة من البداية.
+MIN_SUBSTRING_QUERY_LENGTH = 3
+
+# أقصى عدد من نتائج "جزء من النص" يُجلب ثم يُرتب، حتى تبقى كلفة البحث محدودة
+# مهما كانت الكلمة شائعة في الكتالوج.
+SUBSTRING_CANDIDATES = 200
+
+
+class DatabaseSearchBackend:
+    """بحث ORM عام (icontains) يعمل مع أي قاعدة بيانات."""
+
+    def filter(self, queryset, query):
+        """تصفية كاملة (تُستخدم في صفحات القوائم مع الترقيم)."""
+        return queryset.filter(Q(name__icontains=query) | Q(sku__icontains=query))
+
+    def substring_candidates(self, queryset, query, limit):
+        return self.filter(queryset, query)[:limit]
+
+    def prefix_filter(self, queryset, field, query):
+        # على PostgreSQL يصبح UPPER(field) LIKE UPPER('q%') ويخدمه فهرس trigram (الهجرة 0005).
+        return queryset.filter(**{f'{field}__istartswith': query}).order_by(field)
+
+    def exact_sku(self, queryset, query):
+        return queryset.filter(sku__iexact=query).order_by()
+
+    def search(self, query, limit=10):
+        """
+        تعيد قائمة بالمنتجات المتوفرة المطابقة للنص مرتبة حسب الأهمية:
+        الرمز المطابق تماماً، ثم ما يبدأ بالنص (اسماً ثم رمزاً)، ثم ما يحتويه.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        available = Product.objects.filter(stock_quantity__gt=0)
+        # مسار سريع: قارئ الباركود يرسل الرمز كاملاً.
+        exact = list(self.exact_sku(available, query)[:1])
+        if exact:
+            return exact
+
+        results = list(self.prefix_filter(available, 'name', query)[:limit])
+        if len(results) < limit:
+            results += self.prefix_filter(available, 'sku', query).exclude(
+                pk__in=[p.pk for p in results]
+            )[:limit - len(results)]
+        if len(results) < limit and len(query) >= MIN_SUBSTRING_QUERY_LENGTH:
+            candidates = self.substring_candidates(
+                available.exclude(pk__in=[p.pk for p in results]), query, SUBSTRING_CANDIDATES
+            )
+            results += sorted(candidates, key=lambda p: p.name)[:limit - len(results)]
+        return results
+
+    def to_dict(self, product):
+        """الصيغة التي تعيدها واجهة البحث لنقطة البيع."""
+        return {
+            'id': product.id,
+            'name': product.name,
+            'sku': product.sku or '',
+            'price': str(product.sale_price),
+            'stock': product.stock_quantity,
+        }
+
+
+class SQLiteFTSSearchBackend(DatabaseSearchBackend):
+    """يستخدم جدول FTS5 (trigram) للبحث عن جزء من النص دون مسح الجدول كاملاً."""
+
+    def filter(self, queryset, query):
+        if len(query) < MIN_SUBSTRING_QUERY_LENGTH:
+            return queryset.filter(Q(name__istartswith=query) | Q(sku__istartswith=query))
+        return queryset.filter(id__in=self._match_sql(query))
+
+    def substring_candidates(self, queryset, query, limit):
+        # الحد داخل الاستعلام الفرعي يوقف FTS5 مبكراً بدل جمع كل المطابقات ثم قصّها.
+        return queryset.filter(id__in=self._match_sql(query, limit * 2))
+
+    @staticmethod
+    def _match_sql(query, limit=None):
+        phrase = '"' + query.replace('"', '""') + '"'
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        params = [phrase]
+        if limit is not None:
+            sql += " LIMIT %s"
+            params.append(limit)
+        return RawSQL(sql, params)
+
+    def prefix_filter(self, queryset, field, query):
+        # LIKE في SQLite لا يستخدم فهرساً عادياً؛ المدى على UPPER(field) يستخدم فهرس التعبير
+        # (store_product_name_upper_idx / store_product_sku_upper_idx) ويتوقف مبكراً مع LIMIT.
+        query = query.upper()
+        # الترتيب بنفس التعبير حتى تُقرأ أول النتائج من الفهرس مرتبة دون فرز كل المطابقات.
+        return (
+            queryset.alias(prefix_key=Upper(field))
+            .filter(prefix_key__gte=query, prefix_key__lt=query + '\U0010ffff')
+            .order_by('prefix_key')
+        )
+
+    def exact_sku(self, queryset, query):
+        return queryset.alias(sku_key=Upper('sku')).filter(sku_key=query.upper()).order_by()
+
+
+class CatalogSearchBackend(DatabaseSearchBackend):
+    """
+    يبحث في كتالوج الذاكرة (store/catalog.py) بالبادئات دون استعلام لكل ضغطة مفتاح.
+    التصفية في صفحات القوائم تبقى على محرك قاعدة البيانات الافتراضي.
+    """
+
+    def __init__(self):
+        self._database = _default_backend_class()()
+
+    def filter(self, queryset, query):
+        return self._database.filter(queryset, query)
+
+    def search(self, query, limit=10):
+        from .catalog import catalog_index
+        catalog_index.ensure_fresh()
+        return catalog_index.search(query, limit=limit)
+
+    def to_dict(self, entry):
+        return entry
+
+
+_backend = None
+
+
+def _default_backend_class():
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        return SQLiteFTSSearchBackend
+    return DatabaseSearchBackend
+
+
+def missing_fts_triggers():
+    """أسماء triggers جدول البحث المفقودة (قائمة فارغة إذا لم يكن هناك جدول FTS5)."""
+    if connection.vendor != 'sqlite' or FTS_TABLE not in connection.introspection.table_names():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'store_product'")
+        existing = {row[0] for row in cursor.fetchall()}
+    return [name for name in FTS_TRIGGERS if name not in existing]
+
+
+def restore_fts_triggers():
+    """
+    تعيد إنشاء triggers المفقودة ثم تعيد بناء جدول البحث من store_product،
+    لأن المنتجات المضافة أو المعدلة أثناء غيابها لم تُفهرس. تعيد أسماء ما أُعيد إنشاؤه.
+    """
+    missing = missing_fts_triggers()
+    if missing:
+        with connection.cursor() as cursor:
+            for name in missing:
+                cursor.execute(FTS_TRIGGERS[name])
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return missing
+
+
+def get_search_backend():
+    """تعيد محرك البحث المحدد في الإعدادات (يُنشأ مرة واحدة لكل عملية)."""
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', 'auto')
+        backend_class = _default_backend_class() if backend_path == 'auto' else import_string(backend_path)
+        _backend = backend_class()
+    return _backend
+
+
+def search_products(query, limit=10):
+    """تعيد نتائج البحث بصيغة JSON الخاصة بنقطة البيع."""
+    backend = get_search_backend()
+    return [backend.to_dict(result) for result in backend.search(query, limit=limit)]
@@ -1,41 +1,89 @@
 # store/telegram_bot.py
 
-import requests
+import html
+import os
+import threading
+import time
+import uuid
 import logging
+from datetime import timedelta
+
+import requests
 from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
 
 # الحصول على مسجل (logger) خاص بهذا الملف. هذه أفضل من استخدام print().
 logger = logging.getLogger(__name__)
 
-def send_telegram_message(message, fail_silently=True):
-    """
-    ترسل رسالة إلى محادثة التليجرام المحددة في الإعدادات.
+# الحد الأقصى لطول رسالة تليجرام الواحدة (حسب توثيق Bot API).
+TELEGRAM_MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = "\n\n➖➖➖\n\n"
 
-    Args:
-        message (str): النص المراد إرساله.
-        fail_silently (bool): إذا كانت True، لن تسبب الدالة أي خطأ برمجي (exception) 
-                              في حالة فشل الإرسال، بل ستسجل الخطأ فقط.
+
+# ===================================================================
+#   1. الإرسال الفعلي عبر HTTP (جلسة واحدة مشتركة لكل عملية)
+# ===================================================================
+
+_session = None
+_session_pid = None
+
+
+def _get_session():
     """
+    تعيد جلسة requests مشتركة لإعادة استخدام اتصالات TCP/TLS بدلاً من فتح
+    اتصال جديد مع كل رسالة. يتم إنشاء جلسة جديدة بعد fork (عمال gunicorn).
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        _session = requests.Session()
+        _session_pid = os.getpid()
+    return _session
+
+
+def _get_credentials(warn=True):
     token = getattr(settings, 'TELEGRAM_BOT_TOKEN', None)
     chat_id = getattr(settings, 'TELEGRAM_CHAT_ID', None)
-
     if not token or not chat_id:
-        logger.warning("TELEGRAM_BOT_TOKEN أو TELEGRAM_CHAT_ID غير معرف في settings.py. تم إلغاء إرسال الرسالة.")
-        return
+        if warn:
+            logger.warning("TELEGRAM_BOT_TOKEN أو TELEGRAM_CHAT_ID غير معرف في settings.py. تم إلغاء إرسال الرسالة.")
+        return None, None
+    return token, chat_id
 
-    # ملاحظة احترافية: هذه العملية متزامنة (Synchronous). في المشاريع الضخمة،
-    # من الأفضل نقلها إلى عامل خلفية (Background Worker) مثل Celery
-    # لتجنب إبطاء استجابة الموقع للمستخدم. لكنها ممتازة لهذا المشروع.
 
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
+def _post_message(token, chat_id, message):
+    base_url = getattr(settings, 'TELEGRAM_API_BASE_URL', 'https://api.telegram.org').rstrip('/')
+    url = f"{base_url}/bot{token}/sendMessage"
     params = {
         'chat_id': chat_id,
         'text': message,
-        'parse_mode': 'Markdown'
+        # HTML أسهل تهريباً من Markdown: أي نص من المستخدم يمر عبر escape_text فلا يكسر التنسيق.
+        'parse_mode': 'HTML'
     }
-    
+    timeout = getattr(settings, 'TELEGRAM_TIMEOUT', 5)
+    return _get_session().post(url, data=params, timeout=timeout)
+
+
+def send_telegram_message(message, fail_silently=True):
+    """
+    ترسل رسالة إلى محادثة التليجرام المحددة في الإعدادات بشكل متزامن.
+
+    ملاحظة: لا تستدعِ هذه الدالة من داخل مسار طلب HTTP (مثل إنشاء فاتورة)،
+    بل استخدم queue_telegram_message() التي ترسل الرسالة من الخلفية.
+
+    Args:
+        message (str): النص المراد إرساله.
+        fail_silently (bool): إذا كانت True، لن تسبب الدالة أي خطأ برمجي (exception)
+                              في حالة فشل الإرسال، بل ستسجل الخطأ فقط.
+    """
+    token, chat_id = _get_credentials()
+    if not token:
+        return
+
     try:
-        response = requests.post(url, data=params, timeout=5)
+        response = _post_message(token, chat_id, message)
         # التحقق من أن الطلب لم ينجح
         if response.status_code != 200:
             logger.error(
@@ -46,9 +94,283 @@ def send_telegram_message(message, fail_silently=True):
             # إذا لم تكن fail_silently، أثر الخطأ ليتم التعامل معه في مكان آخر
             if not fail_silently:
                 response.raise_for_status()
-    
+
     except requests.exceptions.RequestException as e:
         # هذا يلتقط أخطاء الشبكة مثل انقطاع الاتصال، فشل DNS، إلخ.
         logger.error("حدث خطأ في الشبكة عند محاولة إرسال رسالة تليجرام: %s", e)
         if not fail_silently:
-            raise
\ No newline at end of file
+            raise
+
+
+# ===================================================================
+#   2. صندوق الصادر (Outbox) والمرسل الخلفي
+# ===================================================================
+
+# نتيجة محاولة إرسال واحدة.
+SENT, REJECTED, RETRY = 'sent', 'rejected', 'retry'
+
+# مدة حجز الرسائل أثناء إرسالها: إذا توقف العامل قبل إتمامها تعود متاحة بعدها
+# (قد تتكرر الرسالة حينها مرة، لكنها لا تضيع).
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def escape_text(text):
+    """تهرّب النصوص التي يدخلها المستخدم (أسماء المنتجات والعملاء) قبل وضعها في رسالة HTML."""
+    return html.escape(str(text), quote=False)
+
+
+def split_message(message):
+    """
+    تقسم رسالة أطول من حد تليجرام على حدود الأسطر، حتى لا ينقطع وسم تنسيق
+    في منتصف سطر. السطر الواحد الأطول من الحد (نادر) يُقسم على طوله.
+    """
+    if len(message) <= TELEGRAM_MESSAGE_LIMIT:
+        return [message]
+    parts = []
+    current = ''
+    for line in message.split('\n'):
+        while len(line) > TELEGRAM_MESSAGE_LIMIT:
+            if current:
+                parts.append(current)
+                current = ''
+            parts.append(line[:TELEGRAM_MESSAGE_LIMIT])
+            line = line[TELEGRAM_MESSAGE_LIMIT:]
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > TELEGRAM_MESSAGE_LIMIT:
+            parts.append(current)
+            current = line
+        else:
+            current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+def coalesce(rows):
+    """
+    تدمج رسائل [(المعرّف، النص)] في أقل عدد من رسائل تليجرام دون تجاوز الحد، بالفصل بين
+    الرسائل كاملة فقط. تعيد [(معرّفات الرسائل المدمجة، أجزاء النص)]؛ الرسالة الأطول من الحد
+    تكون وحدها مقسمة إلى عدة أجزاء.
+    """
+    chunks = []
+    ids, current = [], ''
+    for pk, text in rows:
+        if len(text) > TELEGRAM_MESSAGE_LIMIT:
+            if current:
+                chunks.append((ids, [current]))
+                ids, current = [], ''
+            chunks.append(([pk], split_message(text)))
+            continue
+        candidate = f"{current}{MESSAGE_SEPARATOR}{text}" if current else text
+        if len(candidate) > TELEGRAM_MESSAGE_LIMIT:
+            chunks.append((ids, [current]))
+            ids, current = [pk], text
+        else:
+            ids.append(pk)
+            current = candidate
+    if current:
+        chunks.append((ids, [current]))
+    return chunks
+
+
+class TelegramDispatcher:
+    """
+    يرسل رسائل صندوق الصادر (OutboxMessage) من خيط خلفي في كل عامل:
+    - يحجز دفعة من الرسائل المستحقة (فلا يرسلها عاملان معاً) ويدمجها في رسالة واحدة.
+    - إذا رُفضت رسالة مدمجة (400، مثلاً تنسيق خاطئ) تُرسل رسائلها واحدة واحدة،
+      فلا تُسقط رسالة واحدة خاطئة بقية الدفعة، وتبقى المرفوضة في الجدول مع سبب الرفض.
+    - أخطاء الشبكة و5xx و429 تؤجل الرسالة بتأخير أُسّي (أو retry_after) بدل الانتظار في الخيط.
+    - يحترم فاصلاً زمنياً أدنى بين الرسائل.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_sent_at = 0.0
+
+    # --- واجهة الاستخدام ---
+
+    def wake(self):
+        """توقظ الخيط الخلفي (وتشغّله إن لم يكن يعمل) ليرسل الرسائل المستحقة."""
+        token, _chat_id = _get_credentials(warn=False)
+        if not token:
+            return
+        self._ensure_started()
+        self._wake.set()
+
+    def flush(self, timeout=10):
+        """
+        ترسل كل الرسائل المستحقة الآن من الخيط الحالي (للأمر send_telegram_outbox والاختبارات).
+        تعيد True إذا لم يبقَ شيء مستحق قبل انتهاء المهلة.
+        """
+        deadline = time.monotonic() + timeout
+        while self.process_batch():
+            if time.monotonic() >= deadline:
+                return False
+        return True
+
+    def process_batch(self):
+        """تحجز دفعة مستحقة وترسلها وتسجل النتيجة. تعيد عدد الرسائل المعالجة."""
+        token, chat_id = _get_credentials(warn=False)
+        if not token:
+            return 0
+        rows = self._claim(getattr(settings, 'TELEGRAM_MAX_BATCH', 20))
+        if not rows:
+            return 0
+        texts = {pk: text for pk, text, _attempts in rows}
+        results = {}
+        for ids, parts in coalesce([(pk, text) for pk, text, _attempts in rows]):
+            outcome = self._send_parts(token, chat_id, parts)
+            if outcome[0] == REJECTED and len(ids) > 1:
+                for pk in ids:
+                    results[pk] = self._send_parts(token, chat_id, [texts[pk]])
+            else:
+                results.update(dict.fromkeys(ids, outcome))
+        self._record(rows, results)
+        return len(rows)
+
+    # --- التشغيل الداخلي ---
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # بعد fork لا يمكن الوثوق بحالة الخيط والقفل الموروثين من العملية الأم.
+                self._wake = threading.Event()
+                self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='telegram-dispatcher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        poll_interval = getattr(settings, 'TELEGRAM_OUTBOX_POLL_INTERVAL', 30)
+        while True:
+            # الاستيقاظ مع كل رسالة جديدة، ودورياً للرسائل المؤجلة أو التي تركها عامل متوقف.
+            self._wake.wait(poll_interval)
+            self._wake.clear()
+            try:
+                while self.process_batch():
+                    pass
+            except Exception:
+                logger.exception("خطأ غير متوقع في مرسل إشعارات تليجرام.")
+            finally:
+                close_old_connections()
+
+    @staticmethod
+    def _claim(limit):
+        now = timezone.now()
+        token = uuid.uuid4().hex
+        due = OutboxMessage.objects.filter(failed=False, available_at__lte=now)
+        ids = list(due.order_by('id').values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        # الشرط يُعاد تقييمه عند التحديث: ما حجزه عامل آخر قبلنا لم يعد مستحقاً.
+        due.filter(pk__in=ids).update(claim_token=token, available_at=now + CLAIM_LEASE)
+        return list(
+            OutboxMessage.objects.filter(claim_token=token).order_by('id').values_list('id', 'text', 'attempts')
+        )
+
+    def _record(self, rows, results):
+        now = timezone.now()
+        max_retries = getattr(settings, 'TELEGRAM_MAX_RETRIES', 5)
+        backoff = getattr(settings, 'TELEGRAM_RETRY_BACKOFF', 1.0)
+        sent, rejected, retried = [], [], []
+        for pk, _text, attempts in rows:
+            status, error, delay = results[pk]
+            if status == SENT:
+                sent.append(pk)
+            elif status == REJECTED:
+                rejected.append(OutboxMessage(pk=pk, failed=True, last_error=error, claim_token=''))
+            else:
+                delay = delay if delay is not None else backoff * (2 ** attempts)
+                retried.append(OutboxMessage(
+                    pk=pk, attempts=attempts + 1, failed=attempts >= max_retries, last_error=error,
+                    available_at=now + timedelta(seconds=delay), claim_token='',
+                ))
+        if sent:
+            OutboxMessage.objects.filter(pk__in=sent).delete()
+        if rejected:
+            OutboxMessage.objects.bulk_update(rejected, ['failed', 'last_error', 'claim_token'])
+        if retried:
+            OutboxMessage.objects.bulk_update(retried, ['attempts', 'failed', 'last_error', 'available_at', 'claim_token'])
+            for message in retried:
+                if message.failed:
+                    logger.error("تعذر إرسال رسالة تليجرام %s بعد %s محاولات: %s", message.pk, message.attempts, message.last_error)
+
+    def _throttle(self):
+        min_interval = getattr(settings, 'TELEGRAM_MIN_INTERVAL', 1.0)
+        wait = self._last_sent_at + min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_sent_at = time.monotonic()
+
+    def _send_parts(self, token, chat_id, parts):
+        """ترسل أجزاء رسالة بالترتيب وتتوقف عند أول فشل. تعيد (النتيجة، الخطأ، مدة التأجيل أو None)."""
+        for part in parts:
+            outcome = self._send(token, chat_id, part)
+            if outcome[0] != SENT:
+                return outcome
+        return SENT, '', None
+
+    def _send(self, token, chat_id, text):
+        self._throttle()
+        try:
+            response = _post_message(token, chat_id, text)
+        except requests.exceptions.RequestException as e:
+            logger.warning("خطأ في الشبكة عند إرسال رسالة تليجرام: %s", e)
+            return RETRY, str(e), None
+        if response.status_code == 200:
+            return SENT, '', None
+        error = f"{response.status_code}: {response.text[:500]}"
+        if response.status_code == 429:
+            # تليجرام يحدد مدة الانتظار المطلوبة في parameters.retry_after
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after')
+            except ValueError:
+                retry_after = None
+            return RETRY, error, float(retry_after) if retry_after is not None else None
+        if response.status_code < 500:
+            # أخطاء 4xx الأخرى (مثل خطأ في التنسيق) لن تنجح بإعادة المحاولة.
+            logger.error("رفض تليجرام الرسالة. رمز الحالة: %s، الرد: %s", response.status_code, response.text)
+            return REJECTED, error, None
+        logger.warning("رد تليجرام برمز الحالة %s.", response.status_code)
+        return RETRY, error, None
+
+
+dispatcher = TelegramDispatcher()
+
+
+def queue_telegram_message(message):
+    """
+    تحفظ الرسالة في صندوق الصادر ضمن المعاملة الحالية: تُحفظ مع الفاتورة أو تُلغى معها،
+    وتبقى بعد إعادة تشغيل العامل حتى تُرسل. يوقظ المرسل الخلفي بعد نجاح المعاملة (on_commit)،
+    فلا ينتظر الطلب استجابة تليجرام. بدون إعدادات تليجرام لا يُحفظ شيء.
+    """
+    token, _chat_id = _get_credentials(warn=False)
+    if not token:
+        logger.debug("تليجرام غير مُعد، لم تُحفظ الرسالة: %s", message[:100])
+        return
+    OutboxMessage.objects.create(text=message)
+    transaction.on_commit(dispatcher.wake)
+
+
+# ===================================================================
+#   3. صياغة الإشعارات
+# ===================================================================
+
+def format_low_stock_alert(products):
+    """رسالة واحدة لكل المنتجات التي وصلت إلى حد النقص في عملية بيع واحدة."""
+    lines = [f"• <b>{escape_text(product.name)}</b>: الكمية المتبقية <b>{product.stock_quantity}</b>" for product in products]
+    return "📉 <b>نقص في المخزون</b> 📉\n\n" + "\n".join(lines)
+
+
+def format_new_debt_alert(client, invoice_amount):
+    return (
+        f"🚨 <b>دين جديد</b> 🚨\n\nالعميل: <b>{escape_text(client.name)}</b>\n"
+        f"مبلغ الفاتورة: <b>{invoice_amount:.2f}</b>\nإجمالي الدين الحالي: <b>{client.total_debt:.2f}</b>"
+    )
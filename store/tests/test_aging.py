@@ -0,0 +1,125 @@
+# store/tests/test_aging.py
+
+"""
+## اختبار أعمار الديون ##
+توزيع الدفعات على الفواتير المفتوحة (FIFO) كما يتم مع كل بيع آجل ودفعة، ومطابقته لإعادة
+البناء الكاملة rebuild_aging، ومطابقة مجاميع فئات الأعمار لدين العميل.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from store.aging import aging_totals, client_aging, rebuild_aging
+from store.checkout import create_invoice
+from store.models import Category, Client, Invoice, Product
+
+
+class AgingTestCase(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="تصنيف")
+        self.product = Product.objects.create(
+            name="قطعة", sku="AG-1", category=category, purchase_price=Decimal('5.00'),
+            sale_price=Decimal('10.00'), stock_quantity=1000,
+        )
+        self.debtor = Client.objects.create(name="عميل")
+
+    def sell(self, client, quantity):
+        return create_invoice(
+            [{'id': self.product.id, 'quantity': quantity, 'price': '10.00'}],
+            Invoice.PaymentMethod.CREDIT, client,
+        )
+
+    def pay(self, client, amount):
+        self.client.post(reverse('record-payment', args=[client.id]), {'amount': amount})
+
+    def outstanding(self, *invoices):
+        values = dict(Invoice.objects.filter(pk__in=[i.pk for i in invoices]).values_list('pk', 'outstanding_amount'))
+        return [values[invoice.pk] for invoice in invoices]
+
+    def credit(self, client):
+        client.refresh_from_db()
+        return client.unapplied_credit
+
+
+class IncrementalAllocationTests(AgingTestCase):
+    def test_partial_payment_settles_oldest_invoices_first(self):
+        first, second, third = self.sell(self.debtor, 3), self.sell(self.debtor, 2), self.sell(self.debtor, 4)
+        self.pay(self.debtor, '45.00')
+        self.assertEqual(self.outstanding(first, second, third), [Decimal('0.00'), Decimal('5.00'), Decimal('40.00')])
+        self.assertEqual(self.credit(self.debtor), Decimal('0.00'))
+
+    def test_overpayment_becomes_credit_used_by_next_invoice(self):
+        first = self.sell(self.debtor, 2)
+        self.pay(self.debtor, '50.00')
+        self.assertEqual(self.outstanding(first), [Decimal('0.00')])
+        self.assertEqual(self.credit(self.debtor), Decimal('30.00'))
+
+        # الرصيد الدائن يسدد الفاتورة التالية جزئياً ثم ينفد.
+        second = self.sell(self.debtor, 5)
+        self.assertEqual(self.outstanding(second), [Decimal('20.00')])
+        self.assertEqual(self.credit(self.debtor), Decimal('0.00'))
+
+        third = self.sell(self.debtor, 1)
+        self.assertEqual(self.outstanding(third), [Decimal('10.00')])
+
+
+class RebuildAgingTests(AgingTestCase):
+    def mixed_history(self):
+        other = Client.objects.create(name="عميل آخر")
+        invoices = [self.sell(self.debtor, 3), self.sell(other, 4), self.sell(self.debtor, 2)]
+        self.pay(self.debtor, '35.00')
+        invoices.append(self.sell(self.debtor, 6))
+        self.pay(other, '100.00')
+        invoices.append(self.sell(other, 1))
+        invoices.append(self.sell(self.debtor, 2))
+        self.pay(self.debtor, '12.50')
+        # بيع نقدي لا يدخل في الأعمار.
+        invoices.append(create_invoice(
+            [{'id': self.product.id, 'quantity': 1, 'price': '10.00'}], Invoice.PaymentMethod.CASH,
+        ))
+        return invoices, [self.debtor, other]
+
+    def snapshot(self, invoices, clients):
+        return self.outstanding(*invoices), [self.credit(client) for client in clients]
+
+    def test_rebuild_matches_incremental_path(self):
+        invoices, clients = self.mixed_history()
+        expected = self.snapshot(invoices, clients)
+
+        # لا فرق بعد التوزيع التدريجي.
+        self.assertEqual(rebuild_aging()['invoices'], 0)
+        self.assertEqual(self.snapshot(invoices, clients), expected)
+
+        # إفساد التوزيع ثم إعادة بنائه من الفواتير والدفعات.
+        Invoice.objects.filter(client__isnull=False).update(outstanding_amount=Decimal('0.00'))
+        Client.objects.update(unapplied_credit=Decimal('0.00'))
+        stats = rebuild_aging(batch_size=2)
+        self.assertGreater(stats['invoices'], 0)
+        self.assertEqual(stats['credits'], 1)
+        self.assertEqual(self.snapshot(invoices, clients), expected)
+
+    def test_bucket_totals_equal_client_debt(self):
+        now = timezone.now()
+        for days in (10, 45, 75, 120):
+            invoice = self.sell(self.debtor, 1)
+            Invoice.objects.filter(pk=invoice.pk).update(created_at=now - timedelta(days=days))
+        self.pay(self.debtor, '5.00')
+        self.debtor.refresh_from_db()
+
+        row = client_aging().get(client_id=self.debtor.id)
+        self.assertEqual(
+            [row['current'], row['days_31_60'], row['days_61_90'], row['over_90']],
+            [Decimal('10.00'), Decimal('10.00'), Decimal('10.00'), Decimal('5.00')],
+        )
+        self.assertEqual(row['total'], self.debtor.total_debt)
+
+        _invoices, clients = self.mixed_history()
+        totals = aging_totals()
+        bucket_sum = totals['current'] + totals['days_31_60'] + totals['days_61_90'] + totals['over_90']
+        positive_debt = sum((c.total_debt for c in Client.objects.all() if c.total_debt > 0), Decimal('0.00'))
+        self.assertEqual(bucket_sum, totals['total'])
+        self.assertEqual(totals['total'], positive_debt)
@@ -0,0 +1,116 @@
+# store/tests/test_checkout_concurrency.py
+
+"""
+## اختبار ضغط لمحرك البيع ##
+عدة خيوط (threads)، لكل منها اتصال مستقل بقاعدة البيانات، تبيع نفس المنتج بالدين
+لنفس العميل في نفس اللحظة. المطلوب: ألا تصبح الكمية سالبة أبداً، وأن يُباع بالضبط ما
+كان متوفراً، وأن يساوي دين العميل مجموع فواتيره (لا تحديثات ضائعة). وإعادة إرسال نفس
+العملية (نفس مفتاح العملية) من عدة خيوط معاً تُسجَّل فاتورة واحدة فقط.
+
+يعمل مع PostgreSQL، ومع SQLite على ملف (DATABASES['default']['TEST']['NAME'])
+لأن قاعدة الذاكرة المشتركة لا تسمح بكتابات متزامنة من عدة اتصالات.
+"""
+
+import threading
+from decimal import Decimal
+
+from django.db import connection, connections
+from django.db.models import Sum
+from django.test import TransactionTestCase
+
+from store.checkout import InsufficientStockError, create_invoice, create_invoice_once
+from store.models import Client, Invoice, LedgerEntry, Product, StockMovement
+
+THREADS = 8
+ATTEMPTS_PER_THREAD = 6
+STOCK = 20
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="قطعة اختبار", sku="STRESS-1", purchase_price=Decimal('3.00'),
+            sale_price=Decimal('7.50'), stock_quantity=STOCK, reorder_level=0,
+        )
+        self.client_record = Client.objects.create(name="عميل اختبار")
+
+    def _sell(self, start, outcomes):
+        start.wait()
+        try:
+            for _attempt in range(ATTEMPTS_PER_THREAD):
+                try:
+                    create_invoice(
+                        [{'id': self.product.pk, 'quantity': 1}], Invoice.PaymentMethod.CREDIT, self.client_record,
+                    )
+                    outcomes.append('sold')
+                except InsufficientStockError:
+                    outcomes.append('out_of_stock')
+                except Exception as e:  # أي خطأ آخر (جمود، قفل) يُفشل الاختبار
+                    outcomes.append(repr(e))
+        finally:
+            connections.close_all()
+
+    def test_same_sku_from_many_threads(self):
+        self.assertNotEqual(connection.settings_dict['NAME'], ':memory:')
+        start = threading.Barrier(THREADS)
+        outcomes = []
+        threads = [threading.Thread(target=self._sell, args=(start, outcomes)) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        errors = [outcome for outcome in outcomes if outcome not in ('sold', 'out_of_stock')]
+        self.assertEqual(errors, [])
+        self.assertEqual(outcomes.count('sold'), STOCK)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 0)
+        self.assertEqual(
+            StockMovement.objects.filter(product=self.product).aggregate(total=Sum('quantity'))['total'], -STOCK,
+        )
+
+        self.client_record.refresh_from_db()
+        invoices = Invoice.objects.filter(client=self.client_record)
+        self.assertEqual(invoices.count(), STOCK)
+        invoiced = sum(invoices.values_list('total_amount', flat=True), Decimal('0.00'))
+        self.assertEqual(self.client_record.total_debt, invoiced)
+        self.assertEqual(invoiced, STOCK * self.product.sale_price)
+        # آخر رصيد في كشف الحساب يطابق الدين، أي أن الحركات سُجلت بالتتابع.
+        last_entry = LedgerEntry.objects.filter(client=self.client_record).order_by('-id').first()
+        self.assertEqual(last_entry.balance_after, self.client_record.total_debt)
+
+    def _sell_once(self, start, outcomes):
+        start.wait()
+        try:
+            invoice, created = create_invoice_once(
+                'stress-same-key', [{'id': self.product.pk, 'quantity': 2}],
+                Invoice.PaymentMethod.CREDIT, self.client_record,
+            )
+            outcomes.append((invoice.pk, created))
+        except Exception as e:
+            outcomes.append(repr(e))
+        finally:
+            connections.close_all()
+
+    def test_same_idempotency_key_from_many_threads(self):
+        start = threading.Barrier(THREADS)
+        outcomes = []
+        threads = [threading.Thread(target=self._sell_once, args=(start, outcomes)) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        errors = [outcome for outcome in outcomes if not isinstance(outcome, tuple)]
+        self.assertEqual(errors, [])
+        self.assertEqual(len({pk for pk, _created in outcomes}), 1)
+        self.assertEqual([created for _pk, created in outcomes].count(True), 1)
+
+        self.assertEqual(Invoice.objects.filter(client=self.client_record).count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, STOCK - 2)
+        self.client_record.refresh_from_db()
+        self.assertEqual(self.client_record.total_debt, 2 * self.product.sale_price)
+        self.assertEqual(LedgerEntry.objects.filter(client=self.client_record).count(), 1)
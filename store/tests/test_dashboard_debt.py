@@ -0,0 +1,63 @@
+# store/tests/test_dashboard_debt.py
+
+"""
+## اختبار عداد إجمالي الديون في لوحة التحكم ##
+التحديث التدريجي بعد البيع الآجل أو الدفعة يجب أن يطابق إعادة الحساب من قاعدة البيانات
+(مجموع الأرصدة الموجبة فقط)، حتى عندما يصبح رصيد العميل دائناً أو يعود مديناً.
+"""
+
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from store.checkout import create_invoice
+from store.dashboard import _compute_debt_total, clear_dashboard_cache, dashboard_metrics, from_cents
+from store.models import Category, Client, Invoice, Product
+
+
+class DashboardDebtTotalTests(TestCase):
+    def setUp(self):
+        clear_dashboard_cache()
+        self.addCleanup(clear_dashboard_cache)
+        category = Category.objects.create(name="تصنيف")
+        self.product = Product.objects.create(
+            name="قطعة", sku="DT-1", category=category, purchase_price=Decimal('5.00'),
+            sale_price=Decimal('10.00'), stock_quantity=100,
+        )
+        self.client_obj = Client.objects.create(name="عميل")
+        self.other = Client.objects.create(name="عميل آخر")
+        # دين عميل آخر حتى لا يكون المجموع صفراً فيخفي الفرق.
+        self.sell(self.other, 5)
+        dashboard_metrics()
+
+    def sell(self, client, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_invoice(
+                [{'id': self.product.id, 'quantity': quantity, 'price': '10.00'}],
+                Invoice.PaymentMethod.CREDIT, client,
+            )
+
+    def pay(self, client, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('record-payment', args=[client.id]), {'amount': amount})
+
+    def assertCachedMatchesDatabase(self, expected):
+        self.assertEqual(dashboard_metrics()['total_debt_sum'], Decimal(expected))
+        self.assertEqual(from_cents(_compute_debt_total()), Decimal(expected))
+
+    def test_overpayment_subtracts_only_positive_debt(self):
+        self.sell(self.client_obj, 3)
+        self.assertCachedMatchesDatabase('80.00')
+        self.pay(self.client_obj, '100.00')
+        self.assertCachedMatchesDatabase('50.00')
+        self.pay(self.client_obj, '20.00')
+        self.assertCachedMatchesDatabase('50.00')
+
+    def test_sale_against_credit_adds_only_new_positive_debt(self):
+        self.pay(self.client_obj, '40.00')
+        self.assertCachedMatchesDatabase('50.00')
+        self.sell(self.client_obj, 3)
+        self.assertCachedMatchesDatabase('50.00')
+        self.sell(self.client_obj, 2)
+        self.assertCachedMatchesDatabase('60.00')
@@ -0,0 +1,63 @@
+# store/tests/test_query_budgets.py
+
+"""
+## اختبار حدود الاستعلامات ##
+يشغّل الأمر check_query_budgets على قاعدة الاختبار حتى تفشل الاختبارات عند أي تراجع، ويتأكد أن حد
+البيع يكبر بعدد أسطر السلة فلا تتجاوزه السلال الكبيرة ما دام كل سطر يكلف استعلاماً واحداً.
+"""
+
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from store.metrics import query_budget
+from store.models import Category, Client, Invoice, Product
+
+
+class QueryBudgetTests(TestCase):
+    def test_all_views_within_budget(self):
+        out = StringIO()
+        call_command('check_query_budgets', stdout=out)
+        self.assertIn("كل الواجهات ضمن حدودها", out.getvalue())
+
+    def test_command_fails_when_budget_exceeded(self):
+        with override_settings(QUERY_BUDGETS={'api-create-invoice': (5, 1)}):
+            with self.assertRaises(CommandError):
+                call_command('check_query_budgets', stdout=StringIO())
+
+    def test_per_line_budget(self):
+        with override_settings(QUERY_BUDGETS={'api-create-invoice': (14, 1), 'dashboard': 8}):
+            self.assertEqual(query_budget('api-create-invoice'), 14)
+            self.assertEqual(query_budget('api-create-invoice', 40), 54)
+            self.assertEqual(query_budget('dashboard', 40), 8)
+            self.assertIsNone(query_budget('client-list'))
+
+    def test_large_cart_sale_within_budget(self):
+        lines = 60
+        category = Category.objects.create(name="تصنيف")
+        products = Product.objects.bulk_create([
+            Product(
+                name=f"قطعة {i}", sku=f"QT-{i}", category=category, purchase_price=Decimal('5.00'),
+                sale_price=Decimal('8.00'), stock_quantity=10,
+            )
+            for i in range(lines)
+        ])
+        client = Client.objects.create(name="عميل")
+        body = {
+            'cart': [{'id': p.id, 'quantity': 1, 'price': '8.00'} for p in products],
+            'payment_method': Invoice.PaymentMethod.CREDIT,
+            'client_id': client.id,
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('api-create-invoice'), data=json.dumps(body), content_type='application/json',
+                headers={'Idempotency-Key': 'large-cart'},
+            )
+        self.assertLess(response.status_code, 400)
+        self.assertLessEqual(len(queries), query_budget('api-create-invoice', lines))
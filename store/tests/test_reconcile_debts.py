@@ -0,0 +1,95 @@
+# store/tests/test_reconcile_debts.py
+
+"""
+## اختبار مطابقة الديون ##
+reconcile_debts تكشف الفرق بين Client.total_debt والدين المحسوب من الفواتير والدفعات،
+وتصححه مع fix=True، والتشغيل التدريجي يراجع العملاء الذين تعاملوا منذ نقطة التوقف فقط.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from store.checkout import create_invoice
+from store.ledger import RECONCILE_JOB, RECONCILE_LAG, reconcile_debts
+from store.models import Category, Client, Invoice, JobCheckpoint, Product
+
+
+class ReconcileDebtsTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="تصنيف")
+        self.product = Product.objects.create(
+            name="قطعة", sku="RD-1", category=category, purchase_price=Decimal('5.00'),
+            sale_price=Decimal('10.00'), stock_quantity=1000,
+        )
+        self.first = Client.objects.create(name="عميل أول")
+        self.second = Client.objects.create(name="عميل ثان")
+        self.sell(self.first, 3)
+        self.sell(self.second, 2)
+
+    def sell(self, client, quantity):
+        create_invoice(
+            [{'id': self.product.id, 'quantity': quantity, 'price': '10.00'}],
+            Invoice.PaymentMethod.CREDIT, client,
+        )
+
+    def drift(self, client, amount):
+        # تعديل مباشر لا يمر بكشف الحساب ولا يغيّر last_transaction_at.
+        Client.objects.filter(pk=client.pk).update(total_debt=Decimal(amount))
+
+    def debt(self, client):
+        client.refresh_from_db()
+        return client.total_debt
+
+    def test_drift_is_reported_then_fixed(self):
+        self.drift(self.first, '99.00')
+        expected = [(self.first.pk, self.first.name, Decimal('99.00'), Decimal('30.00'))]
+
+        self.assertEqual(reconcile_debts(batch_size=1), expected)
+        self.assertEqual(self.debt(self.first), Decimal('99.00'))
+        # فرق لم يُصحح: لا تتقدم نقطة التوقف.
+        self.assertFalse(JobCheckpoint.objects.filter(name=RECONCILE_JOB).exists())
+
+        self.assertEqual(reconcile_debts(batch_size=1, fix=True), expected)
+        self.assertEqual(self.debt(self.first), Decimal('30.00'))
+        self.assertEqual(self.debt(self.second), Decimal('20.00'))
+        self.assertTrue(JobCheckpoint.objects.filter(name=RECONCILE_JOB).exists())
+
+    def test_second_run_reports_nothing(self):
+        self.drift(self.second, '-5.00')
+        self.assertEqual(len(reconcile_debts(fix=True)), 1)
+        self.assertEqual(reconcile_debts(), [])
+        self.assertEqual(reconcile_debts(incremental=True), [])
+
+    def test_incremental_run_checks_only_clients_touched_since_checkpoint(self):
+        # أول تشغيل تدريجي يراجع الجميع ويحفظ نقطة التوقف (وقت التشغيل ناقص RECONCILE_LAG).
+        self.assertEqual(reconcile_debts(incremental=True), [])
+        checkpoint = JobCheckpoint.objects.get(name=RECONCILE_JOB).checkpoint
+        self.assertLessEqual(checkpoint, timezone.now() - RECONCILE_LAG)
+
+        # كلاهما تعامل قبل نقطة التوقف، ثم تعامل الأول من جديد.
+        Client.objects.update(last_transaction_at=checkpoint - timedelta(minutes=1))
+        self.sell(self.first, 1)
+        self.drift(self.first, '1.00')
+        self.drift(self.second, '2.00')
+
+        self.assertEqual(
+            reconcile_debts(incremental=True),
+            [(self.first.pk, self.first.name, Decimal('1.00'), Decimal('40.00'))],
+        )
+        # التشغيل الكامل وحده يكشف فرق العميل الذي لم يتعامل.
+        self.assertEqual({pk for pk, *_rest in reconcile_debts()}, {self.first.pk, self.second.pk})
+
+    def test_incremental_run_rechecks_clients_within_lag(self):
+        # حركة سُجلت قبل التشغيل بأقل من RECONCILE_LAG قد تكون في معاملة لم تُثبَّت وقتها،
+        # فيراجع التشغيل التالي عميلها مرة أخرى.
+        now = timezone.now()
+        Client.objects.filter(pk=self.first.pk).update(last_transaction_at=now - RECONCILE_LAG * 2)
+        Client.objects.filter(pk=self.second.pk).update(last_transaction_at=now - RECONCILE_LAG / 2)
+        self.assertEqual(reconcile_debts(incremental=True), [])
+
+        self.drift(self.first, '1.00')
+        self.drift(self.second, '2.00')
+        self.assertEqual([pk for pk, *_rest in reconcile_debts(incremental=True)], [self.second.pk])
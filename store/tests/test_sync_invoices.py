@@ -0,0 +1,111 @@
+# store/tests/test_sync_invoices.py
+
+"""
+## اختبار مزامنة مبيعات نقطة البيع غير المتصلة ##
+كل فاتورة في الدفعة لها نقطة حفظ مستقلة: رفض إحداها لا يلغي غيرها، وإعادة إرسال
+الدفعة نفسها تعيد الفواتير المسجلة دون تسجيلها مرة أخرى.
+"""
+
+import json
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from store.checkout import MAX_SYNC_BATCH, sync_invoices
+from store.models import Category, Client, Invoice, Product
+
+
+class SyncInvoicesTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="تصنيف")
+        self.plenty = Product.objects.create(
+            name="متوفر", sku="SY-1", category=category, purchase_price=Decimal('5.00'),
+            sale_price=Decimal('10.00'), stock_quantity=100,
+        )
+        self.scarce = Product.objects.create(
+            name="نادر", sku="SY-2", category=category, purchase_price=Decimal('5.00'),
+            sale_price=Decimal('20.00'), stock_quantity=1,
+        )
+        self.debtor = Client.objects.create(name="عميل")
+
+    def sale(self, key, product, quantity, credit=False):
+        return {
+            'idempotency_key': key,
+            'cart': [{'id': product.id, 'quantity': quantity}],
+            'payment_method': Invoice.PaymentMethod.CREDIT if credit else Invoice.PaymentMethod.CASH,
+            'client_id': self.debtor.id if credit else None,
+        }
+
+    def batch(self):
+        return [
+            self.sale('sync-1', self.plenty, 2),
+            self.sale('sync-2', self.scarce, 3, credit=True),
+            self.sale('sync-3', self.plenty, 1, credit=True),
+        ]
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock_quantity
+
+    def test_rejected_invoice_does_not_roll_back_the_others(self):
+        results = sync_invoices(self.batch())
+
+        self.assertEqual([r['status'] for r in results], ['created', 'error', 'created'])
+        self.assertEqual([r['idempotency_key'] for r in results], ['sync-1', 'sync-2', 'sync-3'])
+        self.assertIsNone(results[1]['invoice_id'])
+        self.assertIn(self.scarce.name, results[1]['message'])
+
+        self.assertEqual(Invoice.objects.count(), 2)
+        self.assertEqual(self.stock(self.plenty), 97)
+        self.assertEqual(self.stock(self.scarce), 1)
+        self.debtor.refresh_from_db()
+        self.assertEqual(self.debtor.total_debt, Decimal('10.00'))
+
+    def test_replayed_batch_returns_existing_invoices(self):
+        first = sync_invoices(self.batch())
+        replay = sync_invoices(self.batch())
+
+        self.assertEqual([r['status'] for r in replay], ['duplicate', 'error', 'duplicate'])
+        self.assertEqual(
+            [r['invoice_id'] for r in replay if r['status'] == 'duplicate'],
+            [r['invoice_id'] for r in first if r['status'] == 'created'],
+        )
+        self.assertEqual(Invoice.objects.count(), 2)
+        self.assertEqual(self.stock(self.plenty), 97)
+        self.debtor.refresh_from_db()
+        self.assertEqual(self.debtor.total_debt, Decimal('10.00'))
+
+    def test_duplicate_key_within_one_batch_is_recorded_once(self):
+        sale = self.sale('sync-same', self.plenty, 1)
+        results = sync_invoices([sale, dict(sale)])
+        self.assertEqual([r['status'] for r in results], ['created', 'duplicate'])
+        self.assertEqual(results[0]['invoice_id'], results[1]['invoice_id'])
+        self.assertEqual(self.stock(self.plenty), 99)
+
+    def test_invalid_sales_are_reported(self):
+        results = sync_invoices([
+            self.sale('', self.plenty, 1),
+            {**self.sale('sync-empty', self.plenty, 1), 'cart': []},
+            {**self.sale('sync-client', self.plenty, 1, credit=True), 'client_id': 999999},
+            {**self.sale('sync-method', self.plenty, 1), 'payment_method': 'BARTER'},
+        ])
+        self.assertEqual([r['status'] for r in results], ['error'] * 4)
+        self.assertTrue(all(r['message'] for r in results))
+        self.assertEqual(Invoice.objects.count(), 0)
+
+    def post(self, sales):
+        return self.client.post(
+            reverse('api-sync-invoices'), data=json.dumps({'invoices': sales}), content_type='application/json',
+        )
+
+    def test_batch_size_is_limited(self):
+        sales = [self.sale(f'sync-max-{i}', self.plenty, 1) for i in range(MAX_SYNC_BATCH + 1)]
+        response = self.post(sales)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['max_batch'], MAX_SYNC_BATCH)
+        self.assertEqual(Invoice.objects.count(), 0)
+
+        response = self.post(sales[:MAX_SYNC_BATCH])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Invoice.objects.count(), MAX_SYNC_BATCH)
@@ -0,0 +1,148 @@
+# store/tests/test_telegram_outbox.py
+
+"""
+## اختبار صندوق صادر تليجرام على خادم HTTP وهمي ##
+خادم محلي يقلّد sendMessage في Bot API ويحفظ ما يصله، ويرد برموز حالة محددة مسبقاً
+حتى تُختبر إعادة المحاولة والرفض دون الاتصال بتليجرام.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from store.models import Client, OutboxMessage, Product
+from store.telegram_bot import (
+    MESSAGE_SEPARATOR, TELEGRAM_MESSAGE_LIMIT, dispatcher, format_low_stock_alert,
+    format_new_debt_alert, queue_telegram_message,
+)
+
+
+class StubTelegramServer:
+    """يحفظ كل رسالة تصله، ويرد بـ 400 على أي نص يحوي BAD_MARKER وبالرموز في responses بالترتيب."""
+
+    BAD_MARKER = '<unclosed'
+
+    def __init__(self):
+        self.received = []
+        self.responses = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+                text = parse_qs(body)['text'][0]
+                stub.received.append(text)
+                if stub.responses:
+                    status, payload = stub.responses.pop(0)
+                elif stub.BAD_MARKER in text:
+                    status, payload = 400, {'ok': False, 'description': "Bad Request: can't parse entities"}
+                else:
+                    status, payload = 200, {'ok': True}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TelegramOutboxTests(TestCase):
+
+    def setUp(self):
+        self.stub = StubTelegramServer().__enter__()
+        self.addCleanup(self.stub.__exit__)
+        settings_override = override_settings(
+            TELEGRAM_BOT_TOKEN='test-token', TELEGRAM_CHAT_ID='42', TELEGRAM_API_BASE_URL=self.stub.url,
+            TELEGRAM_MIN_INTERVAL=0, TELEGRAM_RETRY_BACKOFF=1.0, TELEGRAM_MAX_RETRIES=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_messages_are_persisted_with_the_transaction(self):
+        queue_telegram_message("تُحفظ")
+        try:
+            with transaction.atomic():
+                queue_telegram_message("تُلغى")
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertEqual(list(OutboxMessage.objects.values_list('text', flat=True)), ["تُحفظ"])
+
+    def test_pending_messages_are_coalesced_and_deleted_after_sending(self):
+        for i in range(3):
+            queue_telegram_message(f"رسالة {i}")
+        self.assertTrue(dispatcher.flush())
+        self.assertEqual(self.stub.received, [MESSAGE_SEPARATOR.join(f"رسالة {i}" for i in range(3))])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_user_text_is_escaped(self):
+        product = Product(name="<b>زيت *5W_30*", stock_quantity=1, sale_price=1)
+        client = Client(name="أحمد & <أولاده>", total_debt=10)
+        low_stock = format_low_stock_alert([product])
+        debt = format_new_debt_alert(client, 10)
+        self.assertIn("&lt;b&gt;زيت *5W_30*", low_stock)
+        self.assertIn("أحمد &amp; &lt;أولاده&gt;", debt)
+        self.assertNotIn(StubTelegramServer.BAD_MARKER, low_stock + debt)
+
+    def test_rejected_batch_falls_back_to_single_messages(self):
+        queue_telegram_message("أولى")
+        queue_telegram_message(f"{StubTelegramServer.BAD_MARKER} خاطئة")
+        queue_telegram_message("ثالثة")
+        dispatcher.flush()
+        # الدفعة المدمجة رُفضت، ثم أُرسلت الرسائل واحدة واحدة.
+        self.assertEqual(self.stub.received[1:], ["أولى", f"{StubTelegramServer.BAD_MARKER} خاطئة", "ثالثة"])
+        rejected = OutboxMessage.objects.get()
+        self.assertTrue(rejected.failed)
+        self.assertIn('400', rejected.last_error)
+
+    def test_long_messages_are_split_on_line_boundaries(self):
+        line = "• <b>منتج</b>: الكمية المتبقية <b>1</b>"
+        message = "\n".join([line] * 300)
+        queue_telegram_message(message)
+        dispatcher.flush()
+        self.assertGreater(len(self.stub.received), 1)
+        self.assertTrue(all(len(part) <= TELEGRAM_MESSAGE_LIMIT for part in self.stub.received))
+        self.assertEqual("\n".join(self.stub.received), message)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_transient_errors_are_retried_later(self):
+        self.stub.responses = [(500, {'ok': False}), (429, {'ok': False, 'parameters': {'retry_after': 7}})]
+        queue_telegram_message("مؤجلة")
+        dispatcher.flush()
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.attempts, message.failed, message.claim_token), (1, False, ''))
+        self.assertIn('500', message.last_error)
+
+        # لم يحن موعدها بعد، فلا تُرسل مرة أخرى الآن.
+        dispatcher.flush()
+        self.assertEqual(len(self.stub.received), 1)
+
+        OutboxMessage.objects.update(available_at=message.created_at)
+        dispatcher.flush()
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 2)
+        self.assertGreaterEqual((message.available_at - message.created_at).total_seconds(), 7)
+
+        OutboxMessage.objects.update(available_at=message.created_at)
+        dispatcher.flush()
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(len(self.stub.received), 3)
@@ -13,7 +13,10 @@ urlpatterns = [
     path('products/', views.product_list, name='product-list'),
     path('clients/', views.client_list, name='client-list'),
     path('reports/low-stock/', views.low_stock_report, name='low-stock-report'),
+    path('reports/reorder/', views.reorder_plan_view, name='reorder-plan'),
+    path('reports/debt-aging/', views.debt_aging_view, name='debt-aging'),
     path('reports/profit/', views.profit_report_view, name='profit-report'),
+    path('reports/profit/analytics/', views.profit_analytics_view, name='profit-analytics'),
     path('clients/<int:client_id>/', views.client_detail, name='client-detail'),
 
     # ===================================================================
@@ -31,11 +34,18 @@ urlpatterns = [
     # ===================================================================
     path('clients/record-payment/<int:client_id>/', views.record_payment, name='record-payment'),
     path('reports/low-stock/export/', views.export_low_stock_csv, name='export-low-stock-csv'),
+    path('reports/debt-aging/export/', views.export_debt_aging_csv, name='export-debt-aging-csv'),
+    path('reports/invoice-lines/export/', views.export_invoice_lines_csv, name='export-invoice-lines-csv'),
+    path('reports/product-profit/export/', views.export_product_profit_csv, name='export-product-profit-csv'),
+    path('clients/<int:client_id>/statement/export/', views.export_client_statement_csv, name='export-client-statement-csv'),
 
     # ===================================================================
     #   4. واجهات برمجة التطبيقات (API Endpoints for JavaScript)
     # ===================================================================
     path('api/search-products/', views.api_search_products, name='api-search-products'),
+    path('api/catalog/', views.api_catalog, name='api-catalog'),
     path('api/search-clients/', views.api_search_clients, name='api-search-clients'),
     path('api/create-invoice/', views.api_create_invoice, name='api-create-invoice'),
+    path('api/sync-invoices/', views.api_sync_invoices, name='api-sync-invoices'),
+    path('metrics/', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
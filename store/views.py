@@ -2,28 +2,42 @@
 
 # --- 1. استيراد المكتبات الأساسية ---
 import json
-import csv
-from datetime import datetime, timedelta
+import hashlib
+import logging
+from datetime import date, timedelta
 from decimal import Decimal, InvalidOperation
 from dateutil.relativedelta import relativedelta
 
 # --- 2. استيراد مكونات Django ---
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
-from django.utils import timezone
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.db import transaction
-from django.db.models import Q, F, Sum, Max, Value, CharField, ExpressionWrapper, DecimalField
-from django.db.models.functions import Greatest, Coalesce
+from django.db.models import Q, F, Sum
 from django.core.paginator import Paginator
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, condition
+from django.views.decorators.cache import cache_control
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.translation import gettext_lazy as _
+from django.conf import settings
 
 # --- 3. استيراد النماذج والتوابع المحلية ---
-from .models import Category, Product, Client, Invoice, InvoiceItem, Payment, Note
+from .models import Category, Product, Client, Invoice, Payment, Note, LedgerEntry, ReorderSuggestion
+from . import analytics, exports
+from .aging import BUCKETS as AGING_BUCKETS, aging_totals, apply_payment, client_aging
 from .forms import ClientForm
-from .telegram_bot import send_telegram_message
+from .checkout import MAX_SYNC_BATCH, create_invoice, create_invoice_once, sync_invoices
+from .dashboard import dashboard_metrics, schedule_debt_change_in_dashboard
+from .ledger import ledger_page, post_entry
+from .metrics import registry as metrics_registry
+from .periods import business_date
+from .reports import profit_totals
+from .search import search_products, get_search_backend
+from .catalog import catalog_changes, catalog_version
+
+logger = logging.getLogger(__name__)
 
 
 # --------------------------------------------------------------------------
@@ -39,28 +53,8 @@ def dashboard_view(request):
             messages.success(request, _("تمت إضافة الملاحظة بنجاح."))
         return redirect('dashboard')
 
-    today = timezone.now().date()
-    
-    today_invoices = Invoice.objects.filter(created_at__date=today)
-    daily_sales_total = today_invoices.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
-    daily_invoice_count = today_invoices.count()
-
-    debtor_clients = Client.objects.filter(total_debt__gt=0)
-    total_debt_sum = debtor_clients.aggregate(total=Sum('total_debt'))['total'] or Decimal('0.00')
-    top_debtors = debtor_clients.order_by('-total_debt')[:5]
-
-    top_low_stock = Product.objects.filter(stock_quantity__lte=F('reorder_level')).order_by('stock_quantity')[:5]
-    
-    recent_notes = Note.objects.order_by('-created_at')[:5]
-
-    context = {
-        'daily_sales_total': daily_sales_total,
-        'daily_invoice_count': daily_invoice_count,
-        'total_debt_sum': total_debt_sum,
-        'top_debtors': top_debtors,
-        'top_low_stock': top_low_stock,
-        'recent_notes': recent_notes,
-    }
+    # المؤشرات من الذاكرة المؤقتة (store/dashboard.py)، وتُحسب من قاعدة البيانات عند غيابها فقط.
+    context = dashboard_metrics()
     return render(request, 'store/dashboard.html', context)
 
 
@@ -69,9 +63,7 @@ def product_list(request):
     selected_category_id = request.GET.get('category', "")
     product_queryset = Product.objects.select_related('category').order_by('name')
     if search_query:
-        product_queryset = product_queryset.filter(
-            Q(name__icontains=search_query) | Q(sku__icontains=search_query)
-        )
+        product_queryset = get_search_backend().filter(product_queryset, search_query)
     if selected_category_id:
         product_queryset = product_queryset.filter(category_id=selected_category_id)
     paginator = Paginator(product_queryset, 20)
@@ -95,15 +87,12 @@ def client_list(request):
             Q(name__icontains=search_query) | Q(phone__icontains=search_query)
         )
     total_debt_sum = Client.objects.filter(total_debt__gt=0).aggregate(total=Sum('total_debt'))['total'] or Decimal('0.00')
-    default_date = datetime(1900, 1, 1, tzinfo=timezone.get_current_timezone())
-    clients_with_last_transaction = clients_queryset.annotate(
-        last_invoice_date=Coalesce(Max('invoices__created_at'), Value(default_date)),
-        last_payment_date=Coalesce(Max('payments__payment_date'), Value(default_date))
-    ).annotate(
-        last_transaction_date=Greatest('last_invoice_date', 'last_payment_date')
-    ).order_by('-last_transaction_date')
+    # الترتيب على العمود المحفوظ last_transaction_at يخدمه فهرس واحد، دون تجميع الفواتير والدفعات.
+    clients_queryset = clients_queryset.order_by(F('last_transaction_at').desc(nulls_last=True), '-id')
+    paginator = Paginator(clients_queryset, 25)
+    page_obj = paginator.get_page(request.GET.get('page'))
     context = {
-        'clients': clients_with_last_transaction,
+        'page_obj': page_obj,
         'total_debt_sum': total_debt_sum,
         'search_query': search_query,
     }
@@ -112,42 +101,21 @@ def client_list(request):
 
 def client_detail(request, client_id):
     """
-    ## تم الإصلاح ##
-    يعرض كشف حساب احترافي لعميل معين بطلب واحد من قاعدة البيانات،
-    مع إزالة الترتيب من الاستعلامات الفرعية لضمان التوافق مع SQLite.
+    يعرض كشف حساب العميل من جدول الحركات (LedgerEntry) مع الرصيد المخزن بعد كل حركة،
+    مقسماً إلى صفحات بترقيم المفاتيح (?before=<id>)، فكلفة الصفحة ثابتة مهما طال السجل.
     """
     client = get_object_or_404(Client, id=client_id)
-    
-    invoices = client.invoices.annotate(
-        type=Value('invoice', output_field=CharField()),
-        date=F('created_at'),
-        description=F('id'), 
-        debit=F('total_amount'),
-        credit=Value(Decimal('0.00'))
-    ).values('type', 'date', 'description', 'debit', 'credit').order_by() # <-- الإصلاح هنا
-
-    payments = client.payments.annotate(
-        type=Value('payment', output_field=CharField()),
-        date=F('payment_date'),
-        description=F('notes'),
-        debit=Value(Decimal('0.00')),
-        credit=F('amount')
-    ).values('type', 'date', 'description', 'debit', 'credit').order_by() # <-- الإصلاح هنا
-
-    transactions = invoices.union(payments).order_by('date')
-
-    running_balance = Decimal('0.00')
-    transactions_with_balance = []
-    for tx in transactions:
-        running_balance += (tx['debit'] - tx['credit'])
-        tx['balance_after'] = running_balance
-        transactions_with_balance.append(tx)
-    
-    transactions_with_balance.reverse()
+    try:
+        before = int(request.GET.get('before', 0))
+    except ValueError:
+        before = 0
+    transactions, next_before = ledger_page(client, before=before or None)
 
     context = {
         'client': client,
-        'transactions_with_balance': transactions_with_balance
+        'transactions': transactions,
+        'next_before': next_before,
+        'is_first_page': not before,
     }
     return render(request, 'store/client_detail.html', context)
 
@@ -155,15 +123,12 @@ def client_detail(request, client_id):
 def low_stock_report(request):
     search_query = request.GET.get('q', "")
     sort_by = request.GET.get('sort_by', 'deficit')
-    low_stock_products = Product.objects.filter(
-        stock_quantity__lte=F('reorder_level')
-    ).annotate(
+    # الكمية المقترحة وأيام التغطية من آخر تشغيل لـ compute_reorder_plan (صف واحد لكل منتج، بنفس الاستعلام).
+    low_stock_products = Product.objects.low_stock().select_related('reorder_suggestion').annotate(
         deficit=F('reorder_level') - F('stock_quantity')
     )
     if search_query:
-        low_stock_products = low_stock_products.filter(
-            Q(name__icontains=search_query) | Q(sku__icontains=search_query)
-        )
+        low_stock_products = get_search_backend().filter(low_stock_products, search_query)
     order_field = '-deficit'
     if sort_by == 'name':
         order_field = 'name'
@@ -178,6 +143,51 @@ def low_stock_report(request):
     return render(request, 'store/low_stock_report.html', context)
 
 
+def reorder_plan_view(request):
+    """
+    المنتجات التي اقترحت خطة الطلب (store/forecast.py) إعادة طلبها، الأقرب للنفاد أولاً.
+    القراءة من جدول الاقتراحات المحسوب مسبقاً، فلا يُجمَّع سجل المبيعات عند فتح الصفحة.
+    """
+    suggestions = (
+        ReorderSuggestion.objects.filter(order_quantity__gt=0)
+        .select_related('product')
+        .order_by(F('days_of_cover').asc(nulls_last=True), 'product_id')
+    )
+    paginator = Paginator(suggestions, 50)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'page_obj': page_obj,
+        'computed_at': ReorderSuggestion.objects.order_by('-computed_at').values_list('computed_at', flat=True).first(),
+        'page_title': _('خطة إعادة الطلب'),
+    }
+    return render(request, 'store/reorder_plan.html', context)
+
+
+def debt_aging_view(request):
+    """
+    أعمار الديون لكل عميل: المتبقي من فواتير الدين بعد توزيع الدفعات على الأقدم أولاً،
+    مقسماً حسب عمر الفاتورة. الصفحة استعلام تجميعي على الفواتير المفتوحة فقط (store/aging.py).
+    """
+    sort_by = request.GET.get('sort_by', 'total')
+    orders = {'total': '-total', 'over_90': '-over_90', 'oldest': 'oldest'}
+    if sort_by not in orders:
+        sort_by = 'total'
+    paginator = Paginator(client_aging(order=orders[sort_by]), 25)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    bucket_names = [name for name, _label, _days in AGING_BUCKETS]
+    totals = aging_totals()
+    context = {
+        'page_obj': page_obj,
+        # [(العنوان، المبلغ)] لكل فئة، وفي الجدول قيم كل صف بنفس الترتيب.
+        'bucket_totals': [(label, totals[name]) for name, label, _days in AGING_BUCKETS],
+        'rows': [(row, [row[name] for name in bucket_names]) for row in page_obj],
+        'total_outstanding': totals['total'],
+        'sort_by': sort_by,
+        'page_title': _('أعمار الديون'),
+    }
+    return render(request, 'store/debt_aging.html', context)
+
+
 def pos_view(request):
     return render(request, 'store/pos.html')
 
@@ -187,7 +197,6 @@ def pos_view(request):
 # --------------------------------------------------------------------------
 
 @require_POST
-@transaction.atomic
 def record_payment(request, client_id):
     """
     ## تم الإصلاح ##
@@ -195,7 +204,7 @@ def record_payment(request, client_id):
     """
     client = get_object_or_404(Client, id=client_id)
     amount_str = request.POST.get('amount')
-    notes = request.POST.get('notes')
+    notes = request.POST.get('notes', '')
 
     if amount_str:
         try:
@@ -204,9 +213,13 @@ def record_payment(request, client_id):
             if amount <= 0:
                 raise ValueError("المبلغ يجب أن يكون أكبر من صفر.")
 
-            Payment.objects.create(client=client, amount=amount, notes=notes)
-            client.total_debt -= amount
-            client.save()
+            # المعاملة تحيط بالكتابة فقط: خطأ يُلتقط أدناه بعد إنشاء الدفعة يلغيها كاملة.
+            with transaction.atomic():
+                payment = Payment.objects.create(client=client, amount=amount, notes=notes)
+                # تحديث ذري للدين داخل قاعدة البيانات وتسجيل الدفعة في كشف الحساب.
+                entry = post_entry(client, LedgerEntry.Kind.PAYMENT, amount, payment=payment, created_at=payment.payment_date)
+                apply_payment(client, amount)
+                schedule_debt_change_in_dashboard(entry)
             messages.success(request, _("تم تسجيل الدفعة بنجاح."))
         
         except (ValueError, InvalidOperation):
@@ -215,49 +228,67 @@ def record_payment(request, client_id):
     return redirect('client-detail', client_id=client_id)
 
 
+def _export_date_range(request):
+    """فترة التصدير من ?start=&end= (YYYY-MM-DD)، والافتراضي من أول الشهر الحالي حتى اليوم."""
+    today = business_date()
+    try:
+        start = date.fromisoformat(request.GET.get('start', ''))
+    except ValueError:
+        start = today.replace(day=1)
+    try:
+        end = date.fromisoformat(request.GET.get('end', ''))
+    except ValueError:
+        end = today
+    return start, max(start, end)
+
+
 def export_low_stock_csv(request):
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="low_stock_report.csv"'
-    response.write(u'\ufeff'.encode('utf8'))
-    writer = csv.writer(response)
-    writer.writerow([_('اسم المنتج'), _('الكمية المتبقية'), _('حد إعادة الطلب'), _('مقدار النقص')])
-    products = Product.objects.filter(stock_quantity__lte=F('reorder_level')).annotate(
-        deficit=F('reorder_level') - F('stock_quantity')
-    ).order_by('-deficit')
-    for product in products:
-        writer.writerow([product.name, product.stock_quantity, product.reorder_level, product.deficit])
-    return response
+    return exports.stream_csv('low_stock_report.csv', exports.low_stock_header(), exports.low_stock_rows())
+
+
+def export_debt_aging_csv(request):
+    return exports.stream_csv(
+        f'debt_aging_{business_date()}.csv', exports.debt_aging_header(), exports.debt_aging_rows()
+    )
+
+
+def export_invoice_lines_csv(request):
+    start, end = _export_date_range(request)
+    return exports.stream_csv(
+        f'invoice_lines_{start}_{end}.csv', exports.invoice_line_header(), exports.invoice_line_rows(start, end)
+    )
+
+
+def export_product_profit_csv(request):
+    start, end = _export_date_range(request)
+    return exports.stream_csv(
+        f'product_profit_{start}_{end}.csv', exports.product_profit_header(), exports.product_profit_rows(start, end)
+    )
+
+
+def export_client_statement_csv(request, client_id):
+    client = get_object_or_404(Client, id=client_id)
+    return exports.stream_csv(
+        f'client_{client.id}_statement.csv', exports.client_statement_header(), exports.client_statement_rows(client)
+    )
 
 
 def profit_report_view(request):
-    now = timezone.now()
-    today = now.date()
+    """
+    يقرأ الأرباح من جدول الملخص اليومي باستعلام واحد بدلاً من المرور
+    على كل بنود الفواتير لكل فترة.
+    """
+    # الفترات بأيام العمل، وهي نفس الأيام المسجلة في جدول الملخص.
+    today = business_date()
     time_periods = {
         'today': (today, today),
         'this_week': (today - timedelta(days=today.weekday()), today),
         'this_month': (today.replace(day=1), today),
         'last_6_months': (today - relativedelta(months=6), today),
         'this_year': (today.replace(day=1, month=1), today),
+        'all_time': None,
     }
-    def calculate_profit(start_date=None, end_date=None):
-        queryset = InvoiceItem.objects.select_related('product')
-        if start_date and end_date:
-            queryset = queryset.filter(invoice__created_at__date__range=(start_date, end_date))
-        total_profit = queryset.annotate(
-            profit_per_item=ExpressionWrapper(
-                (F('price_at_sale') - F('product__purchase_price')) * F('quantity'),
-                output_field=DecimalField()
-            )
-        ).aggregate(total_profit=Sum('profit_per_item'))['total_profit']
-        return total_profit or Decimal('0.00')
-    profits = {
-        'today': calculate_profit(time_periods['today'][0], time_periods['today'][1]),
-        'this_week': calculate_profit(time_periods['this_week'][0], time_periods['this_week'][1]),
-        'this_month': calculate_profit(time_periods['this_month'][0], time_periods['this_month'][1]),
-        'last_6_months': calculate_profit(time_periods['last_6_months'][0], time_periods['last_6_months'][1]),
-        'this_year': calculate_profit(time_periods['this_year'][0], time_periods['this_year'][1]),
-        'all_time': calculate_profit(),
-    }
+    profits = profit_totals(time_periods)
     context = {
         'profits': profits,
         'page_title': _('تقرير الأرباح')
@@ -265,94 +296,177 @@ def profit_report_view(request):
     return render(request, 'store/profit_report.html', context)
 
 
+def profit_analytics_view(request):
+    """
+    أكثر المنتجات أو التصنيفات أو العملاء مبيعاً وربحاً في فترة، مع المقارنة بالفترة السابقة
+    بنفس الطول. الأرقام من store/analytics.py (محفوظة مؤقتاً)، والصفحة تقرأ أسماء صفوفها فقط.
+    """
+    periods = analytics.preset_periods()
+    period = request.GET.get('period', 'this_month')
+    if period in periods:
+        _label, start, end = periods[period]
+    else:
+        period = 'custom'
+        start, end = _export_date_range(request)
+    grouping = request.GET.get('group', 'product')
+    if grouping not in analytics.GROUPINGS:
+        grouping = 'product'
+    sort = request.GET.get('sort', 'profit')
+    if sort not in analytics.SORTS:
+        sort = 'profit'
+
+    groups, totals = analytics.ranked_groups(grouping, start, end, sort)
+    page_obj = Paginator(groups, 25).get_page(request.GET.get('page'))
+    page_obj.object_list = analytics.page_groups(grouping, page_obj.object_list)
+    previous_start, previous_end = analytics.previous_period(start, end)
+    context = {
+        'page_obj': page_obj,
+        'totals': totals,
+        'periods': {name: label for name, (label, _start, _end) in periods.items()},
+        'period': period,
+        'start': start,
+        'end': end,
+        'previous_start': previous_start,
+        'previous_end': previous_end,
+        'groupings': analytics.GROUPINGS,
+        'grouping': grouping,
+        'grouping_label': analytics.GROUPINGS[grouping],
+        'sorts': analytics.SORTS,
+        'sort': sort,
+        'page_title': _('تحليل الأرباح'),
+    }
+    return render(request, 'store/profit_analytics.html', context)
+
+
 # --------------------------------------------------------------------------
 # القسم الثالث: واجهات برمجة التطبيقات (API Endpoints for JavaScript)
 # --------------------------------------------------------------------------
 
+def _catalog_etag(request):
+    # النتائج لا تتغير ما دام إصدار الكتالوج ثابتاً، فيرد الخادم بـ 304 دون تنفيذ البحث.
+    return f"catalog-{catalog_version()}"
+
+
+@cache_control(private=True, max_age=10)
+@condition(etag_func=_catalog_etag)
 def api_search_products(request):
     query = request.GET.get('q', '')
     if not query:
         return JsonResponse([], safe=False)
-    products = Product.objects.filter(
-        Q(name__icontains=query) | Q(sku__icontains=query),
-        stock_quantity__gt=0
-    )[:10]
-    results = [{'id': p.id, 'name': p.name, 'price': str(p.sale_price), 'stock': p.stock_quantity} for p in products]
+    results = search_products(query, limit=10)
     return JsonResponse(results, safe=False)
 
 
+def api_catalog(request):
+    """
+    كتالوج المنتجات لنقطة البيع: كامل عند أول طلب، ثم التغييرات فقط
+    عبر ?since=<version> مع معرّفات المنتجات المحذوفة، حتى يتم البحث محلياً في المتصفح.
+    """
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        since = 0
+    version, products, deleted = catalog_changes(since)
+    return JsonResponse({'version': version, 'full': not since, 'products': products, 'deleted': deleted})
+
+
 def api_search_clients(request):
     query = request.GET.get('q', '')
     if not query:
         return JsonResponse([], safe=False)
     clients = Client.objects.filter(name__istartswith=query)[:10]
     results = [{'id': c.id, 'name': c.name} for c in clients]
-    return JsonResponse(results, safe=False)
+    response = JsonResponse(results, safe=False)
+    # ETag من محتوى الرد: إذا لم تتغير النتائج يكتفي المتصفح برد 304 فارغ.
+    response['ETag'] = quote_etag(hashlib.md5(response.content).hexdigest())
+    patch_cache_control(response, private=True, max_age=10)
+    return get_conditional_response(request, etag=response['ETag'], response=response)
+
+
+def _invoice_created_response(invoice_id, replayed=False):
+    response = JsonResponse({'status': 'success', 'message': _('تم إنشاء الفاتورة بنجاح!'), 'invoice_id': invoice_id})
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
 
 
 @csrf_exempt
 @require_POST
-@transaction.atomic
 def api_create_invoice(request):
+    """
+    ينشئ فاتورة من سلة نقطة البيع. إذا أُرسل مفتاح العملية (الترويسة Idempotency-Key
+    أو الحقل idempotency_key) فإن تكرار الطلب نفسه يعيد نفس الفاتورة دون تسجيلها مرة أخرى.
+    """
     try:
         data = json.loads(request.body)
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        if idempotency_key is not None and not (0 < len(str(idempotency_key)) <= 64):
+            return JsonResponse({'status': 'error', 'message': _('مفتاح العملية غير صالح.')}, status=400)
+        if idempotency_key:
+            # مسار سريع لإعادة المحاولة: استعلام واحد على الفهرس الفريد دون فتح معاملة.
+            invoice_id = Invoice.objects.filter(idempotency_key=idempotency_key).values_list('id', flat=True).first()
+            if invoice_id:
+                return _invoice_created_response(invoice_id, replayed=True)
         cart_items = data.get('cart', [])
         payment_method = data.get('payment_method')
         client_id = data.get('client_id')
+        # حد الاستعلامات لهذه الواجهة يكبر بعدد أسطر السلة (store/metrics.py).
+        request.query_budget_lines = len(cart_items) if isinstance(cart_items, list) else 0
         if not cart_items or not payment_method:
             return JsonResponse({'status': 'error', 'message': _('بيانات ناقصة')}, status=400)
-        total_amount = sum(Decimal(item['price']) * int(item['quantity']) for item in cart_items)
         client = None
         if payment_method == 'CREDIT':
             if not client_id:
                 return JsonResponse({'status': 'error', 'message': _('يجب تحديد عميل للبيع بالدين')}, status=400)
-            client = get_object_or_404(Client, id=client_id)
-        invoice = Invoice.objects.create(
-            client=client, total_amount=total_amount, payment_method=payment_method
-        )
-        product_ids = [item['id'] for item in cart_items]
-        products = Product.objects.in_bulk(product_ids)
-        invoice_items_to_create = []
-        products_to_update = []
-        for item in cart_items:
-            product = products.get(int(item['id']))
-            if not product:
-                raise Product.DoesNotExist(f"المنتج برقم ID {item['id']} غير موجود.")
-            quantity_sold = int(item['quantity'])
-            if product.stock_quantity < quantity_sold:
-                raise ValueError(f"كمية غير كافية للمنتج: {product.name}")
-            invoice_items_to_create.append(
-                InvoiceItem(invoice=invoice, product=product, quantity=quantity_sold, price_at_sale=Decimal(item['price']))
-            )
-            was_low_on_stock = product.is_low_on_stock
-            product.stock_quantity -= quantity_sold
-            products_to_update.append(product)
-            if not was_low_on_stock and product.is_low_on_stock:
-                try:
-                    message = f"📉 *نقص في المخزون* 📉\n\nالمنتج: *{product.name}*\nالكمية المتبقية: *{product.stock_quantity}*"
-                    send_telegram_message(message)
-                except Exception as e:
-                    print(f"فشل إرسال إشعار نقص المخزون: {e}")
-        InvoiceItem.objects.bulk_create(invoice_items_to_create)
-        Product.objects.bulk_update(products_to_update, ['stock_quantity'])
-        if client:
-            client.total_debt += total_amount
-            client.save()
-            try:
-                message = f"🚨 *دين جديد* 🚨\n\nالعميل: *{client.name}*\nمبلغ الفاتورة: *{total_amount:.2f}*\nإجمالي الدين الحالي: *{client.total_debt:.2f}*"
-                send_telegram_message(message)
-            except Exception as e:
-                print(f"فشل إرسال إشعار الدين الجديد: {e}")
-        return JsonResponse({'status': 'success', 'message': _('تم إنشاء الفاتورة بنجاح!'), 'invoice_id': invoice.id})
+            client = Client.objects.get(id=client_id)
+        if idempotency_key:
+            invoice, created = create_invoice_once(str(idempotency_key), cart_items, payment_method, client)
+            return _invoice_created_response(invoice.id, replayed=not created)
+        invoice = create_invoice(cart_items, payment_method, client)
+        return _invoice_created_response(invoice.id)
     except (Client.DoesNotExist, Product.DoesNotExist) as e:
         return JsonResponse({'status': 'error', 'message': _('عنصر مطلوب غير موجود.')}, status=404)
     except ValueError as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
-    except Exception as e:
-        print(f"An unexpected error occurred in api_create_invoice: {e}")
+    except (KeyError, TypeError, InvalidOperation):
+        return JsonResponse({'status': 'error', 'message': _('بيانات السلة غير صالحة.')}, status=400)
+    except Exception:
+        logger.exception("خطأ غير متوقع في api_create_invoice")
         return JsonResponse({'status': 'error', 'message': _('حدث خطأ غير متوقع في الخادم.')}, status=500)
 
 
+@csrf_exempt
+@require_POST
+def api_sync_invoices(request):
+    """
+    يستقبل مبيعات نقطة البيع المحفوظة أثناء انقطاع الاتصال دفعة واحدة،
+    ويعيد نتيجة لكل عملية حسب مفتاحها (المكرر يُعاد دون تسجيله مرة أخرى).
+    """
+    try:
+        sales = json.loads(request.body).get('invoices')
+    except (ValueError, AttributeError):
+        sales = None
+    if not isinstance(sales, list) or not all(isinstance(sale, dict) for sale in sales):
+        return JsonResponse({'status': 'error', 'message': _('بيانات ناقصة')}, status=400)
+    if len(sales) > MAX_SYNC_BATCH:
+        return JsonResponse(
+            {'status': 'error', 'message': _('عدد الفواتير في الطلب أكبر من المسموح.'), 'max_batch': MAX_SYNC_BATCH},
+            status=400,
+        )
+    return JsonResponse({'status': 'success', 'results': sync_invoices(sales)})
+
+
+def metrics_view(request):
+    """
+    مؤشرات الطلبات بصيغة Prometheus. متاحة للموظفين، أو دون تسجيل دخول
+    للعناوين المذكورة في METRICS_ALLOWED_IPS (خادم Prometheus).
+    """
+    allowed = request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    if not (allowed or request.user.is_staff):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # --------------------------------------------------------------------------
 # القسم الرابع: دوال إدارة العملاء (إضافة - تعديل - حذف)
 # --------------------------------------------------------------------------
@@ -35,6 +35,8 @@ INSTALLED_APPS = [
 
 # --- 4. البرمجيات الوسيطة ---
 MIDDLEWARE = [
+    # أولاً حتى يشمل القياس استعلامات الجلسات والمستخدم (store/metrics.py)
+    'store.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -80,6 +82,29 @@ else:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # قاعدة الاختبار على ملف لا في الذاكرة: اختبارات التزامن (store/tests) تكتب من عدة
+            # اتصالات في نفس الوقت، والذاكرة المشتركة ترفض ذلك بدل انتظار القفل.
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# --- ذاكرة التخزين المؤقت ---
+# إذا كان REDIS_URL موجوداً تُستخدم ذاكرة مشتركة بين كل العمال (للنشر)،
+# وإلا ذاكرة محلية داخل كل عملية.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'store-manager',
         }
     }
 
@@ -92,6 +117,9 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 LANGUAGE_CODE = 'ar'
 TIME_ZONE = 'UTC'
+# المنطقة الزمنية للمحل وساعة بداية يوم العمل، وعليهما تُبنى أيام التقارير (store/periods.py)
+SHOP_TIME_ZONE = os.getenv('SHOP_TIME_ZONE', TIME_ZONE)
+SHOP_DAY_CUTOVER_HOUR = int(os.getenv('SHOP_DAY_CUTOVER_HOUR', '0'))
 USE_I18N = True
 USE_TZ = True
 
@@ -121,5 +149,41 @@ else:
 
 # --- 9. إعدادات أخرى ---
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+# محرك البحث عن المنتجات (store/search.py): 'auto' أو المسار الكامل لصنف المحرك
+PRODUCT_SEARCH_BACKEND = os.getenv('PRODUCT_SEARCH_BACKEND', 'auto')
+# أقصى مدة (بالثواني) قد تتأخر فيها مؤشرات لوحة التحكم المخزنة (store/dashboard.py) عن قاعدة البيانات
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', '60'))
+# كل كم ثانية يجلب كتالوج الذاكرة (store/catalog.py) التغييرات من قاعدة البيانات
+CATALOG_REFRESH_INTERVAL = float(os.getenv('CATALOG_REFRESH_INTERVAL', '5'))
+# العناوين المسموح لها بقراءة /metrics دون تسجيل دخول (خادم Prometheus)
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',') if ip.strip()]
+# أقصى عدد استعلامات SQL لكل واجهة (باسم المسار)؛ التجاوز يُسجَّل ويفحصه الأمر check_query_budgets.
+# الأرقام تشمل استعلامَي الجلسة والمستخدم عند تسجيل الدخول. الحد قد يكون زوجاً (أساس، لكل سطر)
+# للواجهات التي يكبر عملها مع حجم السلة: البيع يخصم المخزون باستعلام لكل سطر.
+QUERY_BUDGETS = {
+    'dashboard': 8,
+    'client-list': 5,
+    'client-detail': 5,
+    'api-search-products': 7,
+    'api-search-clients': 3,
+    'api-create-invoice': (14, 1),
+    'profit-analytics': 5,
+    'debt-aging': 5,
+}
+# خطة إعادة الطلب (store/forecast.py): مدة التوريد وفترة المراجعة بالأيام، ومعامل مخزون الأمان
+# (1.65 ≈ احتمال 95% ألا ينفد المنتج قبل وصول الطلبية)
+REORDER_LEAD_TIME_DAYS = float(os.getenv('REORDER_LEAD_TIME_DAYS', '7'))
+REORDER_REVIEW_DAYS = float(os.getenv('REORDER_REVIEW_DAYS', '7'))
+REORDER_SERVICE_Z = float(os.getenv('REORDER_SERVICE_Z', '1.65'))
+# مدة (بالثواني) حفظ تحليل الأرباح (store/analytics.py) للفترات التي تشمل اليوم الحالي
+PROFIT_ANALYTICS_CACHE_TIMEOUT = int(os.getenv('PROFIT_ANALYTICS_CACHE_TIMEOUT', '300'))
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# إعدادات مرسل إشعارات تليجرام الخلفي (store/telegram_bot.py)
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org')
+TELEGRAM_TIMEOUT = float(os.getenv('TELEGRAM_TIMEOUT', '5'))
+TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', '5'))
+TELEGRAM_RETRY_BACKOFF = float(os.getenv('TELEGRAM_RETRY_BACKOFF', '1.0'))
+TELEGRAM_MIN_INTERVAL = float(os.getenv('TELEGRAM_MIN_INTERVAL', '1.0'))  # تليجرام يسمح بنحو رسالة/ثانية لكل محادثة
+TELEGRAM_MAX_BATCH = int(os.getenv('TELEGRAM_MAX_BATCH', '20'))  # أقصى عدد رسائل من صندوق الصادر تُدمج في إرسال واحد
+TELEGRAM_OUTBOX_POLL_INTERVAL = float(os.getenv('TELEGRAM_OUTBOX_POLL_INTERVAL', '30'))  # ثوانٍ بين مراجعات الرسائل المؤجلة